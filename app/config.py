@@ -18,11 +18,76 @@ PRODUCTION_DB_CONFIG={
     "PRODUCTION_HOST": os.getenv("PRODUCTION_HOST"),
     "PRODUCTION_PORT": int(os.getenv("PRODUCTION_PORT", 5432))
 }
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql")   # mysql | sqlite (local stand-in)
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", "output/local_db.sqlite3")
+PRODUCTION_DB_POOL_SIZE = int(os.getenv("PRODUCTION_DB_POOL_SIZE", 8))
+PRODUCTION_DB_POOL_TIMEOUT = float(os.getenv("PRODUCTION_DB_POOL_TIMEOUT", 10))
+PRODUCTION_DB_POOL_PING_AFTER = 30      # seconds idle before a borrowed connection is pinged
+PRODUCTION_DB_POOL_MAX_LIFETIME = 1800  # seconds before a connection is recycled
+SITE_SNAPSHOT_CACHE_SIZE = 64              # sites kept in memory
+SITE_SNAPSHOT_TTL = 300                    # seconds before a snapshot is always reloaded
+SITE_SNAPSHOT_VERSION_CHECK_INTERVAL = 5   # seconds between version checks per site
+GEOFENCE_CACHE_SIZE = 64                   # compiled geofence sets kept in memory
+RECORD_ID_NODE = int(os.environ["RECORD_ID_NODE"]) if os.getenv("RECORD_ID_NODE") else None  # 0-63, unique per process; unset: claimed from MySQL
+RECORD_ID_LEASE_PING = 60                  # seconds between keep-alive checks of the claimed record ID node
+PROMPT_CLIENT_IDS = os.getenv("PROMPT_CLIENT_IDS", "0") == "1"      # prompt_conversations ids from new_record_id(); needs migration 001 applied first
+PROMPT_WRITE_BEHIND = os.getenv("PROMPT_WRITE_BEHIND", "0") == "1"  # queue prompt_conversations writes; needs PROMPT_CLIENT_IDS
+PROMPT_WRITE_QUEUE_MAX = 10000             # pending writes held in memory
+PROMPT_WRITE_BATCH_SIZE = 200              # rows per multi-row statement
+PROMPT_WRITE_FLUSH_INTERVAL = 0.2          # seconds a batch may wait to fill
+LOOP_GUARD_MODE = os.getenv("LOOP_GUARD_MODE", "off")  # off | warn | raise: DB calls made on the event loop thread
 MAX_TOKEN_LIMIT_FOR_PROMPT_COMPLETION = 8192
 MIN_TOKEN_LIMIT_FOR_PROMPT_COMPLETION = 2
 MODEL_NAME_FOR_PROMPT_COMPLETION = "gpt-4o-mini"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 TEMPERATURE_FOR_PROMPT_COMPLETION = 0
+LLM_HTTP_MAX_CONNECTIONS = 32             # shared keep-alive pool for every LLM client
+LLM_HTTP_MAX_KEEPALIVE = 16
+LLM_HTTP_TIMEOUT = 120                     # seconds
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")  # openai | record (openai + save fixtures) | replay (offline)
+LLM_FIXTURES_PATH = os.getenv("LLM_FIXTURES_PATH", "output/llm_fixtures.json")  # recorded LLM responses
+LLM_FAKE_LATENCY = os.getenv("LLM_FAKE_LATENCY", "recorded")  # replay latency: none | recorded | fixed:S | uniform:A,B | lognormal:MEDIAN,SIGMA
+LLM_FAKE_SEED = int(os.getenv("LLM_FAKE_SEED", 0))  # seed for replay latency sampling
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"  # reuse temperature-0 LLM responses
+LLM_CACHE_SIZE = 4096                      # responses kept in memory
+LLM_CACHE_TTL = 24 * 3600                  # seconds a cached response stays valid
+LLM_CACHE_DISK_PATH = os.getenv("LLM_CACHE_DISK_PATH") or None  # optional SQLite file for a persistent tier
+LLM_SEMANTIC_CACHE_ENABLED = os.getenv("LLM_SEMANTIC_CACHE_ENABLED", "1") == "1"  # reuse answers for near-identical prompts
+LLM_SEMANTIC_CACHE_THRESHOLD = 0.95        # cosine similarity needed to reuse a cached answer
+LLM_SEMANTIC_CACHE_MAX_PER_SITE = 2048     # past prompts kept per (stage, model, site)
+LLM_SEMANTIC_EMBEDDER = os.getenv("LLM_SEMANTIC_EMBEDDER", "openai")  # openai | hashing (offline)
+MISSION_DEADLINE = float(os.getenv("MISSION_DEADLINE", 90))  # seconds a mission may take, from the user's message to the answer
+MISSION_OPTIONAL_MIN_REMAINING = 10.0      # seconds; with less left, optional stages (optimizer, graph insert) are skipped
+MISSION_RETRY_MIN_REMAINING = 5.0          # seconds; with less left, LangGraph extraction retries give up
+MISSION_CHEAP_MODEL_BELOW = 0.5            # fraction of the deadline left under which extraction uses SMALL_MODEL
+OPTIMIZER_TIMEOUT = 5                      # seconds the pipeline waits for parameter optimization
+OPTIMIZER_LLM_BUDGET = 4.0                 # seconds for all per-location optimizer LLM calls
+OPTIMIZER_CALL_TIMEOUT = 3.0               # seconds for one per-location optimizer LLM call
+OPTIMIZER_MAX_CONCURRENCY = 5              # per-location optimizer LLM calls in flight
+BACKGROUND_POOL_WORKERS = int(os.getenv("BACKGROUND_POOL_WORKERS", 8))  # background jobs (optimizer, graph insert) running at once
+BACKGROUND_POOL_QUEUE = int(os.getenv("BACKGROUND_POOL_QUEUE", 32))     # jobs deferred while all workers are busy; more are shed
+BACKGROUND_POOL_QUEUE_TIMEOUT = 2.0        # seconds a deferred job may wait before it is shed
+BACKGROUND_STAGE_DEADLINE = 60.0           # seconds a detached background stage (graph insert) may run after the answer went out
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))   # outbound LLM calls in flight, process-wide
+LLM_RATE_PER_SEC = float(os.getenv("LLM_RATE_PER_SEC", 10))       # token-bucket refill rate for LLM calls
+LLM_RATE_BURST = 20                        # token-bucket size
+LLM_QUEUE_TIMEOUT = 30                     # seconds a call may wait for a slot before failing
+LLM_STAGE_DEADLINES = {                    # seconds per LLM call, by pipeline stage (queue wait included)
+    "prompt_completion": 20,
+    "work_pattern": 20,
+    "json_extraction": 45,
+    "intent": 45,
+    "relative_direction": 45,
+    "intelligence_intent": 20,
+    "grid": 45,
+    "embedding": 10,
+    "optimizer": OPTIMIZER_CALL_TIMEOUT,
+}
+LLM_DEFAULT_DEADLINE = 60                  # seconds, stages not listed above
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "1") == "1"  # duplicate calls slower than the stage's p95
+LLM_HEDGE_PERCENTILE = 95                  # observed latency percentile that triggers a hedge
+LLM_HEDGE_MIN_SAMPLES = 20                 # latencies needed per stage before hedging starts
+LLM_HEDGE_MIN_DELAY = 0.5                  # seconds, never hedge earlier than this
 MODEL_FOR_EMBEDDING = "text-embedding-3-large"
 MODEL_FOR_CLASSIFICATION ="gpt-5-nano"
 TEMPERATURE_FOR_CLASSIFICATION=0
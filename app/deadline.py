@@ -0,0 +1,121 @@
+"""
+Per-mission deadlines.
+MissionEngine starts one Deadline when a user's message arrives. It is
+carried in a context variable, so every stage of that mission (LLM
+calls, DB pool waits, LangGraph retries, the optimizer) sees how much
+of the user's wait is left and can cap its own timeout, skip optional
+work or pick a cheaper model. Code outside a mission sees no deadline.
+
+Cancelling a deadline (client gone, prompt superseded) ends it at once:
+every check above then sees no time left, and check_cancelled() lets
+blocking code on worker threads stop at its next cancellation point.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+
+class MissionCancelled(Exception):
+    """The mission this work belongs to was cancelled."""
+
+
+class Deadline:
+    """
+    A time budget in seconds, counted from creation; cancel() ends it early.
+    With a `parent`, cancelling the parent cancels this one too, but the
+    parent's time budget does not apply (work that outlives the answer).
+    """
+
+    def __init__(self, budget: float, parent: Optional["Deadline"] = None):
+        self.budget = budget
+        self.parent = parent
+        self.started = time.monotonic()
+        self.expires_at = self.started + budget
+        self._cancel_reason: Optional[str] = None
+
+    @property
+    def cancel_reason(self) -> Optional[str]:
+        if self._cancel_reason is None and self.parent is not None:
+            return self.parent.cancel_reason
+        return self._cancel_reason
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_reason is not None
+
+    def cancel(self, reason: str = "cancelled"):
+        if self._cancel_reason is None:
+            self._cancel_reason = reason
+
+    def check(self):
+        reason = self.cancel_reason
+        if reason is not None:
+            raise MissionCancelled(reason)
+
+    def remaining(self) -> float:
+        if self.cancel_reason is not None:
+            return 0.0
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def fraction_left(self) -> float:
+        return self.remaining() / self.budget if self.budget > 0 else 0.0
+
+    def cap(self, timeout: Optional[float]) -> float:
+        """`timeout` shortened to what is left (all of it when timeout is None)."""
+        remaining = self.remaining()
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def __repr__(self):
+        if self.cancel_reason is not None:
+            return f"Deadline(cancelled: {self.cancel_reason})"
+        return f"Deadline({self.remaining():.2f}s of {self.budget}s left)"
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("mission_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]):
+    """Make `deadline` the current one for the enclosed code (and the tasks it starts)."""
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def check_cancelled():
+    """Raise MissionCancelled if the current mission was cancelled."""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check()
+
+
+def cap_timeout(timeout: Optional[float]) -> Optional[float]:
+    """`timeout` capped by the current deadline; unchanged outside a mission."""
+    deadline = _current.get()
+    return timeout if deadline is None else deadline.cap(timeout)
+
+
+def has_budget(seconds: float = 0.0) -> bool:
+    """True when the current mission has more than `seconds` left (always outside a mission)."""
+    deadline = _current.get()
+    return deadline is None or deadline.remaining() > seconds
+
+
+def budget_below(fraction: float) -> bool:
+    """True when the current mission has used more than 1 - `fraction` of its budget."""
+    deadline = _current.get()
+    return deadline is not None and deadline.fraction_left() < fraction
@@ -0,0 +1,92 @@
+"""
+In-flight mission registry.
+Every user turn MissionEngine runs is registered by cid and user id with
+its task and deadline. cancel() cancels the task, which stops its awaited
+LLM calls, background jobs and pending stages, and cancels the deadline,
+so work already on worker threads stops at its next LLM call, DB query
+or stage boundary.
+"""
+
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from .deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MissionRun:
+    cid: str
+    user_id: Any
+    task: asyncio.Task
+    deadline: Deadline
+
+
+class MissionRegistry:
+    """
+    Running missions, keyed by task.
+
+    - register(cid, user_id, task, deadline) when a turn starts
+    - finished(task) when it ends, however it ends
+    - cancel(cid=..., user_id=...) cancels every matching run except the
+      caller's own
+    """
+
+    def __init__(self):
+        self._runs: Dict[asyncio.Task, MissionRun] = {}
+        self._lock = threading.Lock()
+        self._stats = {"started": 0, "finished": 0, "cancelled": 0}
+
+    # ---------------- Public ---------------- #
+
+    def register(self, cid: str, user_id, task: asyncio.Task, deadline: Deadline) -> MissionRun:
+        run = MissionRun(cid, user_id, task, deadline)
+        with self._lock:
+            self._runs[task] = run
+            self._stats["started"] += 1
+        return run
+
+    def finished(self, task: asyncio.Task):
+        with self._lock:
+            if self._runs.pop(task, None) is not None:
+                self._stats["finished"] += 1
+
+    def cancel(self, cid: Optional[str] = None, user_id=None, reason: str = "cancelled") -> int:
+        """Cancel runs for `cid` or `user_id`. Returns how many were cancelled."""
+        if cid is None and user_id is None:
+            raise ValueError("cancel() needs a cid or a user_id")
+
+        try:
+            current = asyncio.current_task()
+        except RuntimeError:
+            current = None
+
+        with self._lock:
+            runs = [
+                run for run in self._runs.values()
+                if run.task is not current and (
+                    (cid is not None and run.cid == cid)
+                    or (user_id is not None and run.user_id == user_id)
+                )
+            ]
+            self._stats["cancelled"] += len(runs)
+
+        for run in runs:
+            logger.info(f"Cancelling mission {run.cid} (user {run.user_id}): {reason}")
+            run.deadline.cancel(reason)
+            run.task.get_loop().call_soon_threadsafe(run.task.cancel)
+        return len(runs)
+
+    def active(self, cid: Optional[str] = None) -> int:
+        with self._lock:
+            return sum(1 for run in self._runs.values() if cid is None or run.cid == cid)
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["active"] = len(self._runs)
+        return s
@@ -16,18 +16,28 @@ import os
 import json
 from jsons import (TEMPLATE)
 from validation_layer import (EnterDataToJSON, Template)
-from intent_understanding import (GpsCalculation, build_app, run_pipeline_intent)
+from intent_understanding import (GpsCalculation, build_app, arun_pipeline_intent)
 import copy
 import asyncio
 from mission_classifier_layer.model_selection import Selection
-from .config import MODEL_NAME_FOR_PROMPT_COMPLETION
+from .config import (
+    MODEL_NAME_FOR_PROMPT_COMPLETION,
+    OPTIMIZER_TIMEOUT,
+    SMALL_MODEL,
+    MISSION_DEADLINE,
+    MISSION_OPTIONAL_MIN_REMAINING,
+    MISSION_CHEAP_MODEL_BELOW,
+)
+from .deadline import Deadline, MissionCancelled, budget_below, check_cancelled, deadline_scope
+from .mission_registry import MissionRegistry
 from validation_layer.prompt_to_json_extraction import PromptToJsonConvert
 from graphdb import Neo4jMissionDB
 from correction_layer import (ConnectToDb, GeofenceValidator, CheckThreshold, match_update)
-from intelligence_layer.parameter_model_setup import optimize_parameters
-from intelligence_layer.model_setup import add_to_json
-from concurrent.futures import ThreadPoolExecutor
-from relative_direction import (GpsCalculationRelative, run_pipeline_relative)
+from database_layer import get_site_snapshot, run_blocking
+from intelligence_layer.parameter_model_setup import aoptimize_parameters
+from intelligence_layer.model_setup import add_to_json, waypoints_from_extraction
+from relative_direction import (GpsCalculationRelative, arun_pipeline_relative)
+from .stage_graph import Stage, StageGraph
 
 # Grid imports
 from grid.main import plan_mission
@@ -43,6 +53,12 @@ logger = logging.getLogger(__name__)
 
 SUPPORTED_GRID_SHAPES = {"polygon", "circle", "rectangle"}
 
+OUTPUT_FILES = {
+    "absolute_location":    "output/absolute.json",
+    "relative_direction":   "output/relative.json",
+    "intent_understanding": "output/intent.json",
+}
+
 
 # ── Grid Validation ───────────────────────────────────────────────
 
@@ -162,19 +178,40 @@ class PromptRunner:
                 site_id=self.site_id,
                 org_id=self.org_id
             )
-            return {
-                "success":         True,
-                "db_record_id":    response.request_id,
-                "status":          response.completion_result.status,
-                "is_complete":     response.completion_result.is_complete,
-                "confidence":      response.completion_result.confidence,
-                "suggestions":     response.completion_result.suggestions,
-                "processing_time_ms": response.processing_time_ms,
-            }
+            return self._summary(response)
+        except Exception as e:
+            logger.error(f"Error processing prompt: {str(e)}", exc_info=True)
+            return {"success": False, "error": str(e)}
+
+    async def aprocess_prompt(self, prompt: str) -> dict:
+        try:
+            request = PromptCompletionRequest(
+                prompt=prompt,
+                user_id=self.user_id
+            )
+            response = await self.pipeline.aprocess(
+                request,
+                user_id=self.user_id,
+                site_id=self.site_id,
+                org_id=self.org_id
+            )
+            return self._summary(response)
         except Exception as e:
             logger.error(f"Error processing prompt: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
 
+    @staticmethod
+    def _summary(response) -> dict:
+        return {
+            "success":         True,
+            "db_record_id":    response.request_id,
+            "status":          response.completion_result.status,
+            "is_complete":     response.completion_result.is_complete,
+            "confidence":      response.completion_result.confidence,
+            "suggestions":     response.completion_result.suggestions,
+            "processing_time_ms": response.processing_time_ms,
+        }
+
 
 # ── Mission Engine ────────────────────────────────────────────────
 
@@ -187,11 +224,57 @@ class MissionEngine:
     def __init__(self, sio):
         self.sio      = sio
         self.sessions = {}
+        self.missions = MissionRegistry()
+        self.pipeline = self._build_pipeline()
 
     # ── Entry point ───────────────────────────────────────────────
 
     async def main(self, cid, data):
         self.loop = asyncio.get_event_loop()
+        # A new prompt supersedes what this conversation still has running;
+        # the user's other conversations (tabs, devices) are left alone
+        self.cancel_missions(cid=cid, reason="superseded by a new prompt")
+        return await self._run_turn(cid, data, self._start_mission(cid, data))
+
+    def cancel_missions(self, cid=None, user_id=None, reason="cancelled") -> int:
+        """Cancel in-flight turns for a conversation or a user (disconnect, edit, new prompt)."""
+        return self.missions.cancel(cid=cid, user_id=user_id, reason=reason)
+
+    async def _run_turn(self, cid, data, turn):
+        """
+        Run one user turn as a registered, cancellable task under a fresh
+        mission deadline: every stage it reaches caps its timeouts by what
+        is left of MISSION_DEADLINE and stops once the turn is cancelled.
+        """
+        deadline = Deadline(MISSION_DEADLINE)
+        with deadline_scope(deadline):
+            task = asyncio.ensure_future(turn)      # the task inherits the deadline
+        self.missions.register(cid, data.get("user_id"), task, deadline)
+
+        try:
+            return await task
+        except (asyncio.CancelledError, MissionCancelled):
+            if not deadline.cancelled:
+                raise                               # our caller was cancelled, not the mission
+            logger.info(f"Mission {cid} cancelled: {deadline.cancel_reason}")
+            return {
+                "event": "argos-ai:response",
+                "type":  "cancelled",
+                "payload": {"message": f"Mission cancelled: {deadline.cancel_reason}", "cid": cid}
+            }
+        except (TimeoutError, asyncio.TimeoutError) as e:
+            if not deadline.expired():
+                raise
+            logger.warning(f"Mission {cid} ran out of its {deadline.budget}s deadline: {e!r}")
+            return {
+                "event": "argos-ai:response",
+                "type":  "rejected",
+                "payload": {"message": "Mission took too long, please try again", "cid": cid}
+            }
+        finally:
+            self.missions.finished(task)
+
+    async def _start_mission(self, cid, data):
         prompt = data.get("message", "")
 
         if not prompt:
@@ -222,9 +305,22 @@ class MissionEngine:
             data["site_id"]
         )
 
-        result = await asyncio.to_thread(runner.process_prompt, prompt)
+        # Classification only reads the prompt: run it alongside the completion
+        # check and keep the result if the prompt is (or may later be) accepted
+        speculative = asyncio.create_task(
+            self._select_model(copy.deepcopy(validated), data)
+        )
+
+        result = await runner.aprocess_prompt(prompt)
+
+        if result["success"] and result["status"] == "accepted":
+            validated["db_record_id"] = result["db_record_id"]
+            self.emit_progress(data["user_id"], cid, "Prompt accepted")
+            selected = await self._speculative_result(speculative)
+            return await self._continue_pipeline(data, validated, cid, selected)
 
         if not result["success"]:
+            self._discard_speculative(speculative)
             return {
                 "event": "argos-ai:response",
                 "type":  "rejected",
@@ -233,17 +329,14 @@ class MissionEngine:
 
         validated["db_record_id"] = result["db_record_id"]
 
-        if result["status"] == "accepted":
-            self.emit_progress(data["user_id"], cid, "Prompt accepted")
-            return await asyncio.to_thread(
-                self._continue_pipeline_sync, data, validated, cid
-            )
-
         if result["status"] == "rejected":
+            # The user may still Accept: let classification finish (it stays
+            # bounded by this turn's deadline) and reuse it then
             self.sessions[cid] = {
-                "stage":     "waiting_human",
-                "data":      data,
-                "validated": validated
+                "stage":       "waiting_human",
+                "data":        data,
+                "validated":   validated,
+                "speculative": self._keep_speculative(speculative)
             }
             self.emit_progress(data["user_id"], cid, "Prompt rejected by system")
             return {
@@ -258,6 +351,7 @@ class MissionEngine:
                 }
             }
 
+        self._discard_speculative(speculative)
         return {
             "event": "argos-ai:response",
             "type":  "rejected",
@@ -271,12 +365,14 @@ class MissionEngine:
         return any(k in prompt.lower() for k in keywords)
 
     def _build_grid_validated(self, data: dict, prompt: str) -> dict:
+        user_info = data.get("user", {})
+
         return {
-            "site_id":     data.get("site_id"),
+            "site_id":     data.get("site_id"),           # ← from message (correct site)
             "user_id":     data.get("user_id"),
             "org_id":      data.get("organization_id"),
             "user_prompt": prompt,
-            "data":        data.get("user", {}),  # ← full org/site/drone JSON from cache
+            "data":        user_info,                      # ← full org/drone/site JSON
         }
 
     async def _handle_grid(self, cid: str, data: dict, prompt: str) -> dict:
@@ -345,6 +441,9 @@ class MissionEngine:
     # ── Human-in-loop handlers ────────────────────────────────────
 
     async def handle_location_action(self, cid, data):
+        return await self._run_turn(cid, data, self._location_action(cid, data))
+
+    async def _location_action(self, cid, data):
 
         session = self.sessions.get(cid)
         if not session:
@@ -399,15 +498,10 @@ class MissionEngine:
 
         waypoints[waypoint_index]["location"] = location_name
 
-        connect  = ConnectToDb()
-        mission  = connect.find_waypoint_closest_and_update(mission)
-        validator = GeofenceValidator()
-        mission  = validator.validate(mission)
+        # Name matching, geofence and threshold checks hit MySQL: keep them off the loop
+        mission, result = await run_blocking(self._relocate_waypoint_sync, mission)
         session["mission"] = mission
 
-        threshold = CheckThreshold(mission)
-        result    = threshold.check_waypoints()
-
         if result["status"] == "need_location":
             session["waypoint_index"] = result["waypoint_index"]
             session["mission"]        = result["mission"]
@@ -438,6 +532,9 @@ class MissionEngine:
         }
 
     async def handle_validate_action(self, cid, data):
+        return await self._run_turn(cid, data, self._validate_action(cid, data))
+
+    async def _validate_action(self, cid, data):
 
         session = self.sessions.get(cid)
         if not session:
@@ -473,15 +570,15 @@ class MissionEngine:
         )
 
         if choice == "1":
-            runner.db.update_status_of_prompt(validated["db_record_id"], "APPROVED")
+            await run_blocking(runner.db.update_status_of_prompt, validated["db_record_id"], "APPROVED")
             del self.sessions[cid]
-            return await asyncio.to_thread(
-                self._continue_pipeline_sync, original_data, validated, cid
-            )
+            selected = await self._speculative_result(session.get("speculative"))
+            return await self._continue_pipeline(original_data, validated, cid, selected)
 
         if choice == "2":
-            runner.db.update_status_of_prompt(validated["db_record_id"], "REJECTED")
+            await run_blocking(runner.db.update_status_of_prompt, validated["db_record_id"], "REJECTED")
             del self.sessions[cid]
+            self._discard_speculative(session.get("speculative"))
             return {
                 "event": "argos-ai:response",
                 "type":  "rejected",
@@ -489,6 +586,10 @@ class MissionEngine:
             }
 
         if choice == "3":
+            # The old prompt is dropped: stop anything still running for it
+            self.cancel_missions(cid=cid, reason="prompt edited")
+            del self.sessions[cid]
+            self._discard_speculative(session.get("speculative"))
             return {
                 "event": "argos-ai:action",
                 "type":  "retry",
@@ -511,6 +612,11 @@ class MissionEngine:
         keywords = ["grid", "survey", "map", "mapping", "coverage", "scan", "aerial survey"]
         return any(k in prompt.lower() for k in keywords)
 
+    @staticmethod
+    def _is_path(mission) -> bool:
+        # Only a path is flown leg by leg; point / 3d missions have no legs to check
+        return mission.get("class") == "path"
+
     def emit_progress(self, user_id, cid, message):
         asyncio.run_coroutine_threadsafe(
             self.sio.emit(
@@ -531,107 +637,90 @@ class MissionEngine:
         else:
             ref[last] = value
 
-    def run_optimization(self, local_validated):
+    def _relocate_waypoint_sync(self, mission):
+        """Re-resolve waypoint names, re-validate and re-check (runs on a worker thread)."""
+        connect   = ConnectToDb()
+        mission   = connect.find_waypoint_closest_and_update(mission)
+        validator = GeofenceValidator()
+        mission   = validator.validate(mission, check_legs=self._is_path(mission))
+
+        threshold = CheckThreshold(mission)
+        return mission, threshold.check_waypoints()
+
+    async def _select_model(self, validated, data):
+        """Classification + model selection."""
+        return await Selection(validated, data).aselect_model()
+
+    async def _speculative_result(self, task):
+        """Result of the speculative classification, or None if there is none or it failed."""
+        if task is None or task.cancelled():
+            return None
         try:
-            v = add_to_json(local_validated)
-            v = optimize_parameters(v)
-            return v
+            return await task
         except Exception as e:
-            logger.error(f"Optimization failed: {e}", exc_info=True)
-            return local_validated
+            logger.warning(f"Speculative classification failed, classifying again: {e}")
+            return None
 
-    # ── Existing pipeline (unchanged) ─────────────────────────────
-
-    def _continue_pipeline_sync(self, data, validated, cid):
-        self.emit_progress(data["user_id"], cid, "Model selection initiated")
-        executor     = ThreadPoolExecutor(max_workers=1)
-        model_select = Selection(validated, data)
-        validated    = model_select.select_model()
-        future       = executor.submit(self.run_optimization, copy.deepcopy(validated))
-
-        if validated["category"] == "absolute_location":
-            graphdb = Neo4jMissionDB()
-            self.emit_progress(data["user_id"], cid, "Model selected")
-            mission_json = PromptToJsonConvert(validated)
-            validated    = mission_json.convert()
-            self.emit_progress(data["user_id"], cid, "Mission added to graph DB")
-            graphdb.initialize()
-            graphdb.insert_mission(validated)
-            graphdb.close()
-            self.emit_progress(data["user_id"], cid, "Running geofence validation")
-            connect   = ConnectToDb()
-            validated = connect.find_waypoint_closest_and_update(validated)
-            validator = GeofenceValidator()
-            validated = validator.validate(validated)
-
-            try:
-                optimized = future.result(timeout=5)
-                try:
-                    validated = match_update(validated, optimized["final_result"])
-                except Exception as e:
-                    print(f"match_update failed: {e}")
-            except Exception as e:
-                print(f"Optimization timed out: {e}")
-
-            threshold = CheckThreshold(validated)
-            result    = threshold.check_waypoints()
-
-            if result["mission"]["model_for_extraction_json_output"]["type"] == "point" \
-                    and len(result["mission"]["model_for_extraction_json_output"]["waypoints"]) >= 2:
-                result["mission"]["model_for_extraction_json_output"]["type"] = "path"
-            if result["mission"]["model_for_extraction_json_output"]["type"] == "path" \
-                    and len(result["mission"]["model_for_extraction_json_output"]["waypoints"]) <= 1:
-                result["mission"]["model_for_extraction_json_output"]["type"] = "point"
-
-            self._save_entry(result, "output/absolute.json")
-
-        elif validated["category"] == "relative_direction":
-            validated["dock_coordinates"] = {"lat": 19.966591, "lon": 73.667184}
-            pipeline_output = run_pipeline_relative(validated["prompt"])
-            validated["model_for_extraction_json_output"] = pipeline_output.copy()
-            validated["category"] = "relative_direction"
-            gps       = GpsCalculationRelative()
-            validated = gps.indivisual_waypoint_gps_fetch(validated)
-            output_from_json = EnterDataToJSON()
-            extracted_json   = copy.deepcopy(TEMPLATE)
-            validated["model_for_extraction_json_output"] = output_from_json.parse_json(validated, extracted_json)
-            validator = GeofenceValidator()
-            validated = validator.validate(validated)
-            threshold = CheckThreshold(validated)
-            result    = threshold.check_waypoints()
-
-            if result["mission"]["model_for_extraction_json_output"]["type"] == "point" \
-                    and len(result["mission"]["model_for_extraction_json_output"]["waypoints"]) >= 2:
-                result["mission"]["model_for_extraction_json_output"]["type"] = "path"
-            if result["mission"]["model_for_extraction_json_output"]["type"] == "path" \
-                    and len(result["mission"]["model_for_extraction_json_output"]["waypoints"]) <= 1:
-                result["mission"]["model_for_extraction_json_output"]["type"] = "point"
-
-            self._save_entry(result, "output/relative.json")
-
-        elif validated["category"] == "intent_understanding":
-            validated["dock_coordinates"] = {"lat": 19.966591, "lon": 73.667184}
-            pipeline_output = run_pipeline_intent(validated)
-            validated["model_for_extraction_json_output"] = pipeline_output.copy()
-            validated["category"] = "intent_understanding"
-            gps       = GpsCalculation()
-            validated = gps.indivisual_waypoint_gps_fetch(validated)
-            output_from_json = EnterDataToJSON()
-            extracted_json   = copy.deepcopy(TEMPLATE)
-            validated["model_for_extraction_json_output"] = output_from_json.parse_json(validated, extracted_json)
-            validator = GeofenceValidator()
-            validated = validator.validate(validated)
-            threshold = CheckThreshold(validated)
-            result    = threshold.check_waypoints()
-
-            if result["mission"]["model_for_extraction_json_output"]["type"] == "point" \
-                    and len(result["mission"]["model_for_extraction_json_output"]["waypoints"]) >= 2:
-                result["mission"]["model_for_extraction_json_output"]["type"] = "path"
-            if result["mission"]["model_for_extraction_json_output"]["type"] == "path" \
-                    and len(result["mission"]["model_for_extraction_json_output"]["waypoints"]) <= 1:
-                result["mission"]["model_for_extraction_json_output"]["type"] = "point"
-
-            self._save_entry(result, "output/intent.json")
+    @staticmethod
+    def _keep_speculative(task):
+        # Nobody awaits it until the user answers: don't log its failure as unretrieved
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    @staticmethod
+    def _discard_speculative(task):
+        if task is None:
+            return
+        # Cancels the in-flight LLM call on the LLM loop as well
+        task.cancel()
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    # ── Mission pipeline ──────────────────────────────────────────
+    # One stage graph for every category. Stages start as soon as their
+    # inputs exist: the annotation / geofence prefetches overlap model
+    # selection, and the graph insert and optimizer overlap the location
+    # and geofence steps. LLM stages are awaited on the event loop; DB
+    # and geometry stages run on worker threads. The graph insert and
+    # optimizer are background work: under load the shared pool defers
+    # or sheds them and the mission goes out without them. The optimizer
+    # feeds the merge, so the answer waits for it (OPTIMIZER_TIMEOUT at
+    # most) and it is skipped once the mission deadline runs low; the
+    # graph insert is detached and the answer never waits for it.
+
+    def _build_pipeline(self) -> StageGraph:
+        def absolute(values):
+            return values["mission"]["category"] == "absolute_location"
+
+        return StageGraph([
+            Stage("select", self._select_stage, inputs=("validated", "selected", "data"),
+                  output="mission", progress="Model selection initiated"),
+            Stage("annotations", self._prefetch_annotations_sync, inputs=("site_id",),
+                  output="snapshot", blocking=True, optional=True),
+            Stage("geofences", self._prefetch_geofences_sync, inputs=("site_id",),
+                  output="fences", blocking=True, optional=True),
+            Stage("extract", self._extract_stage, inputs=("mission", "snapshot"),
+                  output="extracted", progress="Model selected"),
+            Stage("graph_insert", self._insert_mission_sync, inputs=("extracted",), blocking=True,
+                  background=True, optional=True, when=absolute, progress="Mission added to graph DB",
+                  min_budget=MISSION_OPTIONAL_MIN_REMAINING),
+            Stage("optimize", self.run_optimization, inputs=("extracted",), output="optimized",
+                  background=True, optional=True, when=absolute, timeout=OPTIMIZER_TIMEOUT,
+                  min_budget=MISSION_OPTIONAL_MIN_REMAINING),
+            Stage("locate", self._locate_sync, inputs=("extracted",), output="located", blocking=True),
+            Stage("geofence", self._geofence_sync, inputs=("located", "fences"), output="fenced",
+                  blocking=True, progress="Running geofence validation"),
+            Stage("merge", self._merge_stage, inputs=("fenced", "optimized"), output="merged"),
+            Stage("threshold", self._check_sync, inputs=("merged",), output="result", blocking=True),
+            Stage("save", self._save_result_sync, inputs=("result",), blocking=True),
+        ], initial=("validated", "selected", "data", "site_id"))
+
+    async def _continue_pipeline(self, data, validated, cid, selected=None):
+        run = await self.pipeline.run(
+            {"validated": validated, "selected": selected, "data": data, "site_id": validated["site_id"]},
+            on_start=lambda stage: self.emit_progress(data["user_id"], cid, stage.progress)
+        )
+        logger.info(f"Mission {cid} stage timings (ms): {run.timings_ms}")
+        result = run.values["result"]
 
         self.emit_progress(data["user_id"], cid, "Mission pipeline complete")
 
@@ -653,12 +742,7 @@ class MissionEngine:
             }
 
         validated = result["mission"]
-        if validated["model_for_extraction_json_output"]["type"] == "point" \
-                and len(validated["model_for_extraction_json_output"]["waypoints"]) >= 2:
-            validated["model_for_extraction_json_output"]["type"] = "path"
-        if validated["model_for_extraction_json_output"]["type"] == "path" \
-                and len(validated["model_for_extraction_json_output"]["waypoints"]) <= 1:
-            validated["model_for_extraction_json_output"]["type"] = "point"
+        self._normalize_type(validated["model_for_extraction_json_output"])
 
         if not validated["model_for_extraction_json_output"]["waypoints"]:
             return {
@@ -674,691 +758,121 @@ class MissionEngine:
             "cid":     cid
         }
 
-    @staticmethod
-    def _save_entry(data, filepath: str):
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        existing = []
-        if os.path.exists(filepath):
-            with open(filepath, "r") as f:
-                try:
-                    existing = json.load(f)
-                except json.JSONDecodeError:
-                    existing = []
-        existing.append({"serial_no": len(existing) + 1, "data": data})
-        with open(filepath, "w") as f:
-            json.dump(existing, f, indent=2)
-
-import logging
-from logging_config import LoggerFeature
-from prompt_completion_layer import (
-    PromptCompletionPipeline,
-    PromptCompletionRequest,
-    PromptCompletionDB
-)
-import os
-import json
-from jsons import (TEMPLATE)
-from validation_layer import (EnterDataToJSON, Template)
-from intent_understanding import (GpsCalculation, build_app, run_pipeline_intent)
-import copy
-import asyncio
-from mission_classifier_layer.model_selection import Selection
-from .config import MODEL_NAME_FOR_PROMPT_COMPLETION
-from validation_layer.prompt_to_json_extraction import PromptToJsonConvert
-from graphdb import Neo4jMissionDB
-from correction_layer import (ConnectToDb, GeofenceValidator, CheckThreshold, match_update)
-from intelligence_layer.parameter_model_setup import optimize_parameters
-from intelligence_layer.model_setup import add_to_json
-from concurrent.futures import ThreadPoolExecutor
-from relative_direction import (GpsCalculationRelative, run_pipeline_relative)
-
-# Grid imports
-from grid.main import plan_mission
-from grid.llm.prompts import (
-    _resolve_annotations,
-    _resolve_drone_and_camera,
-    _parse_flight_params,
-    _find_annotation_by_prompt,
-)
-
-LoggerFeature.setup_logging()
-logger = logging.getLogger(__name__)
-
-SUPPORTED_GRID_SHAPES = {"polygon", "circle", "rectangle"}
-
-
-# ── Grid Validation ───────────────────────────────────────────────
-
-class ValidationCode:
-    LOCATION_NOT_FOUND = "location_not_found"
-    ALTITUDE_MISSING   = "altitude_missing"
-    NO_DRONE_BOUND     = "no_drone_bound"
-    ALTITUDE_EXCEEDED  = "altitude_exceeded"
-    UNSUPPORTED_SHAPE  = "unsupported_shape"
-
-
-def _validate_grid_request(validated: dict) -> list[dict]:
-    """
-    Returns list of issues. Empty = all good.
-    Each issue: { "code": str, "message": str, "options": list }
-    """
-    issues      = []
-    user_prompt = validated.get("user_prompt", "")
-    annotations = _resolve_annotations(validated)
-
-    # 1. No annotations at all
-    if not annotations:
-        issues.append({
-            "code":    ValidationCode.LOCATION_NOT_FOUND,
-            "message": "No locations found for this site.",
-            "options": []
-        })
-        return issues
-
-    # 2. Location name not found in prompt
-    annotation = _find_annotation_by_prompt(user_prompt, annotations)
-    if not annotation:
-        names = [a["name"] for a in annotations]
-        issues.append({
-            "code":    ValidationCode.LOCATION_NOT_FOUND,
-            "message": "Which area do you want to fly over?",
-            "options": names
-        })
-
-    # 3. Shape not supported for grid
-    if annotation and annotation.get("shape") not in SUPPORTED_GRID_SHAPES:
-        valid_names = [
-            a["name"] for a in annotations
-            if a.get("shape") in SUPPORTED_GRID_SHAPES
-        ]
-        issues.append({
-            "code":    ValidationCode.UNSUPPORTED_SHAPE,
-            "message": (
-                f"'{annotation['name']}' is a {annotation['shape']} "
-                f"which doesn't support grid missions. "
-                f"Please choose a polygon, circle, or rectangle."
-            ),
-            "options": valid_names
-        })
-
-    # 4. Altitude missing
-    params = _parse_flight_params(user_prompt)
-    if not params["altitude_m"]:
-        issues.append({
-            "code":    ValidationCode.ALTITUDE_MISSING,
-            "message": "What altitude should the drone fly at? (in meters)",
-            "options": ["10m", "20m", "30m", "50m"]
-        })
+    # ── Stages ────────────────────────────────────────────────────
 
-    # 5. No drone bound to site
-    drone_cam = _resolve_drone_and_camera(validated)
-    if not drone_cam:
-        issues.append({
-            "code":    ValidationCode.NO_DRONE_BOUND,
-            "message": "No drone with a camera is bound to this site.",
-            "options": []
-        })
+    async def _select_stage(self, validated, selected, data):
+        if selected is not None:
+            # Speculative classification: its class/category/model, our record fields
+            return {**selected, **validated}
+        return await self._select_model(validated, data)
 
-    # 6. Altitude exceeds drone limit
-    if drone_cam and params["altitude_m"]:
-        max_alt = drone_cam.get("max_altitude", 0)
-        if params["altitude_m"] > max_alt:
-            issues.append({
-                "code":    ValidationCode.ALTITUDE_EXCEEDED,
-                "message": (
-                    f"Requested altitude {params['altitude_m']}m exceeds "
-                    f"drone max altitude of {max_alt}m."
-                ),
-                "options": [
-                    f"{int(max_alt * 0.5)}m",
-                    f"{int(max_alt * 0.75)}m",
-                    f"{max_alt}m"
-                ]
-            })
+    @staticmethod
+    def _prefetch_annotations_sync(site_id):
+        """Warm the site snapshot the prompt render and name matching read."""
+        return get_site_snapshot(site_id)
 
-    return issues
+    @staticmethod
+    def _prefetch_geofences_sync(site_id):
+        return GeofenceValidator().compiled_geofences(site_id)
+
+    async def _extract_stage(self, mission, snapshot):
+        """Category-specific LLM extraction. `snapshot` only orders it after the prefetch."""
+        mission  = dict(mission)
+        category = mission["category"]
+
+        if budget_below(MISSION_CHEAP_MODEL_BELOW) and mission.get("model_for_extraction") != SMALL_MODEL:
+            # Most of the user's wait is spent already: trade accuracy for latency
+            logger.info(f"Mission deadline running low, extracting with {SMALL_MODEL}")
+            mission["model_for_extraction"] = SMALL_MODEL
+
+        if category == "absolute_location":
+            return await PromptToJsonConvert(mission).aconvert()
+
+        if category == "relative_direction":
+            pipeline_output = await arun_pipeline_relative(mission["prompt"])
+        elif category == "intent_understanding":
+            pipeline_output = await arun_pipeline_intent(mission)
+        else:
+            raise ValueError(f"Unknown mission category: {category}")
 
+        mission["dock_coordinates"] = {"lat": 19.966591, "lon": 73.667184}
+        mission["model_for_extraction_json_output"] = pipeline_output.copy()
+        return mission
 
-# ── Prompt Runner (unchanged) ─────────────────────────────────────
+    async def run_optimization(self, extracted):
+        local_validated = copy.deepcopy(extracted)
+        try:
+            # Reuse the JSON extraction's waypoints instead of a second LLM extraction
+            waypoints = waypoints_from_extraction(local_validated["model_for_extraction_json_output"])
+            v = await run_blocking(add_to_json, local_validated, waypoints)
+            v = await aoptimize_parameters(v)
+            return v
+        except Exception as e:
+            logger.error(f"Optimization failed: {e}", exc_info=True)
+            return local_validated
 
-class PromptRunner:
-    def __init__(self, user_id: int, org_id: int, site_id: int):
-        self.user_id  = user_id
-        self.org_id   = org_id
-        self.site_id  = site_id
+    @staticmethod
+    def _insert_mission_sync(extracted):
+        """Record the mission in the graph DB."""
+        graphdb = Neo4jMissionDB()
+        try:
+            graphdb.initialize()
+            # Detached from the answer: a mission superseded or edited meanwhile is not recorded
+            check_cancelled()
+            graphdb.insert_mission(extracted)
+        finally:
+            graphdb.close()
 
-        self.pipeline = PromptCompletionPipeline(
-            llm_model=MODEL_NAME_FOR_PROMPT_COMPLETION,
-            save_to_db=True
-        )
-        self.db = PromptCompletionDB()
+    @staticmethod
+    def _locate_sync(extracted):
+        """Resolve waypoint locations: site names for absolute missions, GPS math otherwise."""
+        # The graph insert and optimizer read `extracted` concurrently
+        mission = copy.deepcopy(extracted)
+
+        if mission["category"] == "absolute_location":
+            connect = ConnectToDb()
+            return connect.find_waypoint_closest_and_update(mission)
+
+        gps = GpsCalculationRelative() if mission["category"] == "relative_direction" else GpsCalculation()
+        mission = gps.indivisual_waypoint_gps_fetch(mission)
+        output_from_json = EnterDataToJSON()
+        extracted_json   = copy.deepcopy(TEMPLATE)
+        mission["model_for_extraction_json_output"] = output_from_json.parse_json(mission, extracted_json)
+        return mission
+
+    @classmethod
+    def _geofence_sync(cls, located, fences):
+        validator = GeofenceValidator()
+        return validator.validate(located, geofences=fences, check_legs=cls._is_path(located))
 
-    def process_prompt(self, prompt: str) -> dict:
+    @staticmethod
+    def _merge_stage(fenced, optimized):
+        if optimized is None:
+            return fenced
         try:
-            request = PromptCompletionRequest(
-                prompt=prompt,
-                user_id=self.user_id
-            )
-            response = self.pipeline.process(
-                request,
-                user_id=self.user_id,
-                site_id=self.site_id,
-                org_id=self.org_id
-            )
-            return {
-                "success":         True,
-                "db_record_id":    response.request_id,
-                "status":          response.completion_result.status,
-                "is_complete":     response.completion_result.is_complete,
-                "confidence":      response.completion_result.confidence,
-                "suggestions":     response.completion_result.suggestions,
-                "processing_time_ms": response.processing_time_ms,
-            }
+            return match_update(fenced, optimized["final_result"])
         except Exception as e:
-            logger.error(f"Error processing prompt: {str(e)}", exc_info=True)
-            return {"success": False, "error": str(e)}
-
-
-# ── Mission Engine ────────────────────────────────────────────────
+            print(f"match_update failed: {e}")
+            return fenced
 
-class MissionEngine:
-    """
-    Async mission engine.
-    Maintains session state per socket connection.
-    """
+    @staticmethod
+    def _check_sync(merged):
+        """Distance threshold checks."""
+        threshold = CheckThreshold(merged)
+        result    = threshold.check_waypoints()
+        MissionEngine._normalize_type(result["mission"]["model_for_extraction_json_output"])
+        return result
 
-    def __init__(self, sio):
-        self.sio      = sio
-        self.sessions = {}
+    def _save_result_sync(self, result):
+        self._save_entry(result, OUTPUT_FILES[result["mission"]["category"]])
 
-    # ── Entry point ───────────────────────────────────────────────
-
-    async def main(self, cid, data):
-        self.loop = asyncio.get_event_loop()
-        prompt = data.get("message", "")
-
-        if not prompt:
-            return {
-                "event": "argos-ai:response",
-                "type":  "rejected",
-                "payload": {"message": "Prompt is Empty", "cid": cid}
-            }
-
-        # Detect if this is a grid mission
-        if self._is_grid_prompt(prompt):
-            return await self._handle_grid(cid, data, prompt)
-
-        # ── Existing non-grid pipeline ────────────────────────────
-        validated = {
-            "db_record_id": None,
-            "user_id":      data["user_id"],
-            "site_id":      data["site_id"],
-            "org_id":       data["organization_id"],
-            "prompt":       prompt,
-        }
-
-        self.emit_progress(data["user_id"], cid, "Starting mission pipeline")
-
-        runner = PromptRunner(
-            data["user_id"],
-            data["organization_id"],
-            data["site_id"]
-        )
-
-        result = await asyncio.to_thread(runner.process_prompt, prompt)
-
-        if not result["success"]:
-            return {
-                "event": "argos-ai:response",
-                "type":  "rejected",
-                "payload": {"message": str(result), "cid": cid}
-            }
-
-        validated["db_record_id"] = result["db_record_id"]
-
-        if result["status"] == "accepted":
-            self.emit_progress(data["user_id"], cid, "Prompt accepted")
-            return await asyncio.to_thread(
-                self._continue_pipeline_sync, data, validated, cid
-            )
-
-        if result["status"] == "rejected":
-            self.sessions[cid] = {
-                "stage":     "waiting_human",
-                "data":      data,
-                "validated": validated
-            }
-            self.emit_progress(data["user_id"], cid, "Prompt rejected by system")
-            return {
-                "event": "argos-ai:action",
-                "type":  "validate",
-                "payload": {
-                    "params": {1: "Accept", 2: "Reject", 3: "Edit"},
-                    "request_id": validated["db_record_id"],
-                    "mission":    validated,
-                    "message":    "Approve mission? (1=Accept, 2=Reject, 3=Edit)",
-                    "cid":        cid
-                }
-            }
-
-        return {
-            "event": "argos-ai:response",
-            "type":  "rejected",
-            "payload": {"message": "Invalid prompt state", "cid": cid}
-        }
-
-    # ── Grid handling ─────────────────────────────────────────────
-
-    def _is_grid_prompt(self, prompt: str) -> bool:
-        keywords = ["grid", "survey", "map", "mapping", "coverage", "scan", "aerial survey"]
-        return any(k in prompt.lower() for k in keywords)
-
-    def _build_grid_validated(self, data: dict, prompt: str) -> dict:
-        user_info = data.get("user", {})
-
-        return {
-            "site_id":     data.get("site_id"),           # ← from message (correct site)
-            "user_id":     data.get("user_id"),
-            "org_id":      data.get("organization_id"),
-            "user_prompt": prompt,
-            "data":        user_info,                      # ← full org/drone/site JSON
-        }
-
-    async def _handle_grid(self, cid: str, data: dict, prompt: str) -> dict:
-
-        validated = self._build_grid_validated(data, prompt)
-
-        self.emit_progress(data["user_id"], cid, "Validating grid mission request")
-
-        issues = _validate_grid_request(validated)
-
-        if issues:
-            issue = issues[0]  # handle one at a time
-
-            # Store session so we can resume after user replies
-            self.sessions[cid] = {
-                "stage":         "grid_waiting",
-                "pending_issue": issue["code"],
-                "validated":     validated,
-                "data":          data,
-            }
-
-            self.emit_progress(data["user_id"], cid, "Waiting for user input")
-
-            # Use action:location for location issues, action:validate for others
-            event_type = (
-                "location"
-                if issue["code"] in (
-                    ValidationCode.LOCATION_NOT_FOUND,
-                    ValidationCode.UNSUPPORTED_SHAPE
-                )
-                else "validate"
-            )
-
-            return {
-                "event": "argos-ai:action",
-                "type":  event_type,
-                "payload": {
-                    "message": issue["message"],
-                    "cid":     cid,
-                    "params":  issue["options"] if issue["options"] else None
-                }
-            }
-
-        # All validated — run planner
-        self.emit_progress(data["user_id"], cid, "Planning grid mission")
-
-        try:
-            result = await asyncio.to_thread(plan_mission, validated)
-
-            self.emit_progress(data["user_id"], cid, "Grid mission ready")
-
-            return {
-                "event": "argos-ai:response",
-                "type":  "success",
-                "payload": result.model_dump()
-            }
-
-        except Exception as e:
-            logger.error(f"Grid mission failed: {e}", exc_info=True)
-            return {
-                "event": "argos-ai:response",
-                "type":  "error",
-                "payload": {"message": f"Mission planning failed: {str(e)}", "cid": cid}
-            }
-
-    # ── Human-in-loop handlers ────────────────────────────────────
-
-    async def handle_location_action(self, cid, data):
-
-        session = self.sessions.get(cid)
-        if not session:
-            return {
-                "event": "argos-ai:response",
-                "type":  "rejected",
-                "payload": {"message": "Session expired", "cid": cid}
-            }
-
-        # ── Grid location reply ───────────────────────────────────
-        if session.get("stage") == "grid_waiting":
-            chosen    = data.get("param", "") or data.get("message", "")
-            if isinstance(chosen, dict):
-                chosen = chosen.get("name", "")
-
-            validated = session["validated"]
-            issue     = session["pending_issue"]
-
-            if issue == ValidationCode.LOCATION_NOT_FOUND:
-                validated["user_prompt"] += f" for {chosen}"
-            elif issue == ValidationCode.UNSUPPORTED_SHAPE:
-                # Replace old location reference with new one
-                validated["user_prompt"] += f" for {chosen}"
-
-            del self.sessions[cid]
-            return await self._handle_grid(cid, session["data"], validated["user_prompt"])
-
-        # ── Existing location action (path/point) ─────────────────
-        print("handle_location_action_triggered")
-        mission       = session["mission"]
-        location_name = data.get("param", {"name": ""})
-
-        if isinstance(location_name, dict):
-            location_name = location_name.get("name", "")
-
-        if not location_name:
-            return {
-                "event": "argos-ai:response",
-                "type":  "rejected",
-                "payload": {"message": "No location provided", "cid": cid}
-            }
-
-        waypoint_index = session.get("waypoint_index", 0)
-        waypoints      = mission["model_for_extraction_json_output"].get("waypoints", [])
-
-        if not waypoints or waypoint_index >= len(waypoints):
-            return {
-                "event": "argos-ai:response",
-                "type":  "rejected",
-                "payload": {"message": "Invalid waypoint index", "cid": cid}
-            }
-
-        waypoints[waypoint_index]["location"] = location_name
-
-        connect  = ConnectToDb()
-        mission  = connect.find_waypoint_closest_and_update(mission)
-        validator = GeofenceValidator()
-        mission  = validator.validate(mission)
-        session["mission"] = mission
-
-        threshold = CheckThreshold(mission)
-        result    = threshold.check_waypoints()
-
-        if result["status"] == "need_location":
-            session["waypoint_index"] = result["waypoint_index"]
-            session["mission"]        = result["mission"]
-            return {
-                "event": "argos-ai:action",
-                "type":  "location",
-                "payload": {
-                    "message": result["message"],
-                    "cid":     cid,
-                    "params":  None
-                }
-            }
-
-        del self.sessions[cid]
-        validated = result["mission"]
-        output    = validated["model_for_extraction_json_output"]
-
-        if output["type"] == "point" and len(output.get("waypoints", [])) >= 2:
+    @staticmethod
+    def _normalize_type(output):
+        if output["type"] == "point" and len(output["waypoints"]) >= 2:
             output["type"] = "path"
-        elif output["type"] == "path" and len(output.get("waypoints", [])) <= 1:
+        if output["type"] == "path" and len(output["waypoints"]) <= 1:
             output["type"] = "point"
 
-        return {
-            "event": "argos-ai:response",
-            "type":  "success",
-            "payload": output,
-            "cid":     cid
-        }
-
-    async def handle_validate_action(self, cid, data):
-
-        session = self.sessions.get(cid)
-        if not session:
-            return {
-                "event": "argos-ai:response",
-                "type":  "rejected",
-                "payload": {"message": "Session expired", "cid": cid}
-            }
-
-        # ── Grid validate reply ───────────────────────────────────
-        if session.get("stage") == "grid_waiting":
-            user_reply = data.get("param", "") or data.get("message", "")
-            validated  = session["validated"]
-            issue      = session["pending_issue"]
-
-            if issue == ValidationCode.ALTITUDE_MISSING:
-                validated["user_prompt"] += f" at altitude {user_reply}"
-            elif issue == ValidationCode.ALTITUDE_EXCEEDED:
-                validated["user_prompt"] += f" at altitude {user_reply}"
-
-            del self.sessions[cid]
-            return await self._handle_grid(cid, session["data"], validated["user_prompt"])
-
-        # ── Existing validate action (path/point) ─────────────────
-        choice    = str(data.get("param"))
-        validated = session["validated"]
-        original_data = session["data"]
-
-        runner = PromptRunner(
-            original_data["user_id"],
-            original_data["organization_id"],
-            original_data["site_id"]
-        )
-
-        if choice == "1":
-            runner.db.update_status_of_prompt(validated["db_record_id"], "APPROVED")
-            del self.sessions[cid]
-            return await asyncio.to_thread(
-                self._continue_pipeline_sync, original_data, validated, cid
-            )
-
-        if choice == "2":
-            runner.db.update_status_of_prompt(validated["db_record_id"], "REJECTED")
-            del self.sessions[cid]
-            return {
-                "event": "argos-ai:response",
-                "type":  "rejected",
-                "payload": {"message": "Prompt rejected by user", "cid": cid}
-            }
-
-        if choice == "3":
-            return {
-                "event": "argos-ai:action",
-                "type":  "retry",
-                "payload": {"message": "Please enter new prompt", "cid": cid, "params": None}
-            }
-
-        return {
-            "event": "argos-ai:action",
-            "type":  "validate",
-            "payload": {
-                "params":  {1: "Accept", 2: "Reject", 3: "Edit"},
-                "message": "Invalid option. Enter 1, 2 or 3",
-                "cid":     cid
-            }
-        }
-
-    # ── Helpers ───────────────────────────────────────────────────
-
-    def _is_grid_prompt(self, prompt: str) -> bool:
-        keywords = ["grid", "survey", "map", "mapping", "coverage", "scan", "aerial survey"]
-        return any(k in prompt.lower() for k in keywords)
-
-    def emit_progress(self, user_id, cid, message):
-        asyncio.run_coroutine_threadsafe(
-            self.sio.emit(
-                "argos-ai:progress",
-                {"message": message, "cid": cid, "user_id": user_id},
-            ),
-            self.loop
-        )
-
-    def set_nested_value(self, obj, path, value):
-        keys = path.split(".")
-        ref  = obj
-        for k in keys[:-1]:
-            ref = ref[int(k)] if k.isdigit() else ref[k]
-        last = keys[-1]
-        if last.isdigit():
-            ref[int(last)] = value
-        else:
-            ref[last] = value
-
-    def run_optimization(self, local_validated):
-        try:
-            v = add_to_json(local_validated)
-            v = optimize_parameters(v)
-            return v
-        except Exception as e:
-            logger.error(f"Optimization failed: {e}", exc_info=True)
-            return local_validated
-
-    # ── Existing pipeline (unchanged) ─────────────────────────────
-
-    def _continue_pipeline_sync(self, data, validated, cid):
-        self.emit_progress(data["user_id"], cid, "Model selection initiated")
-        executor     = ThreadPoolExecutor(max_workers=1)
-        model_select = Selection(validated, data)
-        validated    = model_select.select_model()
-        future       = executor.submit(self.run_optimization, copy.deepcopy(validated))
-
-        if validated["category"] == "absolute_location":
-            graphdb = Neo4jMissionDB()
-            self.emit_progress(data["user_id"], cid, "Model selected")
-            mission_json = PromptToJsonConvert(validated)
-            validated    = mission_json.convert()
-            self.emit_progress(data["user_id"], cid, "Mission added to graph DB")
-            graphdb.initialize()
-            graphdb.insert_mission(validated)
-            graphdb.close()
-            self.emit_progress(data["user_id"], cid, "Running geofence validation")
-            connect   = ConnectToDb()
-            validated = connect.find_waypoint_closest_and_update(validated)
-            validator = GeofenceValidator()
-            validated = validator.validate(validated)
-
-            try:
-                optimized = future.result(timeout=5)
-                try:
-                    validated = match_update(validated, optimized["final_result"])
-                except Exception as e:
-                    print(f"match_update failed: {e}")
-            except Exception as e:
-                print(f"Optimization timed out: {e}")
-
-            threshold = CheckThreshold(validated)
-            result    = threshold.check_waypoints()
-
-            if result["mission"]["model_for_extraction_json_output"]["type"] == "point" \
-                    and len(result["mission"]["model_for_extraction_json_output"]["waypoints"]) >= 2:
-                result["mission"]["model_for_extraction_json_output"]["type"] = "path"
-            if result["mission"]["model_for_extraction_json_output"]["type"] == "path" \
-                    and len(result["mission"]["model_for_extraction_json_output"]["waypoints"]) <= 1:
-                result["mission"]["model_for_extraction_json_output"]["type"] = "point"
-
-            self._save_entry(result, "output/absolute.json")
-
-        elif validated["category"] == "relative_direction":
-            validated["dock_coordinates"] = {"lat": 19.966591, "lon": 73.667184}
-            pipeline_output = run_pipeline_relative(validated["prompt"])
-            validated["model_for_extraction_json_output"] = pipeline_output.copy()
-            validated["category"] = "relative_direction"
-            gps       = GpsCalculationRelative()
-            validated = gps.indivisual_waypoint_gps_fetch(validated)
-            output_from_json = EnterDataToJSON()
-            extracted_json   = copy.deepcopy(TEMPLATE)
-            validated["model_for_extraction_json_output"] = output_from_json.parse_json(validated, extracted_json)
-            validator = GeofenceValidator()
-            validated = validator.validate(validated)
-            threshold = CheckThreshold(validated)
-            result    = threshold.check_waypoints()
-
-            if result["mission"]["model_for_extraction_json_output"]["type"] == "point" \
-                    and len(result["mission"]["model_for_extraction_json_output"]["waypoints"]) >= 2:
-                result["mission"]["model_for_extraction_json_output"]["type"] = "path"
-            if result["mission"]["model_for_extraction_json_output"]["type"] == "path" \
-                    and len(result["mission"]["model_for_extraction_json_output"]["waypoints"]) <= 1:
-                result["mission"]["model_for_extraction_json_output"]["type"] = "point"
-
-            self._save_entry(result, "output/relative.json")
-
-        elif validated["category"] == "intent_understanding":
-            validated["dock_coordinates"] = {"lat": 19.966591, "lon": 73.667184}
-            pipeline_output = run_pipeline_intent(validated)
-            validated["model_for_extraction_json_output"] = pipeline_output.copy()
-            validated["category"] = "intent_understanding"
-            gps       = GpsCalculation()
-            validated = gps.indivisual_waypoint_gps_fetch(validated)
-            output_from_json = EnterDataToJSON()
-            extracted_json   = copy.deepcopy(TEMPLATE)
-            validated["model_for_extraction_json_output"] = output_from_json.parse_json(validated, extracted_json)
-            validator = GeofenceValidator()
-            validated = validator.validate(validated)
-            threshold = CheckThreshold(validated)
-            result    = threshold.check_waypoints()
-
-            if result["mission"]["model_for_extraction_json_output"]["type"] == "point" \
-                    and len(result["mission"]["model_for_extraction_json_output"]["waypoints"]) >= 2:
-                result["mission"]["model_for_extraction_json_output"]["type"] = "path"
-            if result["mission"]["model_for_extraction_json_output"]["type"] == "path" \
-                    and len(result["mission"]["model_for_extraction_json_output"]["waypoints"]) <= 1:
-                result["mission"]["model_for_extraction_json_output"]["type"] = "point"
-
-            self._save_entry(result, "output/intent.json")
-
-        self.emit_progress(data["user_id"], cid, "Mission pipeline complete")
-
-        if result["status"] == "need_location":
-            self.sessions[cid] = {
-                "stage":         "waiting_location",
-                "waypoint_index": result["waypoint_index"],
-                "mission":        result["mission"],
-                "data":           data
-            }
-            return {
-                "event": "argos-ai:action",
-                "type":  "location",
-                "payload": {
-                    "message": result["message"],
-                    "cid":     cid,
-                    "params":  None
-                }
-            }
-
-        validated = result["mission"]
-        if validated["model_for_extraction_json_output"]["type"] == "point" \
-                and len(validated["model_for_extraction_json_output"]["waypoints"]) >= 2:
-            validated["model_for_extraction_json_output"]["type"] = "path"
-        if validated["model_for_extraction_json_output"]["type"] == "path" \
-                and len(validated["model_for_extraction_json_output"]["waypoints"]) <= 1:
-            validated["model_for_extraction_json_output"]["type"] = "point"
-
-        if not validated["model_for_extraction_json_output"]["waypoints"]:
-            return {
-                "event": "argos-ai:response",
-                "type":  "rejected",
-                "payload": {"message": "No waypoints given or out of bound", "cid": cid}
-            }
-
-        return {
-            "event": "argos-ai:response",
-            "type":  "success",
-            "payload": validated["model_for_extraction_json_output"],
-            "cid":     cid
-        }
-
     @staticmethod
     def _save_entry(data, filepath: str):
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
@@ -0,0 +1,285 @@
+"""
+Declarative stage graph.
+Each stage names the values it reads and the value it produces. The
+executor starts a stage as soon as its inputs exist, so independent
+stages (DB prefetches, graph insert, optimizer) overlap. Blocking stages
+run on worker threads, background stages on the shared bounded pool;
+per-stage timings are recorded for every run. Optional stages never
+outlive the current mission deadline, and no stage starts once the
+mission is cancelled.
+
+A background stage that no foreground stage reads (directly or through
+other stages) is detached: run() returns without it and it carries on
+in the pool under its own BACKGROUND_STAGE_DEADLINE; cancelling the
+mission still cancels it.
+"""
+
+import time
+import asyncio
+import inspect
+import logging
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from database_layer import BoundedWorkerPool, get_background_pool, run_blocking
+from .config import BACKGROUND_STAGE_DEADLINE
+from .deadline import Deadline, cap_timeout, check_cancelled, current_deadline, deadline_scope, has_budget
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One pipeline step.
+
+    - run(**inputs) returns the stage's output; a coroutine function is
+      awaited, a plain function is called inline or, with blocking=True,
+      on a worker thread
+    - when(values) can skip the stage; its output is then `default`
+    - an optional stage that fails or exceeds `timeout` produces `default`
+      instead of failing the run; its timeout is capped by the mission
+      deadline, and with less than `min_budget` seconds left it is skipped
+    - background=True runs it through the shared bounded background pool:
+      it may be deferred, or shed with PoolRejected under load (pair it
+      with optional=True to carry on without it); if nothing on the
+      response path reads its output, run() does not wait for it
+    - `progress` is reported through on_start when the stage begins
+
+    Stages must not mutate their inputs: other stages may be reading them.
+    """
+
+    name: str
+    run: Callable
+    inputs: Tuple[str, ...] = ()
+    output: Optional[str] = None
+    blocking: bool = False
+    background: bool = False
+    when: Optional[Callable[[Dict[str, Any]], bool]] = None
+    timeout: Optional[float] = None
+    optional: bool = False
+    default: Any = None
+    progress: Optional[str] = None
+    min_budget: float = 0.0
+
+
+@dataclass
+class StageRun:
+    """Values and per-stage timings of one run."""
+
+    values: Dict[str, Any]
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+    fallbacks: List[str] = field(default_factory=list)
+    detached: List[str] = field(default_factory=list)
+
+
+class StageGraph:
+    """
+    DAG of stages, checked once when built.
+
+    - every input must be an initial value or the output of exactly one stage
+    - cycles are rejected
+    - run(values) executes the graph; the first failing required stage
+      cancels the rest and its exception propagates
+    - run() returns once the response path is done; detached background
+      stages keep running (see `detached`)
+    """
+
+    def __init__(
+        self,
+        stages: Iterable[Stage],
+        initial: Iterable[str] = (),
+        pool: Optional[BoundedWorkerPool] = None,
+    ):
+        self.stages = list(stages)
+        self.initial = tuple(initial)
+        self.pool = pool
+
+        self._producers = {}
+        names = set()
+        for stage in self.stages:
+            if stage.name in names:
+                raise ValueError(f"Duplicate stage '{stage.name}'")
+            names.add(stage.name)
+            if stage.output is None:
+                continue
+            if stage.output in self._producers or stage.output in self.initial:
+                raise ValueError(f"'{stage.output}' is produced more than once")
+            self._producers[stage.output] = stage
+
+        for stage in self.stages:
+            for key in stage.inputs:
+                if key not in self._producers and key not in self.initial:
+                    raise ValueError(f"Stage '{stage.name}' reads '{key}', which nothing produces")
+
+        self.order = self._topological_order()
+        self.detached = self._detached_stages()
+
+        self._background = set()    # detached stage tasks still running
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {
+            "runs": 0, "skipped": 0, "fallbacks": 0, "failed": 0, "ms_total": 0.0, "ms_max": 0.0,
+        })
+
+    # ---------------- Public ---------------- #
+
+    def dependencies(self, stage: Stage) -> List[Stage]:
+        return [self._producers[key] for key in stage.inputs if key in self._producers]
+
+    async def run(self, values: Dict[str, Any], on_start: Callable[[Stage], None] = None) -> StageRun:
+        missing = [key for key in self.initial if key not in values]
+        if missing:
+            raise ValueError(f"Missing initial values: {missing}")
+
+        run = StageRun(values=dict(values))
+        tasks = {}
+
+        async def start(stage):
+            deps = [tasks[dep.name] for dep in self.dependencies(stage)]
+            if deps:
+                await asyncio.gather(*deps)
+            if stage.name not in self.detached:
+                return await self._run_stage(stage, run, on_start)
+            # Not part of the answer: its own time budget, but still the mission's cancellation
+            with deadline_scope(Deadline(BACKGROUND_STAGE_DEADLINE, parent=current_deadline())):
+                await self._run_stage(stage, run, on_start)
+
+        # Topological order: a stage's dependencies already have tasks
+        for stage in self.order:
+            tasks[stage.name] = asyncio.ensure_future(start(stage))
+
+        try:
+            await asyncio.gather(*(task for name, task in tasks.items() if name not in self.detached))
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        for name in self.detached:
+            task = tasks[name]
+            if not task.done():
+                run.detached.append(name)
+            self._background.add(task)
+            task.add_done_callback(self._detached_done)
+
+        return run
+
+    def stats(self) -> dict:
+        with self._lock:
+            stages = {name: dict(s) for name, s in self._stats.items()}
+
+        for s in stages.values():
+            s["ms_avg"] = round(s["ms_total"] / s["runs"], 3) if s["runs"] else 0.0
+        return stages
+
+    # ---------------- Internal ---------------- #
+
+    def _detached_stages(self) -> frozenset:
+        """Background stages no foreground stage reads, directly or through other stages."""
+        needed = set()
+
+        def need(stage):
+            if stage.name not in needed:
+                needed.add(stage.name)
+                for dep in self.dependencies(stage):
+                    need(dep)
+
+        for stage in self.stages:
+            if not stage.background:
+                need(stage)
+        return frozenset(stage.name for stage in self.stages if stage.name not in needed)
+
+    def _detached_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Detached stage failed: {task.exception()!r}")
+
+    def _topological_order(self) -> List[Stage]:
+        order, state = [], {}
+
+        def visit(stage, path):
+            if state.get(stage.name) == "done":
+                return
+            if state.get(stage.name) == "visiting":
+                raise ValueError(f"Stage cycle: {' -> '.join(path + [stage.name])}")
+            state[stage.name] = "visiting"
+            for dep in self.dependencies(stage):
+                visit(dep, path + [stage.name])
+            state[stage.name] = "done"
+            order.append(stage)
+
+        for stage in self.stages:
+            visit(stage, [])
+        return order
+
+    async def _run_stage(self, stage: Stage, run: StageRun, on_start):
+        values = run.values
+        check_cancelled()
+
+        if self._skip(stage, values):
+            run.skipped.append(stage.name)
+            self._bump(stage.name, "skipped")
+            if stage.output is not None:
+                values[stage.output] = stage.default
+            return
+
+        if on_start is not None and stage.progress:
+            on_start(stage)
+
+        kwargs = {key: values[key] for key in stage.inputs}
+        timeout = cap_timeout(stage.timeout) if stage.optional else stage.timeout
+        start = time.monotonic()
+        try:
+            call = self._call(stage, kwargs)
+            result = await (asyncio.wait_for(call, timeout) if timeout is not None else call)
+        except Exception as e:
+            if not stage.optional:
+                self._bump(stage.name, "failed")
+                raise
+            logger.warning(f"Stage {stage.name} fell back to its default: {e!r}")
+            run.fallbacks.append(stage.name)
+            self._bump(stage.name, "fallbacks")
+            result = stage.default
+        finally:
+            elapsed_ms = (time.monotonic() - start) * 1000
+            run.timings_ms[stage.name] = round(elapsed_ms, 1)
+            with self._lock:
+                s = self._stats[stage.name]
+                s["runs"] += 1
+                s["ms_total"] += elapsed_ms
+                s["ms_max"] = max(s["ms_max"], elapsed_ms)
+
+        if stage.output is not None:
+            values[stage.output] = result
+
+    @staticmethod
+    def _skip(stage: Stage, values: Dict[str, Any]) -> bool:
+        if stage.when is not None and not stage.when(values):
+            return True
+        # Optional work the mission no longer has time for
+        return stage.optional and not has_budget(stage.min_budget)
+
+    async def _call(self, stage: Stage, kwargs: Dict[str, Any]):
+        if stage.background:
+            pool = self.pool or get_background_pool()
+            if stage.blocking:
+                return await pool.arun(stage.run, **kwargs)
+            return await pool.acall(self._invoke, stage, kwargs)
+        if stage.blocking:
+            return await run_blocking(stage.run, **kwargs)
+        return await self._invoke(stage, kwargs)
+
+    @staticmethod
+    async def _invoke(stage: Stage, kwargs: Dict[str, Any]):
+        result = stage.run(**kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def _bump(self, name, key):
+        with self._lock:
+            self._stats[name][key] += 1
@@ -1,11 +1,13 @@
 from .annotations_calculation import GeometryCenterCalculator
 from .geofence_validator import GeofenceValidator
+from .geofence_engine import CompiledGeofences
 from .db_manage import ConnectToDb
 from .check_threshold import CheckThreshold
 from .match_and_update import match_update
 __all__=[
     GeometryCenterCalculator,
     GeofenceValidator,
+    CompiledGeofences,
     ConnectToDb,
     CheckThreshold,
     match_update
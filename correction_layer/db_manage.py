@@ -3,7 +3,8 @@ from difflib import SequenceMatcher
 import logging
 from app.config import PROMPT_COMPLETION_DATABASE_CONFIG,PRODUCTION_DB_CONFIG
 from .annotations_calculation import GeometryCenterCalculator
-import mysql.connector
+from .fuzzy_matcher import FuzzyLocationMatcher
+from database_layer import get_production_pool, get_site_snapshot
 #import psycopg
 logger = logging.getLogger(__name__)
 
@@ -30,13 +31,7 @@ class ConnectToDb:
         #     host=self.host,
         #     port=self.port
         # )
-        return mysql.connector.connect(
-    database=self.dbname,
-    user=self.user,
-    password=self.password,
-    host=self.host,
-    port=self.port
-)
+        return get_production_pool().acquire()
 
     # ----------------------------------
     # Get all geofence names (for fuzzy)
@@ -44,18 +39,8 @@ class ConnectToDb:
 
     def get_waypoint_names(self, site_id):
 
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "SELECT LOWER(name) FROM annotations WHERE site_id=%s;",
-            (site_id,)
-        )
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        return [r[0] for r in rows]
+        # Served from the in-memory site snapshot
+        return get_site_snapshot(site_id).names_lower
 
     # ----------------------------------
     # Fetch annotation geometry
@@ -63,41 +48,57 @@ class ConnectToDb:
 
     def get_annotation_row_by_name(self, site_id, name):
 
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT shape, geometry, height
-            FROM annotations
-            WHERE site_id=%s AND LOWER(name)=%s
-            LIMIT 1;
-        """, (site_id, name.lower()))
-
-        row = cursor.fetchone()
-        conn.close()
+        row = get_site_snapshot(site_id).find(name)
 
         if not row:
             return None
 
         return {
-            "shape": row[0],
-            "geometry": row[1],
-            "height": row[2]
+            "shape": row["shape"],
+            "geometry": row["geometry"],
+            "height": row["height"]
         }
 
+    # ----------------------------------
+    # Bulk fetch for many waypoints
+    # ----------------------------------
+
+    def get_annotation_rows_by_names(self, site_id, names):
+        """
+        Resolve many annotation names in one pass.
+        Returns {lowercased name: row}; names with no annotation are left out.
+        """
+        snapshot = get_site_snapshot(site_id)
+        rows = {}
+
+        for name in names:
+            row = snapshot.find(name)
+            if row:
+                rows[name.lower()] = row
+
+        return rows
+
     # ----------------------------------
 
     def similarity(self, a, b):
         return SequenceMatcher(None, a, b).ratio()
 
-    # ----------------------------------
-    # Main pipeline
-    # ----------------------------------
     def token_overlap(self,a, b):
         a_set = set(a.split())
         b_set = set(b.split())
         return len(a_set & b_set) / max(len(a_set), 1)
-    
+
+    def get_location_matcher(self, site_id):
+        """Fuzzy matcher over the site's annotation names, built once per snapshot."""
+        return get_site_snapshot(site_id).derived(
+            "location_matcher",
+            lambda snapshot: FuzzyLocationMatcher(snapshot.names_lower)
+        )
+
+    # ----------------------------------
+    # Main pipeline
+    # ----------------------------------
+
     def find_waypoint_closest_and_update(self, validated):
         try:
             site_id = validated.get("site_id")
@@ -105,13 +106,9 @@ class ConnectToDb:
             if not site_id:
                 return validated
 
-            # Fetch waypoint names safely
-            waypoint_names = self.get_waypoint_names(site_id) or []
-            print("waypoint_names_from_db:",waypoint_names)
-            waypoint_names = [
-                name.lower() for name in waypoint_names
-                if isinstance(name, str)
-            ]
+            # Indexed matcher over the site's annotation names
+            matcher = self.get_location_matcher(site_id)
+            logger.debug(f"waypoint_names_from_db: {len(matcher)} names")
 
             waypoints = validated.get(
                 "model_for_extraction_json_output", {}
@@ -119,7 +116,10 @@ class ConnectToDb:
 
             THRESHOLD = 0.8
 
-            for wp in waypoints:
+            # Pass 1: match every waypoint to an annotation name
+            matched = {}    # waypoint index -> annotation name
+
+            for i, wp in enumerate(waypoints):
                 try:
                     location = wp.get("location")
                     print("locations_from_db:",location)
@@ -132,68 +132,48 @@ class ConnectToDb:
                         wp["location"] = None
                         continue
 
-                    location_lower = location.lower()
-
                     # If no candidates exist in DB
-                    if not waypoint_names:
+                    if not len(matcher):
                         wp["location"] = None
                         continue
 
-                    # If exact match exists
-                    if location_lower in waypoint_names:
-                        
-                        best_name = location_lower
-                    else:
-                        # Build similarity scores safely
-                        scores = {}
-
-                        for name in waypoint_names:
-                            try:
-                                score = max(
-                                    self.similarity(location_lower, name),
-                                    self.token_overlap(location_lower, name)
-                                )
-                                if isinstance(score, (int, float)):
-                                    scores[name] = score
-                            except Exception:
-                                continue
-
-                        # If similarity produced nothing
-                        if not scores:
-                            wp["location"] = None
-                            continue
-
-                        best_name, best_score = max(
-                            scores.items(),
-                            key=lambda x: x[1]
-                        )
-
-                        if best_score < THRESHOLD:
-                            wp["location"] = None
-                            continue
-
-                    # Fetch annotation row safely
-                    annotation_row = self.get_annotation_row_by_name(
-                        site_id, best_name
-                    )
+                    best_name = matcher.best(location.lower(), THRESHOLD)
+
+                    if best_name is None:
+                        wp["location"] = None
+                        continue
+
+                    matched[i] = best_name
+
+                except Exception as e:
+                    print("error from db_manage 1:",e)
+                    # If anything unexpected happens in one waypoint
+                    wp["location"] = None
+                    continue
+
+            # Pass 2: fetch every matched annotation at once
+            annotation_rows = self.get_annotation_rows_by_names(
+                site_id, set(matched.values())
+            )
+
+            for i, best_name in matched.items():
+                wp = waypoints[i]
+                try:
+                    annotation_row = annotation_rows.get(best_name)
 
                     if not annotation_row:
                         wp["location"] = None
                         continue
 
-                    # Calculate center safely
-                    print("annotation_row:",annotation_row)
-                    center = GeometryCenterCalculator.calculate(annotation_row)
+                    # Center is precomputed in the snapshot
+                    center = annotation_row.get("center")
+                    if center is None:
+                        center = GeometryCenterCalculator.calculate(annotation_row)
                     print("center_calculate:",center)
-                    wp["location"] = center
-                    # except Exception as e:
-                    #     print("error from db_manage 0:",e)
-                    #     wp["location"] = None
-                    #     continue
+                    wp["location"] = list(center)
 
                 except Exception as e:
                     print("error from db_manage 1:",e)
-                    # If anything unexpected happens in one waypoint
                     wp["location"] = None
                     continue
 
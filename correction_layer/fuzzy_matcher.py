@@ -0,0 +1,118 @@
+# fuzzy_matcher.py
+
+"""
+Indexed fuzzy matching of location names against a site's annotations.
+
+Scores are the same as ConnectToDb.similarity / token_overlap:
+    score = max(SequenceMatcher ratio, token overlap)
+but candidates are pruned first with a vectorized upper bound, so
+SequenceMatcher only runs on the few names that can still reach the
+threshold. Results are identical to the full scan.
+"""
+
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.8
+
+
+class FuzzyLocationMatcher:
+    """
+    Prebuilt matcher for one site.
+
+    - token index : token -> names containing it (token overlap)
+    - char counts : names x alphabet matrix, gives a vectorized upper
+                    bound on the SequenceMatcher ratio for pruning
+    """
+
+    def __init__(self, names: Iterable[str]):
+        # Unique names, first occurrence order (ties go to the earliest name)
+        self.names = list(dict.fromkeys(n.lower() for n in names if isinstance(n, str)))
+        self._position = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+
+        self.lengths = np.array([len(name) for name in self.names], dtype=np.float64)
+
+        token_index = defaultdict(list)
+        for i, name in enumerate(self.names):
+            for token in set(name.split()):
+                token_index[token].append(i)
+
+        self._token_index = {k: np.array(v, dtype=np.int64) for k, v in token_index.items()}
+
+        alphabet = sorted(set("".join(self.names)))
+        self._char_column = {c: j for j, c in enumerate(alphabet)}
+        self._char_counts = np.zeros((n, len(alphabet)), dtype=np.int32)
+        for i, name in enumerate(self.names):
+            for c in name:
+                self._char_counts[i, self._char_column[c]] += 1
+
+    def __len__(self):
+        return len(self.names)
+
+    # ---------------- Public ---------------- #
+
+    def top(self, query: str, k: int = 3, threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, float]]:
+        """Up to k (name, score) pairs scoring >= threshold, best first."""
+        idx, scores = self._score(query, threshold)
+        keep = scores >= threshold
+        idx, scores = idx[keep], scores[keep]
+
+        # Highest score first; equal scores keep name order
+        order = np.lexsort((idx, -scores))[:k]
+        return [(self.names[idx[o]], float(scores[o])) for o in order]
+
+    def best(self, query: str, threshold: float = DEFAULT_THRESHOLD) -> Optional[str]:
+        """Best matching name, or None if nothing reaches the threshold."""
+        if not isinstance(query, str) or not self.names:
+            return None
+
+        query = query.lower()
+        if query in self._position:
+            return query
+
+        found = self.top(query, k=1, threshold=threshold)
+        return found[0][0] if found else None
+
+    # ---------------- Internal ---------------- #
+
+    def _score(self, query: str, threshold: float):
+        n = len(self.names)
+        empty = (np.empty(0, dtype=np.int64), np.empty(0))
+        if not n:
+            return empty
+
+        # Token overlap: shared query tokens / query tokens
+        q_tokens = set(query.split())
+        hits = [self._token_index[t] for t in q_tokens if t in self._token_index]
+        shared = np.bincount(np.concatenate(hits), minlength=n) if hits else np.zeros(n, dtype=np.int64)
+        overlap = shared / max(len(q_tokens), 1)
+
+        # Upper bound on ratio = 2 * M / (len_a + len_b), with M <= shared char counts
+        q_counts = np.zeros(self._char_counts.shape[1], dtype=np.int32)
+        for c in query:
+            j = self._char_column.get(c)
+            if j is not None:
+                q_counts[j] += 1
+        matches_ub = np.minimum(self._char_counts, q_counts).sum(axis=1)
+        ratio_ub = 2.0 * matches_ub / np.maximum(len(query) + self.lengths, 1)
+
+        # Candidates: names that share a token or could still reach the threshold
+        idx = np.flatnonzero((shared > 0) | (ratio_ub >= threshold))
+        if not idx.size:
+            return empty
+        ratio_ub = ratio_ub[idx]
+
+        scores = overlap[idx].copy()
+
+        # Exact ratio only where it could both reach the threshold and beat overlap
+        exact = np.flatnonzero((ratio_ub >= threshold) & (ratio_ub > scores))
+        for e in exact:
+            ratio = SequenceMatcher(None, query, self.names[idx[e]]).ratio()
+            if ratio > scores[e]:
+                scores[e] = ratio
+
+        return idx, scores
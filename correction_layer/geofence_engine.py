@@ -0,0 +1,375 @@
+# geofence_engine.py
+
+"""
+Compiled, vectorized geofence checks.
+
+A site's geofence rows are parsed once into NumPy arrays (circle centers
+and radii, rectangle bounds, polygon edge arrays, bounding boxes) and
+reused while the rows stay the same. Bounding boxes rule out most
+points before the exact circle / rectangle / ray-cast tests.
+
+Validation follows the first-fence rule (only fence 0 decides), so a
+spatial index over the other fences would never be consulted.
+"""
+
+import json
+import logging
+import math
+import threading
+from collections import OrderedDict
+from numbers import Real
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import GEOFENCE_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000
+_BBOX_PAD = 1e-9    # degrees; keeps boundary points out of float-rounding trouble
+
+
+def normalize_location(raw_loc) -> Optional[Tuple[float, float]]:
+    """
+    (lat, lon) for a waypoint location, or None if it is not a point.
+    Accepts {"lat", "lon"} dicts and [lon, lat] lists.
+    """
+    try:
+        if isinstance(raw_loc, dict):
+            return float(raw_loc.get("lat")), float(raw_loc.get("lon"))
+
+        if isinstance(raw_loc, (list, tuple)) and len(raw_loc) >= 2:
+            return float(raw_loc[1]), float(raw_loc[0])
+
+    except (TypeError, ValueError):
+        pass
+
+    return None
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, Real) and not isinstance(value, bool)
+
+
+class CompiledGeofences:
+    """
+    One site's geofences, compiled for batch point-in-fence tests.
+
+    Fences keep their original order; `kinds[j]` is the type of fence j.
+    Fences that cannot be evaluated (bad JSON, wrong shape) are left out,
+    as the row-by-row validator skipped malformed circles.
+    """
+
+    def __init__(self, geofences: Sequence[Dict]):
+        self.kinds: List[str] = []
+
+        circles, rects, polygons = [], [], []
+        bboxes = []     # per fence: min_lon, min_lat, max_lon, max_lat
+
+        for fence in geofences:
+            kind = str(fence.get("type", "")).lower()
+            try:
+                coords = fence.get("coordinates")
+                coords = json.loads(coords) if isinstance(coords, (str, bytes)) else coords
+                compiled = self._compile(kind, coords)
+            except (TypeError, ValueError, KeyError, IndexError) as e:
+                logger.warning(f"Skipping malformed {kind or 'unknown'} geofence: {e}")
+                continue
+
+            slot = len(self.kinds)
+            self.kinds.append(kind)
+
+            if kind == "circle":
+                circles.append((slot,) + compiled)
+                bboxes.append(self._circle_bbox(*compiled))
+            elif kind == "rectangle":
+                rects.append((slot,) + compiled)
+                west, east, south, north = compiled
+                bboxes.append((west, south, east, north))
+            elif kind == "polygon":
+                polygons.append((slot, compiled))
+                bboxes.append((
+                    compiled[:, 0].min(), compiled[:, 1].min(),
+                    compiled[:, 0].max(), compiled[:, 1].max(),
+                ))
+            else:
+                # Unknown types never reject a point
+                bboxes.append((-np.inf, -np.inf, np.inf, np.inf))
+
+        self.bboxes = np.array(bboxes, dtype=np.float64).reshape(-1, 4)
+        self._boxes = self.bboxes + np.array([-_BBOX_PAD, -_BBOX_PAD, _BBOX_PAD, _BBOX_PAD])
+
+        # Circles: slot, center (lon, lat) and radius in meters
+        circle_arr = np.array(circles, dtype=np.float64).reshape(-1, 4)
+        self._circle_slots = circle_arr[:, 0].astype(np.int64)
+        self._circle_lat = np.radians(circle_arr[:, 2])
+        self._circle_lon = np.radians(circle_arr[:, 1])
+        self._circle_radius = circle_arr[:, 3]
+        self._circle_row = self._rows_by_slot(self._circle_slots)
+
+        # Rectangles: slot, west, east, south, north
+        rect_arr = np.array(rects, dtype=np.float64).reshape(-1, 5)
+        self._rect_slots = rect_arr[:, 0].astype(np.int64)
+        self._rect_bounds = rect_arr[:, 1:]
+        self._rect_row = self._rows_by_slot(self._rect_slots)
+
+        # Polygons: closed edge lists, concatenated; `_edge_starts` marks each polygon
+        self._poly_slots = np.array([slot for slot, _ in polygons], dtype=np.int64)
+        edges = [np.hstack([ring, np.roll(ring, -1, axis=0)]) for _, ring in polygons]
+        self._edges = np.vstack(edges) if edges else np.empty((0, 4))
+        self._edge_starts = np.cumsum([0] + [len(ring) for _, ring in polygons[:-1]]).astype(np.int64)
+        self._edge_ends = self._edge_starts + np.array([len(ring) for _, ring in polygons], dtype=np.int64)
+        self._poly_row = self._rows_by_slot(self._poly_slots)
+
+        self._other_slots = np.array(
+            [j for j, k in enumerate(self.kinds) if k not in ("circle", "rectangle", "polygon")],
+            dtype=np.int64
+        )
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def _rows_by_slot(self, slots: np.ndarray) -> np.ndarray:
+        rows = np.full(len(self.kinds), -1, dtype=np.int64)
+        rows[slots] = np.arange(len(slots))
+        return rows
+
+    @staticmethod
+    def _circle_bbox(lon_c, lat_c, radius):
+        """Smallest lon/lat box around a circle (whole longitude range near poles or the antimeridian)."""
+        angle = radius / EARTH_RADIUS_M
+        dlat = math.degrees(angle)
+        south, north = lat_c - dlat, lat_c + dlat
+
+        ratio = math.sin(min(angle, math.pi / 2)) / max(math.cos(math.radians(lat_c)), 1e-12)
+        if angle >= math.pi / 2 or north >= 90 or south <= -90 or ratio >= 1:
+            return (-np.inf, south, np.inf, north)
+
+        dlon = math.degrees(math.asin(ratio))
+        if lon_c - dlon < -180 or lon_c + dlon > 180:
+            return (-np.inf, south, np.inf, north)
+        return (lon_c - dlon, south, lon_c + dlon, north)
+
+    @staticmethod
+    def _compile(kind: str, coords):
+        if kind == "circle":
+            lon_c, lat_c, radius = coords
+            if not all(_is_number(v) for v in (lon_c, lat_c, radius)):
+                raise ValueError("circle expects numeric [lon, lat, radius]")
+            return float(lon_c), float(lat_c), float(radius)
+
+        if kind == "rectangle":
+            return tuple(float(coords[k]) for k in ("west", "east", "south", "north"))
+
+        if kind == "polygon":
+            ring = np.array(coords, dtype=np.float64)
+            if ring.ndim != 2 or ring.shape[1] != 2 or not len(ring):
+                raise ValueError("polygon expects a list of [lon, lat]")
+            return ring
+
+        return None
+
+    # ---------------- Batch checks ---------------- #
+
+    def contains(self, points: Sequence[Tuple[float, float]]) -> np.ndarray:
+        """
+        Boolean matrix [point, fence]: True where the (lat, lon) point
+        lies inside the fence. Only fences whose bounding box holds the
+        point are tested exactly.
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        inside = np.zeros((len(pts), len(self.kinds)), dtype=bool)
+
+        in_box = self._in_bbox(pts[:, 0:1], pts[:, 1:2], np.arange(len(self.kinds)))
+        point_idx, fence_idx = np.nonzero(in_box)
+        hit = self._evaluate(pts, point_idx, fence_idx)
+        inside[point_idx[hit], fence_idx[hit]] = True
+
+        # Unknown fence types never reject a point
+        inside[:, self._other_slots] = True
+        return inside
+
+    def verdicts(self, points: Sequence[Tuple[float, float]]) -> np.ndarray:
+        """
+        Per-point validity, with the validator's rule: the first fence
+        decides (inside -> valid, outside -> invalid); no fences -> valid.
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if not self.kinds or self._other_slots[:1].tolist() == [0]:
+            return np.ones(len(pts), dtype=bool)
+
+        point_idx = np.flatnonzero(self._in_bbox(pts[:, 0], pts[:, 1], 0))
+        fence_idx = np.zeros(len(point_idx), dtype=np.int64)
+
+        valid = np.zeros(len(pts), dtype=bool)
+        valid[point_idx] = self._evaluate(pts, point_idx, fence_idx)
+        return valid
+
+    def legs_inside(self, starts, ends, fence: int = 0) -> np.ndarray:
+        """
+        Per leg (straight line from start to end, both (lat, lon)): True if
+        the whole leg stays inside `fence`. Circles and rectangles are
+        convex, so the endpoints decide; polygon legs are split at every
+        edge crossing and the midpoint of each piece is tested.
+        """
+        a = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+        b = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+        kind = self.kinds[fence] if fence < len(self.kinds) else None
+        if kind not in ("circle", "rectangle", "polygon"):
+            return np.ones(len(a), dtype=bool)
+
+        legs = np.arange(len(a))
+        fence_idx = np.full(len(a), fence, dtype=np.int64)
+        inside = self._evaluate(a, legs, fence_idx) & self._evaluate(b, legs, fence_idx)
+
+        if kind == "polygon" and inside.any():
+            legs = np.flatnonzero(inside)
+            inside[legs] = self._legs_in_polygon(a[legs], b[legs], self._poly_row[fence])
+
+        return inside
+
+    def first_leg_outside(self, starts, ends) -> Optional[int]:
+        """
+        Index of the first leg that leaves the deciding (first) fence, or
+        None if every leg is allowed. No fences -> every leg is allowed.
+        """
+        if not self.kinds:
+            return None
+
+        outside = np.flatnonzero(~self.legs_inside(starts, ends, 0))
+        return int(outside[0]) if outside.size else None
+
+    # ---------------- Geometry ---------------- #
+
+    def _in_bbox(self, lat, lon, fence_idx) -> np.ndarray:
+        west, south, east, north = self._boxes[fence_idx].T
+        return (west <= lon) & (lon <= east) & (south <= lat) & (lat <= north)
+
+    def _evaluate(self, pts: np.ndarray, point_idx: np.ndarray, fence_idx: np.ndarray) -> np.ndarray:
+        """Exact point-in-fence test for each (point, fence) pair."""
+        result = np.zeros(len(point_idx), dtype=bool)
+        if not len(point_idx):
+            return result
+
+        lat, lon = pts[point_idx, 0], pts[point_idx, 1]
+
+        rows = self._circle_row[fence_idx]
+        sel = rows >= 0
+        if sel.any():
+            result[sel] = self._in_circles(lat[sel], lon[sel], rows[sel])
+
+        rows = self._rect_row[fence_idx]
+        sel = rows >= 0
+        if sel.any():
+            west, east, south, north = self._rect_bounds[rows[sel]].T
+            result[sel] = (
+                (west <= lon[sel]) & (lon[sel] <= east)
+                & (south <= lat[sel]) & (lat[sel] <= north)
+            )
+
+        rows = self._poly_row[fence_idx]
+        for row in np.unique(rows[rows >= 0]):
+            sel = rows == row
+            result[sel] = self._in_polygon(lat[sel], lon[sel], row)
+
+        return result
+
+    def _in_circles(self, lat, lon, rows) -> np.ndarray:
+        """Haversine distance to each paired circle center <= its radius."""
+        lat1, lon1 = np.radians(lat), np.radians(lon)
+        lat2 = self._circle_lat[rows]
+
+        dlat = lat2 - lat1
+        dlon = self._circle_lon[rows] - lon1
+
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+        dist = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+        return dist <= self._circle_radius[rows]
+
+    def _in_polygon(self, lat, lon, row) -> np.ndarray:
+        """Ray casting of many points against one polygon's edges (x = lon, y = lat)."""
+        x, y = lon[:, None], lat[:, None]
+        p1x, p1y, p2x, p2y = self._edges[self._edge_starts[row]:self._edge_ends[row]].T
+
+        spans = (y > np.minimum(p1y, p2y)) & (y <= np.maximum(p1y, p2y)) & (x <= np.maximum(p1x, p2x))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
+
+        crossings = spans & ((p1x == p2x) | (x <= xinters))
+        return (crossings.sum(axis=1) % 2) == 1
+
+    def _legs_in_polygon(self, a: np.ndarray, b: np.ndarray, row) -> np.ndarray:
+        """
+        Legs whose endpoints are inside polygon `row`: a leg stays inside
+        if every piece between consecutive edge crossings has its midpoint
+        inside. All legs x edges are intersected at once.
+        """
+        # Work in (x = lon, y = lat)
+        px, py = a[:, 1:2], a[:, 0:1]
+        dx, dy = b[:, 1:2] - px, b[:, 0:1] - py
+        q1x, q1y, q2x, q2y = self._edges[self._edge_starts[row]:self._edge_ends[row]].T
+        ex, ey = q2x - q1x, q2y - q1y
+
+        # Leg P + t*d meets edge Q + u*e
+        denom = dx * ey - dy * ex
+        wx, wy = q1x - px, q1y - py
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (wx * ey - wy * ex) / denom
+            u = (wx * dy - wy * dx) / denom
+
+        hits = (denom != 0) & (t > 0) & (t < 1) & (u >= 0) & (u <= 1)
+        t = np.where(hits, t, np.nan)
+
+        # Piece boundaries per leg: 0, sorted crossings, 1 (NaN sorts last)
+        bounds = np.sort(np.hstack([np.zeros((len(a), 1)), t, np.ones((len(a), 1))]), axis=1)
+        lo, hi = bounds[:, :-1], bounds[:, 1:]
+        pieces = ~np.isnan(hi) & (hi - lo > 1e-12)
+
+        leg_idx, piece_idx = np.nonzero(pieces)
+        mid = (lo[leg_idx, piece_idx] + hi[leg_idx, piece_idx]) / 2
+        mid_lon = px[leg_idx, 0] + mid * dx[leg_idx, 0]
+        mid_lat = py[leg_idx, 0] + mid * dy[leg_idx, 0]
+
+        outside = ~self._in_polygon(mid_lat, mid_lon, row)
+        inside = np.ones(len(a), dtype=bool)
+        inside[leg_idx[outside]] = False
+        return inside
+
+
+# ---------------- Compiled cache ---------------- #
+
+_compiled = OrderedDict()   # fingerprint -> CompiledGeofences
+_compiled_lock = threading.Lock()
+
+
+def _fingerprint(geofences: Sequence[Dict]) -> tuple:
+    return tuple(
+        (
+            str(f.get("type", "")).lower(),
+            f.get("coordinates") if isinstance(f.get("coordinates"), (str, bytes))
+            else json.dumps(f.get("coordinates"), sort_keys=True, default=str),
+        )
+        for f in geofences
+    )
+
+
+def compile_geofences(geofences: Sequence[Dict]) -> CompiledGeofences:
+    """Compiled fences for these rows; reused while the rows are unchanged."""
+    key = _fingerprint(geofences)
+
+    with _compiled_lock:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+            return compiled
+
+    compiled = CompiledGeofences(geofences)
+
+    with _compiled_lock:
+        _compiled[key] = compiled
+        while len(_compiled) > GEOFENCE_CACHE_SIZE:
+            _compiled.popitem(last=False)
+
+    return compiled
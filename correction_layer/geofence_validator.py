@@ -1,11 +1,15 @@
 # geofence_validator.py
 
-import mysql.connector
+from database_layer import get_production_pool
 import math
-from typing import Dict
+import logging
+from typing import Dict, List
 from app.config import PROMPT_COMPLETION_DATABASE_CONFIG,PRODUCTION_DB_CONFIG
 #import psycopg
-import json
+from .geofence_engine import CompiledGeofences, compile_geofences, normalize_location
+
+logger = logging.getLogger(__name__)
+
 
 class GeofenceValidator:
 
@@ -29,13 +33,7 @@ class GeofenceValidator:
         #     host=self.host,
         #     port=self.port
         # )
-        return mysql.connector.connect(
-    database=self.dbname,
-    user=self.user,
-    password=self.password,
-    host=self.host,
-    port=self.port
-)
+        return get_production_pool().acquire()
 
     def fetch_geofences(self, site_id):
         conn = self.get_connection()
@@ -105,77 +103,82 @@ class GeofenceValidator:
 
     # ---------------- Main Validator ---------------- #
 
-    def validate(self, validated: Dict) -> Dict:
+    def compiled_geofences(self, site_id) -> CompiledGeofences:
+        """Site fences as NumPy arrays, recompiled only when the rows change."""
+        return compile_geofences(self.fetch_geofences(site_id))
+
+    def validate(self, validated: Dict, geofences: CompiledGeofences = None, check_legs: bool = False) -> Dict:
+        """
+        Clear the location of every waypoint outside the site's geofences.
+        With check_legs, path legs between consecutive valid waypoints are
+        checked too: the first leg leaving the fence is reported under
+        "geofence_violation" and its end waypoint is cleared, so the
+        human-in-loop step asks for a new location there.
+        """
 
-        site_id = validated["site_id"]
-        geofences = self.fetch_geofences(site_id)
+        if geofences is None:
+            geofences = self.compiled_geofences(validated["site_id"])
 
         waypoints = validated["model_for_extraction_json_output"].get("waypoints", [])
 
+        # -------- Normalize locations -------- #
+        checked, points = [], []
         for wp in waypoints:
-
             raw_loc = wp.get("location")
-            print("raw_loc:",raw_loc)
-            # -------- Normalize location -------- #
-            try:
-    # -------- Case 1: dict -------- #
-                if isinstance(raw_loc, dict):
-                    lat = float(raw_loc.get("lat"))
-                    lon = float(raw_loc.get("lon"))
-                    loc = (lat, lon)
-
-                # -------- Case 2: list/tuple -------- #
-                elif isinstance(raw_loc, (list, tuple)) and len(raw_loc) >= 2:
-                    lon = float(raw_loc[0])
-                    lat = float(raw_loc[1])
-                    loc = (lat, lon)
-
-                else:
-                    raise ValueError("Invalid location format")
-
-            except:
-                wp["location"] = []
-                continue
-            # -------- Basic validation -------- #
-            if not isinstance(loc, (list, tuple)) or len(loc) < 2:
-                wp["location"] = []
-                continue
-
-            valid = True
-
-            # -------- Check against all geofences -------- #
-            for fence in geofences:
+            logger.debug(f"raw_loc: {raw_loc}")
 
-                print('geofence:', fence)
-
-                ftype = fence["type"]
-                coords = json.loads(fence["coordinates"]) if isinstance(fence["coordinates"], str) else fence["coordinates"]
-
-                if ftype == "circle":
-                    try:
-                        lon_c, lat_c, radius = coords
-                        center = (lat_c, lon_c)
-
-                        if not self.point_in_circle(loc, center, radius):
-                            valid = False
-                    except:
-                        continue
-
-                elif ftype == "polygon":
-                    if not self.point_in_polygon(loc, coords):
-                        valid = False
-
-                elif ftype == "rectangle":
-                    if not self.point_in_rectangle(loc, coords):
-                        valid = False
-
-                if valid:
-                    break
-
-            # -------- Final decision -------- #
-            if not valid:
+            loc = normalize_location(raw_loc)
+            if loc is None:
                 wp["location"] = []
+                continue
 
-            print("loc:", loc, "| valid:", valid)
-
-        return validated
\ No newline at end of file
+            checked.append(wp)
+            points.append(loc)
+
+        # -------- Check all waypoints against all geofences -------- #
+        if points:
+            verdicts = geofences.verdicts(points)
+
+            for wp, loc, valid in zip(checked, points, verdicts):
+                if not valid:
+                    wp["location"] = []
+                logger.debug(f"loc: {loc} | valid: {bool(valid)}")
+
+        if check_legs:
+            validated["geofence_violation"] = self.check_legs(waypoints, geofences)
+
+        return validated
+
+    def check_legs(self, waypoints: List[Dict], geofences: CompiledGeofences):
+        """First leg (between consecutive valid waypoints) that leaves the fence, or None."""
+        legs, starts, ends = [], [], []
+        prev = None
+        for i, wp in enumerate(waypoints):
+            loc = normalize_location(wp.get("location"))
+            if prev is not None and loc is not None:
+                legs.append((prev[0], i))
+                starts.append(prev[1])
+                ends.append(loc)
+            prev = (i, loc) if loc is not None else None
+
+        if not legs:
+            return None
+
+        leg = geofences.first_leg_outside(starts, ends)
+        if leg is None:
+            return None
+
+        start, end = legs[leg]
+        logger.info(f"Path leg {start} -> {end} leaves the geofence")
+        waypoints[end]["location"] = []
+        return {"leg": leg, "from_waypoint": start, "to_waypoint": end}
+
+    def validate_many(self, missions: List[Dict], check_legs: bool = False) -> List[Dict]:
+        """Validate many missions, compiling each site's fences once."""
+        by_site = {}
+        for mission in missions:
+            site_id = mission["site_id"]
+            if site_id not in by_site:
+                by_site[site_id] = self.compiled_geofences(site_id)
+            self.validate(mission, by_site[site_id], check_legs=check_legs)
+        return missions
@@ -0,0 +1,55 @@
+"""
+Database Layer
+- Process-wide pooled connections for the production DB
+- Versioned per-site annotation snapshots
+- Offloading blocking DB work from the event loop (with a dev-mode guard)
+- A shared, bounded worker pool for background jobs with load shedding
+- Client-generated record IDs and a batching write-behind queue
+- SQLite stand-in for the production schema (DB_BACKEND=sqlite)
+"""
+
+from .pool import (
+    ConnectionPool,
+    PooledConnection,
+    PoolTimeout,
+    get_production_pool,
+)
+from .ids import new_record_id
+from .write_behind import WriteBehindQueue, close_on_exit
+from .offload import (
+    LoopBlockingError,
+    check_off_loop,
+    loop_violations,
+    run_blocking,
+)
+from .worker_pool import BoundedWorkerPool, PoolRejected, get_background_pool
+from .sqlite_backend import connect_sqlite, seed_from_data_json
+from .site_snapshot import (
+    SiteSnapshot,
+    SiteSnapshotCache,
+    get_site_snapshot,
+    get_site_snapshot_cache,
+)
+
+__all__ = [
+    "ConnectionPool",
+    "PooledConnection",
+    "PoolTimeout",
+    "get_production_pool",
+    "SiteSnapshot",
+    "SiteSnapshotCache",
+    "get_site_snapshot",
+    "get_site_snapshot_cache",
+    "new_record_id",
+    "WriteBehindQueue",
+    "close_on_exit",
+    "connect_sqlite",
+    "seed_from_data_json",
+    "LoopBlockingError",
+    "check_off_loop",
+    "loop_violations",
+    "run_blocking",
+    "BoundedWorkerPool",
+    "PoolRejected",
+    "get_background_pool",
+]
@@ -0,0 +1,147 @@
+"""
+Client-generated record IDs.
+IDs are assigned before the row is written, so callers can hand them out
+without waiting for an INSERT round trip. Layout (53 bits, so the value
+stays exact as a JSON/JS number):
+
+    41 bits  milliseconds since 2024-01-01 UTC
+     6 bits  node id, unique among running processes
+     6 bits  sequence within the millisecond
+
+The node id is RECORD_ID_NODE when set. Otherwise each process claims a
+free one from MySQL with a named lock (GET_LOCK), held on a dedicated
+connection for as long as the process runs; the SQLite stand-in is a
+single local writer and uses node 0. The target `id` columns must be
+plain BIGINTs (database_layer/migrations/001_client_generated_ids.sql).
+"""
+
+import time
+import logging
+import threading
+from typing import Optional
+
+from app.config import DB_BACKEND, RECORD_ID_NODE, RECORD_ID_LEASE_PING
+
+logger = logging.getLogger(__name__)
+
+_EPOCH_MS = 1704067200000
+_NODE_BITS = 6
+_SEQ_BITS = 6
+_MAX_NODE = (1 << _NODE_BITS) - 1
+_LOCK_NAME = "argos_record_id_node_{}"
+
+_node: Optional[int] = None
+_lock = threading.Lock()
+_last_ms = -1
+_seq = 0
+
+
+def new_record_id() -> int:
+    global _last_ms, _seq
+
+    node = record_id_node()
+    with _lock:
+        now = int(time.time() * 1000) - _EPOCH_MS
+        if now < _last_ms:
+            now = _last_ms      # clock stepped back: stay monotonic
+
+        if now == _last_ms:
+            _seq = (_seq + 1) & ((1 << _SEQ_BITS) - 1)
+            if _seq == 0:
+                # Sequence exhausted for this millisecond
+                while now <= _last_ms:
+                    time.sleep(0.0001)
+                    now = int(time.time() * 1000) - _EPOCH_MS
+        else:
+            _seq = 0
+
+        _last_ms = now
+        return (now << (_NODE_BITS + _SEQ_BITS)) | (node << _SEQ_BITS) | _seq
+
+
+def record_id_node() -> int:
+    """This process's node id, resolved on first use."""
+    global _node
+
+    if _node is None:
+        with _lock:
+            if _node is None:
+                _node = _resolve_node()
+                logger.info(f"Record ID node: {_node}")
+
+    return _node
+
+
+def _resolve_node() -> int:
+    if RECORD_ID_NODE is not None:
+        if not 0 <= RECORD_ID_NODE <= _MAX_NODE:
+            raise ValueError(f"RECORD_ID_NODE must be between 0 and {_MAX_NODE}, got {RECORD_ID_NODE}")
+        return RECORD_ID_NODE
+
+    if DB_BACKEND == "sqlite":
+        return 0
+
+    return _NodeLease().claim()
+
+
+class _NodeLease:
+    """
+    A node id held as a MySQL named lock. MySQL frees the lock when the
+    holding connection ends, so a crashed process gives its node back; a
+    keep-alive thread stops the server from closing the idle connection.
+    """
+
+    def __init__(self):
+        self._conn = None
+        self._node = None
+
+    def claim(self) -> int:
+        from .pool import _connect_production
+
+        conn = _connect_production()
+        cursor = conn.cursor()
+        try:
+            for node in range(_MAX_NODE + 1):
+                cursor.execute("SELECT GET_LOCK(%s, 0)", (_LOCK_NAME.format(node),))
+                (acquired,) = cursor.fetchone()
+                if acquired == 1:
+                    self._conn, self._node = conn, node
+                    threading.Thread(target=self._keepalive, name="record-id-lease", daemon=True).start()
+                    return node
+        finally:
+            cursor.close()
+
+        conn.close()
+        raise RuntimeError(f"All {_MAX_NODE + 1} record ID nodes are held by other processes; "
+                           f"set RECORD_ID_NODE explicitly")
+
+    def _keepalive(self):
+        while True:
+            time.sleep(RECORD_ID_LEASE_PING)
+            try:
+                cursor = self._conn.cursor()
+                cursor.execute("SELECT IS_USED_LOCK(%s) = CONNECTION_ID()", (_LOCK_NAME.format(self._node),))
+                (held,) = cursor.fetchone()
+                cursor.close()
+                if held == 1:
+                    continue
+                error = "lock no longer held"
+            except Exception as e:
+                error = repr(e)
+
+            # The node may be claimed elsewhere now: claim a fresh one on next use
+            logger.error(f"Record ID node {self._node} lease lost ({error}), claiming a new node")
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            _release_node(self._node)
+            return
+
+
+def _release_node(node: int):
+    global _node
+
+    with _lock:
+        if _node == node:
+            _node = None
@@ -0,0 +1,19 @@
+-- Client-generated record IDs for prompt_conversations.
+--
+-- database_layer.ids.new_record_id() assigns 53-bit ids before the row is
+-- written (write-behind), so `id` must hold a BIGINT and must not rely on
+-- AUTO_INCREMENT.
+--
+-- REQUIRED DEPLOY STEP before setting PROMPT_CLIENT_IDS=1 (and
+-- PROMPT_WRITE_BEHIND=1) on any process. Both default to off; a process
+-- that has them on while `id` is still an INT logs an error and keeps
+-- AUTO_INCREMENT ids and direct writes.
+--
+-- Rows inserted earlier keep their small AUTO_INCREMENT ids; new ids start
+-- above 2^40 and cannot collide with them.
+
+ALTER TABLE prompt_conversations
+    MODIFY id BIGINT NOT NULL;
+
+-- Rollback (only while no id above 2^31 has been written):
+-- ALTER TABLE prompt_conversations MODIFY id INT NOT NULL AUTO_INCREMENT;
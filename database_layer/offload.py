@@ -0,0 +1,55 @@
+"""
+Keeping blocking DB work off the event loop.
+Async handlers hand MySQL / Neo4j work to `run_blocking`, which runs it
+on a worker thread. The data-access layer calls `check_off_loop` before
+any I/O; with LOOP_GUARD_MODE=warn|raise (dev) a call that still lands
+on the loop thread is logged or rejected.
+"""
+
+import asyncio
+import logging
+import threading
+from functools import partial
+
+from app.config import LOOP_GUARD_MODE
+
+logger = logging.getLogger(__name__)
+
+
+class LoopBlockingError(RuntimeError):
+    """Blocking DB I/O was attempted on the event loop thread."""
+
+
+_violations = 0
+_violations_lock = threading.Lock()
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on a worker thread and await its result."""
+    return await asyncio.to_thread(partial(func, *args, **kwargs))
+
+
+def check_off_loop(what: str, mode: str = None):
+    """Flag `what` if it is about to block a running event loop."""
+    global _violations
+
+    mode = LOOP_GUARD_MODE if mode is None else mode
+    if mode == "off":
+        return
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return      # worker thread or plain sync code: fine
+
+    with _violations_lock:
+        _violations += 1
+
+    message = f"Blocking {what} on the event loop thread; wrap it in run_blocking()"
+    if mode == "raise":
+        raise LoopBlockingError(message)
+    logger.warning(message, stack_info=True)
+
+
+def loop_violations() -> int:
+    return _violations
@@ -0,0 +1,305 @@
+"""
+Process-wide MySQL connection pool.
+Every production-DB accessor borrows from here instead of opening
+a fresh connection (TCP + auth handshake) per query.
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import mysql.connector
+from .offload import check_off_loop
+from app.config import (
+    DB_BACKEND,
+    SQLITE_DB_PATH,
+    PRODUCTION_DB_CONFIG,
+    PRODUCTION_DB_POOL_SIZE,
+    PRODUCTION_DB_POOL_TIMEOUT,
+    PRODUCTION_DB_POOL_PING_AFTER,
+    PRODUCTION_DB_POOL_MAX_LIFETIME,
+)
+from app.deadline import cap_timeout, check_cancelled
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the acquire timeout."""
+
+
+class _PoolEntry:
+    """A raw connection plus the bookkeeping the pool needs for it."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class PooledConnection:
+    """
+    Thin proxy around a borrowed connection.
+    close() hands the connection back to the pool instead of closing it,
+    so existing `conn = self.get_connection() ... conn.close()` code keeps working.
+    """
+
+    def __init__(self, pool: "ConnectionPool", entry: _PoolEntry):
+        self._pool = pool
+        self._entry = entry
+        self._acquired_at = time.monotonic()
+
+    def __getattr__(self, name):
+        entry = self.__dict__.get("_entry")
+        if entry is None:
+            raise AttributeError(f"Connection already returned to pool ({name})")
+        return getattr(entry.raw, name)
+
+    def cursor(self, *args, **kwargs):
+        return self.__getattr__("cursor")(*args, **kwargs)
+
+    def close(self):
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool._release(entry, time.monotonic() - self._acquired_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # Safety net for callers that drop the connection without close()
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe connection pool.
+
+    - At most `size` connections exist at once (idle + borrowed).
+    - acquire() blocks up to `timeout` seconds, then raises PoolTimeout.
+    - Connections idle longer than `ping_after` are pinged before reuse;
+      connections older than `max_lifetime` are recycled.
+    - stats() exposes acquire-wait and hold timings.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], object],
+        size: int = PRODUCTION_DB_POOL_SIZE,
+        timeout: float = PRODUCTION_DB_POOL_TIMEOUT,
+        ping_after: float = PRODUCTION_DB_POOL_PING_AFTER,
+        max_lifetime: float = PRODUCTION_DB_POOL_MAX_LIFETIME,
+        name: str = "pool",
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.max_lifetime = max_lifetime
+        self.name = name
+
+        self._idle = []          # LIFO: hottest connection is reused first
+        self._open = 0           # idle + borrowed
+        self._cond = threading.Condition()
+
+        self._stats = {
+            "acquired": 0,
+            "created": 0,
+            "reused": 0,
+            "discarded": 0,
+            "timeouts": 0,
+            "acquire_wait_ms_total": 0.0,
+            "acquire_wait_ms_max": 0.0,
+            "hold_ms_total": 0.0,
+            "hold_ms_max": 0.0,
+        }
+
+    # ---------------- Public ---------------- #
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        check_off_loop(f"{self.name} DB access")
+        check_cancelled()
+        # Never wait for a connection past the current mission's deadline
+        timeout = cap_timeout(self.timeout if timeout is None else timeout)
+        start = time.monotonic()
+        deadline = start + timeout
+
+        while True:
+            entry = None
+            create = False
+
+            with self._cond:
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"{self.name}: no connection available after {timeout:.2f}s "
+                            f"(size={self.size})"
+                        )
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    self._open += 1
+                    create = True
+
+            if create:
+                try:
+                    entry = _PoolEntry(self.factory())
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+                self._bump("created")
+            elif not self._is_healthy(entry):
+                self._discard(entry)
+                continue
+            else:
+                self._bump("reused")
+
+            waited_ms = (time.monotonic() - start) * 1000
+            with self._cond:
+                self._stats["acquired"] += 1
+                self._stats["acquire_wait_ms_total"] += waited_ms
+                self._stats["acquire_wait_ms_max"] = max(self._stats["acquire_wait_ms_max"], waited_ms)
+
+            return PooledConnection(self, entry)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """with pool.connection() as conn: ..."""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def stats(self) -> dict:
+        with self._cond:
+            s = dict(self._stats)
+            s["size"] = self.size
+            s["open"] = self._open
+            s["idle"] = len(self._idle)
+            s["in_use"] = self._open - len(self._idle)
+
+        acquired = s["acquired"] or 1
+        s["acquire_wait_ms_avg"] = round(s["acquire_wait_ms_total"] / acquired, 3)
+        s["hold_ms_avg"] = round(s["hold_ms_total"] / acquired, 3)
+        return s
+
+    def close_all(self):
+        """Close idle connections (borrowed ones are closed when returned)."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+
+        for entry in idle:
+            self._close_raw(entry)
+
+    # ---------------- Internal ---------------- #
+
+    def _release(self, entry: _PoolEntry, held_seconds: float):
+        held_ms = held_seconds * 1000
+        with self._cond:
+            self._stats["hold_ms_total"] += held_ms
+            self._stats["hold_ms_max"] = max(self._stats["hold_ms_max"], held_ms)
+
+        # End any implicit transaction so the next borrower sees fresh data
+        try:
+            entry.raw.rollback()
+        except Exception as e:
+            logger.warning(f"{self.name}: discarding connection on release: {e}")
+            self._discard(entry)
+            return
+
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def _is_healthy(self, entry: _PoolEntry) -> bool:
+        now = time.monotonic()
+
+        if now - entry.created_at > self.max_lifetime:
+            return False
+
+        if now - entry.last_used < self.ping_after:
+            return True
+
+        try:
+            ping = getattr(entry.raw, "ping", None)
+            if ping is not None:
+                ping(reconnect=False)
+            else:
+                entry.raw.cursor().execute("SELECT 1")
+            return True
+        except Exception as e:
+            logger.info(f"{self.name}: stale connection dropped: {e}")
+            return False
+
+    def _discard(self, entry: _PoolEntry):
+        self._close_raw(entry)
+        with self._cond:
+            self._open -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_raw(entry: _PoolEntry):
+        try:
+            entry.raw.close()
+        except Exception:
+            pass
+
+    def _bump(self, key: str):
+        with self._cond:
+            self._stats[key] += 1
+
+
+# ---------------- Production pool ---------------- #
+
+_production_pool: Optional[ConnectionPool] = None
+_production_lock = threading.Lock()
+
+
+def _connect_production():
+    if DB_BACKEND == "sqlite":
+        from .sqlite_backend import connect_sqlite
+        return connect_sqlite(SQLITE_DB_PATH)
+
+    return mysql.connector.connect(
+        database=PRODUCTION_DB_CONFIG["PRODUCTION_DB_NAME"],
+        user=PRODUCTION_DB_CONFIG["PRODUCTION_DB_USER"],
+        password=PRODUCTION_DB_CONFIG["PRODUCTION_DB_PASSWORD"],
+        host=PRODUCTION_DB_CONFIG["PRODUCTION_HOST"],
+        port=PRODUCTION_DB_CONFIG["PRODUCTION_PORT"],
+    )
+
+
+def get_production_pool() -> ConnectionPool:
+    """Lazily build the single pool shared by every production-DB accessor."""
+    global _production_pool
+
+    if _production_pool is None:
+        with _production_lock:
+            if _production_pool is None:
+                _production_pool = ConnectionPool(_connect_production, name="production")
+                logger.info(f"Production DB pool initialized "
+                            f"(backend={DB_BACKEND}, size={_production_pool.size})")
+
+    return _production_pool
@@ -0,0 +1,258 @@
+"""
+Per-site annotation snapshots.
+The `annotations` rows of a site are loaded once, parsed, and held in an
+LRU with TTL. A cheap version query decides whether a cached snapshot is
+still current, so every layer reads site locations from memory.
+"""
+
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from app.config import (
+    SITE_SNAPSHOT_CACHE_SIZE,
+    SITE_SNAPSHOT_TTL,
+    SITE_SNAPSHOT_VERSION_CHECK_INTERVAL,
+)
+from .pool import get_production_pool
+
+logger = logging.getLogger(__name__)
+
+
+class SiteSnapshot:
+    """Immutable, parsed view of one site's annotations."""
+
+    def __init__(self, site_id, version: str, rows: List[Dict]):
+        self.site_id = site_id
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.annotations = rows
+
+        # First row wins, same as the old `... LIMIT 1` lookups
+        self._by_lower = {}
+        for row in rows:
+            self._by_lower.setdefault(row["name_lower"], row)
+
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+
+    @property
+    def names(self) -> List[str]:
+        return [row["name"] for row in self.annotations]
+
+    @property
+    def names_lower(self) -> List[str]:
+        return [row["name_lower"] for row in self.annotations]
+
+    def find(self, name: str, org_id=None) -> Optional[Dict]:
+        """Case-insensitive lookup by annotation name."""
+        if not isinstance(name, str):
+            return None
+        row = self._by_lower.get(name.lower())
+        if row is None:
+            return None
+        if org_id is not None and str(row["org_id"]) != str(org_id):
+            return next(
+                (r for r in self.annotations
+                 if r["name_lower"] == row["name_lower"] and str(r["org_id"]) == str(org_id)),
+                None
+            )
+        return row
+
+    def for_org(self, org_id) -> List[Dict]:
+        return [row for row in self.annotations if str(row["org_id"]) == str(org_id)]
+
+    def derived(self, key: str, build: Callable[["SiteSnapshot"], object]):
+        """
+        Memoize a structure built from this snapshot (e.g. a search index).
+        It is dropped together with the snapshot when the site is reloaded.
+        """
+        with self._derived_lock:
+            if key not in self._derived:
+                self._derived[key] = build(self)
+            return self._derived[key]
+
+
+class SiteSnapshotCache:
+    """
+    LRU of SiteSnapshot objects.
+
+    - Entries older than `ttl` seconds are always reloaded.
+    - Otherwise, at most every `check_interval` seconds a version query
+      (row count + max id + max updated_at) decides whether to reload.
+    """
+
+    VERSION_QUERY = """
+        SELECT COUNT(*), MAX(id), MAX(updated_at)
+        FROM annotations
+        WHERE site_id=%s;
+    """
+    # Used when the table has no updated_at column
+    VERSION_QUERY_BASIC = """
+        SELECT COUNT(*), MAX(id)
+        FROM annotations
+        WHERE site_id=%s;
+    """
+    LOAD_QUERY = """
+        SELECT id, name, shape, geometry, height, organization_id
+        FROM annotations
+        WHERE site_id=%s;
+    """
+
+    def __init__(
+        self,
+        pool_getter=get_production_pool,
+        max_sites: int = SITE_SNAPSHOT_CACHE_SIZE,
+        ttl: float = SITE_SNAPSHOT_TTL,
+        check_interval: float = SITE_SNAPSHOT_VERSION_CHECK_INTERVAL,
+    ):
+        self.pool_getter = pool_getter
+        self.max_sites = max_sites
+        self.ttl = ttl
+        self.check_interval = check_interval
+
+        self._entries = OrderedDict()   # site_id -> (snapshot, last_checked)
+        self._lock = threading.Lock()
+        self._version_query = self.VERSION_QUERY
+        self._stats = {"hits": 0, "misses": 0, "reloads": 0, "version_checks": 0}
+
+    # ---------------- Public ---------------- #
+
+    def get(self, site_id) -> SiteSnapshot:
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._entries.get(site_id)
+            if cached is not None:
+                self._entries.move_to_end(site_id)
+
+        if cached is None:
+            self._bump("misses")
+            return self._load(site_id)
+
+        snapshot, last_checked = cached
+
+        if now - snapshot.loaded_at > self.ttl:
+            self._bump("reloads")
+            return self._load(site_id)
+
+        if now - last_checked < self.check_interval:
+            self._bump("hits")
+            return snapshot
+
+        self._bump("version_checks")
+        if self._fetch_version(site_id) != snapshot.version:
+            self._bump("reloads")
+            return self._load(site_id)
+
+        with self._lock:
+            if site_id in self._entries:
+                self._entries[site_id] = (snapshot, now)
+        self._bump("hits")
+        return snapshot
+
+    def invalidate(self, site_id=None):
+        with self._lock:
+            if site_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(site_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["sites"] = len(self._entries)
+        return s
+
+    # ---------------- Internal ---------------- #
+
+    def _fetch_version(self, site_id) -> str:
+        with self.pool_getter().connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self._version_query, (site_id,))
+            except Exception as e:
+                if self._version_query is self.VERSION_QUERY_BASIC:
+                    raise
+                logger.info(f"Falling back to basic annotation version query: {e}")
+                self._version_query = self.VERSION_QUERY_BASIC
+                conn.rollback()
+                cursor = conn.cursor()
+                cursor.execute(self._version_query, (site_id,))
+            row = cursor.fetchone()
+            cursor.close()
+
+        return ":".join(str(v) for v in (row or ()))
+
+    def _load(self, site_id) -> SiteSnapshot:
+        version = self._fetch_version(site_id)
+
+        with self.pool_getter().connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.LOAD_QUERY, (site_id,))
+            rows = cursor.fetchall()
+            cursor.close()
+
+        snapshot = SiteSnapshot(site_id, version, [self._parse_row(r) for r in rows])
+        logger.info(f"Loaded annotation snapshot for site {site_id}: "
+                    f"{len(rows)} rows, version {version}")
+
+        with self._lock:
+            self._entries[site_id] = (snapshot, time.monotonic())
+            self._entries.move_to_end(site_id)
+            while len(self._entries) > self.max_sites:
+                self._entries.popitem(last=False)
+
+        return snapshot
+
+    @staticmethod
+    def _parse_row(row) -> Dict:
+        # Imported here: correction_layer itself imports database_layer
+        from correction_layer.annotations_calculation import GeometryCenterCalculator
+
+        ann_id, name, shape, geometry_raw, height, org_id = row
+        name = name if isinstance(name, str) else str(name)
+
+        try:
+            geometry = json.loads(geometry_raw) if isinstance(geometry_raw, (str, bytes)) else geometry_raw
+        except (TypeError, ValueError):
+            geometry = None
+
+        parsed = {
+            "id": ann_id,
+            "name": name,
+            "name_lower": name.lower(),
+            "shape": shape,
+            "geometry": geometry,
+            "geometry_raw": geometry_raw,
+            "height": height,
+            "org_id": org_id,
+            "center": None,
+        }
+
+        try:
+            parsed["center"] = GeometryCenterCalculator.calculate(parsed)
+        except Exception:
+            pass
+
+        return parsed
+
+    def _bump(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+
+# ---------------- Shared cache ---------------- #
+
+_site_snapshots = SiteSnapshotCache()
+
+
+def get_site_snapshot(site_id) -> SiteSnapshot:
+    return _site_snapshots.get(site_id)
+
+
+def get_site_snapshot_cache() -> SiteSnapshotCache:
+    return _site_snapshots
@@ -0,0 +1,220 @@
+"""
+SQLite stand-in for the production schema.
+Implements the `annotations`, `geofences` and `prompt_conversations`
+tables closely enough for every accessor that goes through the pool, and
+seeds them from a `data.json` organization dump. Select it with
+DB_BACKEND=sqlite to run and profile the correction, grid and intent
+layers without a live MySQL.
+
+    python -m database_layer.sqlite_backend --data data.json --replicate 20
+"""
+
+import json
+import random
+import sqlite3
+import logging
+import argparse
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# MySQL accepts datetime parameters directly; make SQLite store them the same way
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(sep=" "))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS annotations (
+    id              INTEGER PRIMARY KEY,
+    site_id         INTEGER NOT NULL,
+    organization_id INTEGER NOT NULL,
+    section_id      INTEGER,
+    name            TEXT NOT NULL,
+    shape           TEXT NOT NULL,
+    geometry        TEXT NOT NULL,
+    height          REAL,
+    updated_at      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_annotations_site ON annotations (site_id);
+
+CREATE TABLE IF NOT EXISTS geofences (
+    id          INTEGER PRIMARY KEY,
+    site_id     INTEGER NOT NULL,
+    type        TEXT NOT NULL,
+    coordinates TEXT NOT NULL,
+    is_active   INTEGER NOT NULL DEFAULT 1,
+    deleted_at  TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_geofences_site ON geofences (site_id);
+
+CREATE TABLE IF NOT EXISTS prompt_conversations (
+    id              INTEGER PRIMARY KEY,
+    user_id         INTEGER,
+    status          TEXT,
+    initial_prompt  TEXT,
+    final_prompt    TEXT,
+    site_id         INTEGER,
+    organization_id INTEGER,
+    created_at      TEXT,
+    updated_at      TEXT,
+    ended_at        TEXT
+);
+"""
+
+
+class SqliteCursor:
+    """Cursor that accepts the MySQL `%s` paramstyle used across the repo."""
+
+    def __init__(self, raw: sqlite3.Cursor):
+        self._raw = raw
+
+    def execute(self, query: str, params=None):
+        self._raw.execute(query.replace("%s", "?"), tuple(params or ()))
+        return self
+
+    def executemany(self, query: str, seq_of_params):
+        self._raw.executemany(query.replace("%s", "?"), [tuple(p) for p in seq_of_params])
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._raw.close()
+
+
+class SqliteConnection:
+    """sqlite3 connection with the small mysql.connector surface the pool and accessors use."""
+
+    def __init__(self, raw: sqlite3.Connection):
+        self._raw = raw
+
+    def cursor(self, *args, **kwargs):
+        return SqliteCursor(self._raw.cursor())
+
+    def ping(self, reconnect: bool = False):
+        self._raw.execute("SELECT 1")
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+def connect_sqlite(path: str) -> SqliteConnection:
+    raw = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    raw.execute("PRAGMA journal_mode=WAL")
+    raw.executescript(SCHEMA)
+    return SqliteConnection(raw)
+
+
+# ---------------- Seeding ---------------- #
+
+def _jitter_geometry(shape: str, geometry: Dict, dlon: float, dlat: float) -> Dict:
+    """Copy of an annotation geometry shifted by (dlon, dlat) degrees."""
+    def move(p):
+        return [p[0] + dlon, p[1] + dlat] + list(p[2:])
+
+    moved = dict(geometry)
+    for key in ("hierarchy", "positions", "points"):
+        if key in moved:
+            moved[key] = [move(p) for p in moved[key]]
+    for key in ("center", "position"):
+        if key in moved:
+            moved[key] = move(moved[key])
+    if shape == "rectangle" and "west" in moved:
+        moved.update(
+            west=moved["west"] + dlon, east=moved["east"] + dlon,
+            south=moved["south"] + dlat, north=moved["north"] + dlat,
+        )
+    return moved
+
+
+def seed_from_data_json(
+    conn,
+    path: str = "data.json",
+    replicate: int = 1,
+    spread: float = 0.002,
+    seed: int = 0,
+) -> Dict[str, int]:
+    """
+    Load the organization in `path` into the local tables.
+
+    - every section annotation becomes an `annotations` row
+    - every section boundary becomes an active polygon `geofences` row
+    - replicate > 1 adds shifted copies ("<name> 2", ...) of each
+      annotation and boundary, to reach realistic table sizes
+    """
+    with open(path) as f:
+        data = json.load(f)
+
+    org = data.get("organization", data)
+    org_id = org.get("id") or data.get("organization_id")
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    annotations, geofences = [], []
+    next_id = 1
+
+    for site in org.get("sites", []):
+        for section in site.get("sections", []):
+            for copy_no in range(1, replicate + 1):
+                dlon = dlat = 0.0
+                if copy_no > 1:
+                    dlon, dlat = rng.uniform(-spread, spread), rng.uniform(-spread, spread)
+                suffix = "" if copy_no == 1 else f" {copy_no}"
+
+                for ann in section.get("annotations", []):
+                    geometry = _jitter_geometry(ann["shape"], ann["geometry"], dlon, dlat)
+                    annotations.append((
+                        next_id, site["id"], site.get("organization_id", org_id), section["id"],
+                        f"{ann['name']}{suffix}", ann["shape"], json.dumps(geometry),
+                        ann.get("height"), now,
+                    ))
+                    next_id += 1
+
+                boundary = section.get("boundary") or []
+                if len(boundary) >= 3:
+                    ring = [[p[0] + dlon, p[1] + dlat] for p in boundary]
+                    geofences.append((site["id"], "polygon", json.dumps(ring)))
+
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM annotations")
+    cursor.execute("DELETE FROM geofences")
+    cursor.executemany(
+        "INSERT INTO annotations (id, site_id, organization_id, section_id, name, shape, geometry, height, updated_at) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+        annotations
+    )
+    cursor.executemany(
+        "INSERT INTO geofences (site_id, type, coordinates) VALUES (%s, %s, %s)",
+        geofences
+    )
+    conn.commit()
+    cursor.close()
+
+    counts = {"annotations": len(annotations), "geofences": len(geofences)}
+    logger.info(f"Seeded local DB from {path}: {counts}")
+    return counts
+
+
+def main(argv: Optional[list] = None):
+    from app.config import SQLITE_DB_PATH
+
+    parser = argparse.ArgumentParser(description="Seed the local SQLite stand-in DB")
+    parser.add_argument("--data", default="data.json")
+    parser.add_argument("--path", default=SQLITE_DB_PATH)
+    parser.add_argument("--replicate", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    conn = connect_sqlite(args.path)
+    counts = seed_from_data_json(conn, args.data, replicate=args.replicate)
+    conn.close()
+    print(f"{args.path}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
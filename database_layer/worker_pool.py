@@ -0,0 +1,234 @@
+"""
+Shared, bounded pool for background work.
+Background jobs (parameter optimization, graph-history writes) take one
+of a fixed number of worker slots. While all slots are busy a job is
+deferred in a bounded queue; when the queue is full, or a deferred job
+waits too long, it is shed with PoolRejected so interactive work keeps
+the machine. stats() reports queue depth, active workers and rejections.
+"""
+
+import time
+import asyncio
+import atexit
+import contextvars
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional
+
+from app.config import (
+    BACKGROUND_POOL_WORKERS,
+    BACKGROUND_POOL_QUEUE,
+    BACKGROUND_POOL_QUEUE_TIMEOUT,
+)
+from app.deadline import cap_timeout
+
+logger = logging.getLogger(__name__)
+
+
+class PoolRejected(RuntimeError):
+    """Background work was shed: the pool and its queue are full."""
+
+
+class BoundedWorkerPool:
+    """
+    Fixed worker slots with a bounded admission queue.
+
+    - submit(fn, ...)   sync; returns a Future, runs fn on a pool thread
+    - arun(fn, ...)     async; awaits a blocking fn on a pool thread
+    - acall(fn, ...)    async; runs the coroutine fn(...) holding a slot
+    A slot is held until the job finishes, even if its awaiting caller is
+    cancelled, so the pool never runs more than `max_workers` jobs.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = BACKGROUND_POOL_WORKERS,
+        max_queue: int = BACKGROUND_POOL_QUEUE,
+        queue_timeout: Optional[float] = BACKGROUND_POOL_QUEUE_TIMEOUT,
+        name: str = "background",
+    ):
+        if max_workers < 1 or max_queue < 0:
+            raise ValueError("max_workers must be at least 1 and max_queue non-negative")
+
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.name = name
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._waiting = deque()
+        self._active = 0
+        self._closed = False
+
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "max_depth": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+
+    # ---------------- Public ---------------- #
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        admitted = self._admit()
+        result = Future()
+        context = contextvars.copy_context()
+
+        def start(_):
+            if admitted.cancelled():
+                result.cancel()
+                return
+            self._chain(self._executor.submit(context.run, fn, *args, **kwargs), result)
+
+        admitted.add_done_callback(start)
+        return result
+
+    async def arun(self, fn: Callable, *args, **kwargs):
+        await self._aacquire()
+        # Jobs see the caller's context variables (the mission deadline among them)
+        future = self._executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+        future.add_done_callback(self._finished)
+        return await asyncio.wrap_future(future)
+
+    async def acall(self, fn: Callable[..., Awaitable], *args, **kwargs):
+        await self._aacquire()
+        task = asyncio.ensure_future(fn(*args, **kwargs))
+        # Freed when the job has stopped; a cancelled caller cancels the job too
+        task.add_done_callback(self._finished)
+        return await task
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._waiting)
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["active"] = self._active
+            s["queued"] = len(self._waiting)
+
+        admitted = s["submitted"] - s["rejected"]
+        s["wait_ms_avg"] = round(s["wait_ms_total"] / admitted, 3) if admitted > 0 else 0.0
+        return s
+
+    def close(self, wait: bool = True):
+        with self._lock:
+            self._closed = True
+            waiting, self._waiting = list(self._waiting), deque()
+        for admitted, _ in waiting:
+            admitted.cancel()
+        self._executor.shutdown(wait=wait)
+
+    # ---------------- Internal ---------------- #
+
+    def _admit(self) -> Future:
+        """Future resolved once a slot is ours; PoolRejected if the queue is full."""
+        admitted = Future()
+        with self._lock:
+            self._stats["submitted"] += 1
+            if self._closed:
+                self._stats["rejected"] += 1
+                raise PoolRejected(f"{self.name} pool is closed")
+
+            if self._active < self.max_workers:
+                self._active += 1
+                admitted.set_running_or_notify_cancel()
+                admitted.set_result(0.0)
+                return admitted
+
+            if len(self._waiting) >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise PoolRejected(f"{self.name} pool saturated: {self._active} running, "
+                                   f"{len(self._waiting)} queued")
+
+            self._waiting.append((admitted, time.monotonic()))
+            self._stats["max_depth"] = max(self._stats["max_depth"], len(self._waiting))
+        return admitted
+
+    async def _aacquire(self):
+        admitted = self._admit()
+        timeout = cap_timeout(self.queue_timeout)
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(admitted), timeout)
+        except asyncio.TimeoutError:
+            self._abandon(admitted)
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise PoolRejected(f"{self.name} job waited more than {timeout:.2f}s for a worker")
+        except asyncio.CancelledError:
+            self._abandon(admitted)
+            raise
+
+    def _abandon(self, admitted: Future):
+        """
+        A waiter gave up. Under the lock, either withdraw its admission so
+        _release skips it, or, if _release already granted it (running,
+        possibly before the result is set), hand the slot on.
+        """
+        with self._lock:
+            granted = admitted.running() or (admitted.done() and not admitted.cancelled())
+            if not granted:
+                admitted.cancel()
+        if granted:
+            self._release()
+
+    def _finished(self, future):
+        with self._lock:
+            if future.cancelled() or future.exception() is not None:
+                self._stats["failed"] += 1
+            else:
+                self._stats["completed"] += 1
+        self._release()
+
+    def _chain(self, source: Future, target: Future):
+        def copy(done):
+            self._finished(done)
+            if done.cancelled():
+                target.cancel()
+            elif done.exception() is not None:
+                target.set_exception(done.exception())
+            else:
+                target.set_result(done.result())
+
+        source.add_done_callback(copy)
+
+    def _release(self):
+        """Hand the slot to the next deferred job, or free it."""
+        with self._lock:
+            while self._waiting:
+                admitted, queued_at = self._waiting.popleft()
+                if not admitted.set_running_or_notify_cancel():
+                    continue        # waiter gave up (cancelled or timed out)
+                waited_ms = (time.monotonic() - queued_at) * 1000
+                self._stats["wait_ms_total"] += waited_ms
+                self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], waited_ms)
+                break
+            else:
+                self._active -= 1
+                return
+
+        admitted.set_result(waited_ms)
+
+
+# ---------------- Shared pool ---------------- #
+
+_background_pool: Optional[BoundedWorkerPool] = None
+_background_pool_lock = threading.Lock()
+
+
+def get_background_pool() -> BoundedWorkerPool:
+    global _background_pool
+
+    if _background_pool is None:
+        with _background_pool_lock:
+            if _background_pool is None:
+                _background_pool = BoundedWorkerPool()
+                atexit.register(_background_pool.close, False)
+
+    return _background_pool
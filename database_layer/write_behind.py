@@ -0,0 +1,242 @@
+"""
+Write-behind queue.
+Callers enqueue writes and return immediately; a background thread
+drains the queue in batches and hands each batch to a flush function
+(which turns it into multi-row statements). Memory is bounded, pending
+writes are flushed on shutdown, and stats() reports depth and latency.
+Writes are applied in the order they were queued.
+"""
+
+import time
+import atexit
+import logging
+import threading
+from collections import deque
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """
+    Bounded queue of pending writes with a single flusher thread.
+
+    - put() blocks up to `put_timeout` seconds while the queue is full;
+      after that the caller flushes the oldest batches itself until there
+      is room, so nothing is lost and nothing jumps the queue.
+    - A batch is flushed when `batch_size` writes are pending or
+      `interval` seconds have passed since the first one arrived.
+    - A batch that still fails after `max_retries` attempts is flushed
+      one write at a time; only the writes that fail alone are dropped,
+      into dead_letters() (the newest `max_dead_letters` are kept).
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List], None],
+        max_pending: int = 10000,
+        batch_size: int = 200,
+        interval: float = 0.2,
+        put_timeout: float = 1.0,
+        max_retries: int = 3,
+        max_dead_letters: int = 1000,
+        name: str = "write-behind",
+    ):
+        if max_pending < 1 or batch_size < 1:
+            raise ValueError("max_pending and batch_size must be at least 1")
+
+        self.flush_fn = flush
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.interval = interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.name = name
+
+        self._pending = deque()
+        self._dead_letters = deque(maxlen=max_dead_letters)
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()     # one batch in flight at a time
+        self._in_flight = 0
+        self._closed = False
+        self._thread = None
+
+        self._stats = {
+            "enqueued": 0,
+            "flushed": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "dropped": 0,
+            "inline_flushes": 0,
+            "max_depth": 0,
+            "flush_ms_total": 0.0,
+            "flush_ms_max": 0.0,
+            "last_flush_ms": 0.0,
+        }
+
+    # ---------------- Public ---------------- #
+
+    def put(self, item):
+        deadline = time.monotonic() + self.put_timeout
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError(f"{self.name}: queue is closed")
+
+                self._ensure_thread()
+                while len(self._pending) >= self.max_pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                if len(self._pending) < self.max_pending:
+                    self._pending.append(item)
+                    self._stats["enqueued"] += 1
+                    self._stats["max_depth"] = max(self._stats["max_depth"], len(self._pending))
+                    self._cond.notify_all()
+                    return
+
+                self._stats["inline_flushes"] += 1
+
+            # Still full after waiting: flush the oldest batch ourselves
+            # (backpressure). Writing `item` directly would reorder it
+            # ahead of the writes already queued.
+            logger.warning(f"{self.name}: queue full, flushing a batch inline")
+            self._drain_once()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything queued so far. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._cond:
+                if not self._pending and not self._in_flight:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self._drain_once()
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Stop accepting writes and flush what is pending."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+
+        if not self.flush(timeout):
+            logger.error(f"{self.name}: {self.depth()} writes left unflushed at shutdown")
+
+    def dead_letters(self) -> List:
+        """Writes that failed on their own and were dropped, oldest first."""
+        with self._cond:
+            return list(self._dead_letters)
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def stats(self) -> dict:
+        with self._cond:
+            s = dict(self._stats)
+            s["depth"] = len(self._pending)
+            s["in_flight"] = self._in_flight
+            s["dead_letters"] = len(self._dead_letters)
+
+        batches = s["batches"] or 1
+        s["flush_ms_avg"] = round(s["flush_ms_total"] / batches, 3)
+        return s
+
+    # ---------------- Internal ---------------- #
+
+    def _ensure_thread(self):
+        # Called with self._cond held
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._worker, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._pending:
+                    return
+
+                # Give a batch time to fill unless it is already full
+                deadline = time.monotonic() + self.interval
+                while len(self._pending) < self.batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+            self._drain_once()
+
+    def _drain_once(self):
+        with self._flush_lock:
+            with self._cond:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                self._in_flight = len(batch)
+                self._cond.notify_all()     # room for blocked producers
+
+            try:
+                if batch:
+                    self._run_batch(batch)
+            finally:
+                with self._cond:
+                    self._in_flight = 0
+
+    def _run_batch(self, batch: List):
+        if self._attempt(batch, self.max_retries):
+            return
+        if len(batch) == 1:
+            self._dead_letter(batch)
+            return
+
+        # Find the bad writes: one at a time, so only they are lost
+        logger.error(f"{self.name}: batch of {len(batch)} writes keeps failing, "
+                     f"flushing them one at a time")
+        for item in batch:
+            if not self._attempt([item], 1):
+                self._dead_letter([item])
+
+    def _attempt(self, batch: List, attempts: int) -> bool:
+        for attempt in range(1, attempts + 1):
+            start = time.monotonic()
+            try:
+                self.flush_fn(batch)
+            except Exception as e:
+                with self._cond:
+                    self._stats["failed_batches"] += 1
+                logger.error(f"{self.name}: flush of {len(batch)} writes failed "
+                             f"(attempt {attempt}/{attempts}): {e}")
+                if attempt < attempts:
+                    time.sleep(min(0.05 * 2 ** attempt, 1.0))
+                continue
+
+            elapsed_ms = (time.monotonic() - start) * 1000
+            with self._cond:
+                self._stats["flushed"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["flush_ms_total"] += elapsed_ms
+                self._stats["flush_ms_max"] = max(self._stats["flush_ms_max"], elapsed_ms)
+                self._stats["last_flush_ms"] = elapsed_ms
+            return True
+
+        return False
+
+    def _dead_letter(self, batch: List):
+        with self._cond:
+            self._stats["dropped"] += len(batch)
+            self._dead_letters.extend(batch)
+        logger.error(f"{self.name}: dropped {batch!r} after {self.max_retries} attempts "
+                     f"(kept in dead letters)")
+
+
+def close_on_exit(queue: WriteBehindQueue) -> WriteBehindQueue:
+    """Register the queue to be flushed at interpreter shutdown."""
+    atexit.register(queue.close)
+    return queue
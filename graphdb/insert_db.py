@@ -1,5 +1,6 @@
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
+from database_layer import check_off_loop
 import os
 
 load_dotenv()
@@ -24,10 +25,12 @@ class Neo4jMissionDB:
 
     def initialize(self):
         """Run ONCE at startup"""
+        check_off_loop("Neo4j write")
         with self.driver.session() as session:
             session.execute_write(self._create_constraints)
 
     def insert_mission(self, data: dict):
+        check_off_loop("Neo4j write")
         with self.driver.session() as session:
             print("data:",data)
             session.execute_write(self._insert_core, data)
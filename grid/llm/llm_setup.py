@@ -1,7 +1,7 @@
-from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 # in llm_setup.py
 from grid.services.schema import MissionResponse
+from llm_layer import INTERACTIVE, get_llm_registry, get_llm_cache, llm_call
 
 load_dotenv()
 
@@ -9,11 +9,10 @@ load_dotenv()
 class LLMSetup:
 
     def __init__(self, system_prompt: str = ""):
-        self.llm = ChatOpenAI(
-            model="gpt-4.1-mini",
-            temperature=0
-        )
-        self.structured_llm = self.llm.with_structured_output(MissionResponse)
+        registry = get_llm_registry()
+        self.model = "gpt-4.1-mini"
+        self.llm = registry.chat(self.model, 0)
+        self.structured_llm = registry.chat(self.model, 0, schema=MissionResponse)
         self.system_prompt = system_prompt
 
     def generate(self, user_prompt: str) -> MissionResponse:
@@ -25,6 +24,9 @@ class LLMSetup:
 
         messages.append(("human", user_prompt))
 
-        response = self.structured_llm.invoke(messages)
+        response = get_llm_cache().call(
+            "grid", self.model, messages,
+            lambda: llm_call("grid", INTERACTIVE, self.structured_llm.invoke, messages)
+        )
 
         return response
\ No newline at end of file
@@ -1,6 +1,9 @@
 import json
 import re
 import math
+import hashlib
+
+from llm_layer import get_prompt_cache
 
 def _resolve_drone_and_camera(validated: dict) -> dict:
     data    = validated.get("data", {})
@@ -163,27 +166,34 @@ def _find_annotation_by_prompt(user_prompt: str, annotations: list) -> dict | No
         if ann["name"].lower() in prompt_lower:
             return ann
     return None
-def build_system_prompt(validated: dict) -> str:
+# Static instructions first: identical for every site, so the provider can cache this prefix
+GRID_INSTRUCTIONS = """
+You are a drone mission planning assistant.
+Your job is to fill the mission JSON using the site data and values provided below.
+Do NOT recalculate anything — use the pre-computed values exactly as given.
 
-    data    = validated.get("data", {})
-    org     = data.get("organization", {})
-    site_id = validated["site_id"]
-    site    = next((s for s in org.get("sites", []) if s["id"] == site_id), None)
+## Instructions
+1. Find the annotation the user is referring to by name
+2. Use its pre-computed area as grid_area
+3. Copy all pre-computed values into the correct JSON fields
+4. Fill takeoff_config and route_config with the same altitude and speed
 
-    drone_cam   = _resolve_drone_and_camera(validated)
-    annotations = _resolve_annotations(validated)
-    params      = _parse_flight_params(validated.get("user_prompt", ""))
+## STRICT Output Rules
+- waypoints                : always []
+- grid_config.points       : always []
+- total_distance           : 0
+- total_duration           : 0
+- type                     : "grid"
+- altitude_mode            : "AGL" unless user specifies
+- route_config.radius      : 2.0
+- grid_config.angle        : 0 unless user specifies
+- gimbal_settings.pitch    : -90
+- media_capture.mode       : "distance"
+- No null values — use schema defaults (0 for numerics, [] for lists)
+""".strip()
 
-    # Pre-compute mission params
-    computed = {}
-    if drone_cam and params["altitude_m"]:
-        computed = _precompute_mission_params(
-            drone_cam,
-            params["altitude_m"],
-            params["front_overlap"],
-            params["side_overlap"]
-        )
 
+def _site_block(site, site_id, drone_cam: dict, annotations: list) -> str:
     # Build annotation list with pre-computed areas
     location_lines = []
     for ann in annotations:
@@ -211,6 +221,50 @@ def build_system_prompt(validated: dict) -> str:
     else:
         drone_text = "No drone resolved for this site."
 
+    return f"""
+## Site: {site.get('name') if site else 'Unknown'} (ID: {site_id})
+
+## Drone and Camera (pre-resolved from site binding)
+{drone_text}
+
+---
+
+## Available Annotations
+{locations_text}
+""".strip()
+
+
+def build_system_prompt(validated: dict) -> str:
+
+    data    = validated.get("data", {})
+    org     = data.get("organization", {})
+    site_id = validated["site_id"]
+    site    = next((s for s in org.get("sites", []) if s["id"] == site_id), None)
+
+    drone_cam   = _resolve_drone_and_camera(validated)
+    annotations = _resolve_annotations(validated)
+    params      = _parse_flight_params(validated.get("user_prompt", ""))
+
+    # Pre-compute mission params
+    computed = {}
+    if drone_cam and params["altitude_m"]:
+        computed = _precompute_mission_params(
+            drone_cam,
+            params["altitude_m"],
+            params["front_overlap"],
+            params["side_overlap"]
+        )
+
+    # Site data comes from the request payload, so it is its own version
+    site_version = hashlib.sha256(
+        json.dumps([site, drone_cam], sort_keys=True, default=str).encode()
+    ).hexdigest()
+    site_text = get_prompt_cache().site_prompt(
+        "grid", site_id, org.get("id"),
+        lambda: _site_block(site, site_id, drone_cam, annotations),
+        version=site_version
+    )
+
     # Pre-computed block
     if computed:
         computed_text = f"""
@@ -232,47 +286,17 @@ speed                  = {drone_cam.get('max_speed', 8.0)} m/s
     else:
         computed_text = "## Flight Parameters\nNo altitude detected — ask user to specify altitude or GSD."
 
+    # Static instructions, then the cached site block, then this request's values
     return f"""
-You are a drone mission planning assistant.
-Your job is to fill the mission JSON using the values provided below.
-Do NOT recalculate anything — use the pre-computed values exactly as given.
+{GRID_INSTRUCTIONS}
 
 ---
 
-## Site: {site.get('name') if site else 'Unknown'} (ID: {site_id})
-
-## Drone and Camera (pre-resolved from site binding)
-{drone_text}
+{site_text}
 
 ---
 
 {computed_text}
-
----
-
-## Available Annotations
-{locations_text}
-
----
-
-## Instructions
-1. Find the annotation the user is referring to by name
-2. Use its pre-computed area as grid_area
-3. Copy all pre-computed values into the correct JSON fields
-4. Fill takeoff_config and route_config with the same altitude and speed
-
-## STRICT Output Rules
-- waypoints                : always []
-- grid_config.points       : always []
-- total_distance           : 0
-- total_duration           : 0
-- type                     : "grid"
-- altitude_mode            : "AGL" unless user specifies
-- route_config.radius      : 2.0
-- grid_config.angle        : 0 unless user specifies
-- gimbal_settings.pitch    : -90
-- media_capture.mode       : "distance"
-- No null values — use schema defaults (0 for numerics, [] for lists)
 """.strip()
 
 
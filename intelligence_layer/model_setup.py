@@ -1,4 +1,4 @@
-from langchain_openai import ChatOpenAI
+from llm_layer import get_llm_registry
 from langchain_core.prompts import ChatPromptTemplate
 from .intelligence_schema import Waypoint,MissionPlan
 import os
@@ -6,27 +6,20 @@ from dotenv import load_dotenv
 from intent_understanding.location_resolver import LocationResolver
 from .graphdb_validator import GraphValidator
 from .parameter_model_setup import optimize_parameters
+from llm_layer import BACKGROUND, get_llm_cache, get_prompt_cache, llm_call, site_version
 load_dotenv()
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0,
-    api_key=os.getenv("OPENAI_API_KEY")
-)
+MODEL = "gpt-4o-mini"
+llm = get_llm_registry().chat(MODEL, 0)
 
-structured_llm = llm.with_structured_output(MissionPlan)
-def extract_intent(user_prompt: str, org_id, site_id, user_id):
-    
-    resolver = LocationResolver()
-    data = resolver.resolve(site_id,user_id,org_id)
-
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", f"""
+structured_llm = get_llm_registry().chat(MODEL, 0, schema=MissionPlan)
+# Static instructions first: identical for every site, so the provider can cache this prefix
+INTENT_INSTRUCTIONS = """
 You are an intent extraction engine for drone missions.
 
 STRICT RULES:
 1. Extract waypoints in order.
 2. Location Extraction Rule:
-- Valid locations: {data}
+- Valid locations: the list under SITE LOCATIONS at the end of this prompt
 - Always map user input to closest valid location
 - Do not invent names
 - Return null if no match
@@ -37,29 +30,67 @@ STRICT RULES:
    IMAGE_CAPTURE_SINGLE, IMAGE_DISTANCE, IMAGE_INTERVAL,
    IMAGE_STOP, VIDEO_START, VIDEO_STOP
 5. Output must strictly follow JSON schema.
+"""
+
+
+def extract_intent(user_prompt: str, org_id, site_id, user_id):
+
+    def render():
+        resolver = LocationResolver()
+        data = resolver.resolve(site_id,user_id,org_id)
+        return ChatPromptTemplate.from_messages([
+            ("system", INTENT_INSTRUCTIONS + f"""
+SITE LOCATIONS:
+{data}
 """),
-        ("user", "{input}")
-    ])
+            ("user", "{input}")
+        ])
 
-    chain = prompt | structured_llm
-    return chain.invoke({"input": user_prompt})
+    # Rendered once per site snapshot version
+    prompt = get_prompt_cache().site_prompt(
+        "intelligence_intent", site_id, org_id, render, static_len=len(INTENT_INSTRUCTIONS)
+    )
 
-# ------------------ Test ------------------
-def add_to_json(validated):
-    result = extract_intent(
-        validated["prompt"],
-        validated["org_id"],
-        validated["site_id"],
-        validated["user_id"]
+    chain = prompt | structured_llm
+    return get_llm_cache().call(
+        "intelligence_intent",
+        MODEL,
+        prompt.format_messages(input=user_prompt),
+        lambda: llm_call("intelligence_intent", BACKGROUND, chain.invoke, {"input": user_prompt}),
+        version=site_version(site_id)
     )
-    waypoints_array = [
+
+def waypoints_from_extraction(json_output):
+    """(location, action types) per waypoint of a PromptToJsonConvert result."""
+    return [
         {
-            "location": wp.location,
-            "action": wp.action
+            "location": wp.get("location"),
+            "action": [a.get("type") for a in (wp.get("actions") or [])]
         }
-        for wp in result.waypoints
+        for wp in json_output.get("waypoints") or []
     ]
-    validated["result"]=waypoints_array
+
+# ------------------ Test ------------------
+def add_to_json(validated, waypoints=None):
+    """
+    Attach graph-history candidates per waypoint. `waypoints` reuses an
+    existing extraction; without it the intent is extracted here.
+    """
+    if waypoints is None:
+        result = extract_intent(
+            validated["prompt"],
+            validated["org_id"],
+            validated["site_id"],
+            validated["user_id"]
+        )
+        waypoints = [
+            {
+                "location": wp.location,
+                "action": wp.action
+            }
+            for wp in result.waypoints
+        ]
+    validated["result"]=waypoints
     
     
     validator = GraphValidator(uri="bolt://graph-db:7687",
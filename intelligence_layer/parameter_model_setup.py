@@ -1,17 +1,29 @@
-from openai import OpenAI
 import os
 import json
+import time
+import asyncio
+import logging
 from dotenv import load_dotenv
 from .actions_schema import ACTION_SCHEMA
-from app.config import ALLOWED_ACTIONS
+from app.config import (ALLOWED_ACTIONS,
+                        OPTIMIZER_LLM_BUDGET,
+                        OPTIMIZER_CALL_TIMEOUT,
+                        OPTIMIZER_MAX_CONCURRENCY)
+from app.deadline import cap_timeout
+from llm_layer import BACKGROUND, allm_call, get_llm_registry, llm_call, on_llm_loop, run_on_llm_loop
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
+
+client = get_llm_registry().openai()
 
 
 def extract_actions(user_prompt, location, all_locations):
     try:
-        response = client.chat.completions.create(
+        response = llm_call(
+            "optimizer",
+            BACKGROUND,
+            client.chat.completions.create,
             model="gpt-4o-mini",
             temperature=0,
             messages=[
@@ -55,7 +67,10 @@ Return JSON array of actions for "{location}" only."""
 
 def get_params(user_prompt, location, action, candidates):
     try:
-        response = client.chat.completions.create(
+        response = llm_call(
+            "optimizer",
+            BACKGROUND,
+            client.chat.completions.create,
             model="gpt-4o-mini",
             temperature=0,
             messages=[
@@ -101,15 +116,11 @@ Return: {{"speed": number, "altitude": number, "altitude_mode": string, "reason"
             "altitude_mode": fallback.get("altitude_mode", "AGL"),
             "reason":        "LLM unavailable — fallback to first candidate."
         }
-def extract_action_and_params(user_prompt, location, all_locations, candidates):
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            temperature=0,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"""
+def _action_and_params_messages(user_prompt, location, all_locations, candidates):
+    return [
+        {
+            "role": "system",
+            "content": f"""
 You are a drone mission planner.
 
 For a given location, extract:
@@ -131,33 +142,67 @@ Return ONLY JSON:
   "reason": string
 }}
 """
-                },
-                {
-                    "role": "user",
-                    "content": f"""
+        },
+        {
+            "role": "user",
+            "content": f"""
 PROMPT: {user_prompt}
 ALL LOCATIONS: {all_locations}
 TARGET LOCATION: {location}
 CANDIDATES: {candidates}
 """
-                }
-            ]
-        )
+        }
+    ]
 
-        raw = response.choices[0].message.content.strip()
-        raw = raw.replace("```json", "").replace("```", "").strip()
-        return json.loads(raw)
+
+def _fallback_action_and_params(candidates):
+    fallback = candidates[0] if candidates else {}
+    return {
+        "actions": [],
+        "speed": fallback.get("speed", 4),
+        "altitude": fallback.get("altitude", 40),
+        "altitude_mode": fallback.get("altitude_mode", "AGL"),
+        "reason": "Fallback"
+    }
+
+
+def _parse_action_and_params(response, candidates):
+    raw = response.choices[0].message.content.strip()
+    raw = raw.replace("```json", "").replace("```", "").strip()
+    # Keys the model left out come from the fallback
+    return {**_fallback_action_and_params(candidates), **json.loads(raw)}
+
+
+def extract_action_and_params(user_prompt, location, all_locations, candidates):
+    try:
+        response = llm_call(
+            "optimizer",
+            BACKGROUND,
+            client.chat.completions.create,
+            model="gpt-4o-mini",
+            temperature=0,
+            messages=_action_and_params_messages(user_prompt, location, all_locations, candidates)
+        )
+        return _parse_action_and_params(response, candidates)
 
     except Exception as e:
         print(f"⚠️ Combined LLM failed for '{location}': {e}")
-        fallback = candidates[0] if candidates else {}
-        return {
-            "actions": [],
-            "speed": fallback.get("speed", 4),
-            "altitude": fallback.get("altitude", 40),
-            "altitude_mode": fallback.get("altitude_mode", "AGL"),
-            "reason": "Fallback"
-        }
+        return _fallback_action_and_params(candidates)
+
+
+async def aextract_action_and_params(user_prompt, location, all_locations, candidates):
+    """Async extract_action_and_params on the shared async pool (run on the LLM loop)."""
+    response = await allm_call(
+        "optimizer",
+        BACKGROUND,
+        get_llm_registry().async_openai().chat.completions.create,
+        model="gpt-4o-mini",
+        temperature=0,
+        messages=_action_and_params_messages(user_prompt, location, all_locations, candidates)
+    )
+    return _parse_action_and_params(response, candidates)
+
+
 def build_actions(action_list):
     return [
         {"type": schema.get("type", name), "params": schema.get("params")}
@@ -167,7 +212,58 @@ def build_actions(action_list):
 
 from collections import defaultdict
 
-def optimize_parameters(validated: dict) -> dict:
+async def _fan_out(
+    user_prompt,
+    unique_data,
+    all_locations,
+    max_concurrency: int = OPTIMIZER_MAX_CONCURRENCY,
+    call_timeout: float = OPTIMIZER_CALL_TIMEOUT,
+    budget: float = OPTIMIZER_LLM_BUDGET,
+):
+    """
+    Per-location LLM calls with a concurrency cap, a timeout per call and
+    an overall budget (never past the mission deadline). Returns one result
+    per location, in order; any call that fails or does not finish in time
+    gets the candidate fallback.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    deadline  = time.monotonic() + cap_timeout(budget)
+
+    async def one(item):
+        async with semaphore:
+            remaining = min(call_timeout, deadline - time.monotonic())
+            if remaining <= 0:
+                raise asyncio.TimeoutError("optimizer budget spent")
+            return await asyncio.wait_for(
+                aextract_action_and_params(
+                    user_prompt, item["location"]["location"], all_locations, item["value"]
+                ),
+                remaining
+            )
+
+    tasks = [asyncio.create_task(one(item)) for item in unique_data]
+    if tasks:
+        await asyncio.wait(tasks, timeout=max(deadline - time.monotonic(), 0))
+
+    results = []
+    for item, task in zip(unique_data, tasks):
+        location = item["location"]["location"]
+        if task.done() and not task.cancelled() and task.exception() is None:
+            results.append(task.result())
+            continue
+
+        if not task.done():
+            task.cancel()
+            reason = "budget exceeded"
+        else:
+            reason = repr(task.exception())
+        logger.warning(f"Optimizer LLM call for '{location}' fell back: {reason}")
+        results.append(_fallback_action_and_params(item["value"]))
+
+    return results
+
+
+def _unique_locations(validated: dict) -> list:
 
     # STEP 1: GROUP by location
     grouped = {}
@@ -191,7 +287,7 @@ def optimize_parameters(validated: dict) -> dict:
             grouped[loc]["actions"].add(action)
 
     # STEP 2: Convert grouped data back
-    unique_data = [
+    return [
         {
             "location": {
                 "location": v["location"],
@@ -203,24 +299,12 @@ def optimize_parameters(validated: dict) -> dict:
     ]
 
 
-    # STEP 3: Prepare all locations list
-    all_locations = [item["location"]["location"] for item in unique_data]
-
+def _apply_plan(validated: dict, unique_data: list, results: list) -> dict:
     final_plan = []
 
-    # STEP 4: Loop over UNIQUE locations only
-    for item in unique_data:
-        location   = item["location"]["location"]
-        candidates = item["value"]
-
-        result = extract_action_and_params(
-            validated["prompt"],
-            location,
-            all_locations,
-            candidates
-        )
-
-        action = result["actions"]
+    for item, result in zip(unique_data, results):
+        location = item["location"]["location"]
+        action   = result["actions"]
         best = result
 
         print(f"📍 {location} | 🎬 {action}")
@@ -241,6 +325,26 @@ def optimize_parameters(validated: dict) -> dict:
     return validated
 
 
+def optimize_parameters(validated: dict) -> dict:
+    unique_data = _unique_locations(validated)
+
+    # STEP 3: Prepare all locations list
+    all_locations = [item["location"]["location"] for item in unique_data]
+
+    # STEP 4: One LLM call per UNIQUE location, all in flight together
+    results = run_on_llm_loop(_fan_out(validated["prompt"], unique_data, all_locations))
+    return _apply_plan(validated, unique_data, results)
+
+
+async def aoptimize_parameters(validated: dict) -> dict:
+    """optimize_parameters for async callers."""
+    unique_data = _unique_locations(validated)
+    all_locations = [item["location"]["location"] for item in unique_data]
+
+    results = await on_llm_loop(_fan_out(validated["prompt"], unique_data, all_locations))
+    return _apply_plan(validated, unique_data, results)
+
+
 # if __name__ == "__main__":
 #     validated = {
 #         'org_id': 1, 'site_id': 1, 'user_id': 1,
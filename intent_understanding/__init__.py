@@ -1,9 +1,10 @@
 from .gps_calculator import GpsCalculation
 from .graph import build_app
 from .llm_setup import get_prompt
-from .main_intent import run_pipeline_intent
+from .main_intent import run_pipeline_intent, arun_pipeline_intent
 __all__=[
     GpsCalculation,
     build_app,
-    run_pipeline_intent
+    run_pipeline_intent,
+    arun_pipeline_intent
 ]
\ No newline at end of file
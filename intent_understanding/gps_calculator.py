@@ -1,6 +1,6 @@
 import math
 #import psycopg
-import mysql.connector
+from database_layer import get_production_pool, get_site_snapshot
 import logging
 from app.config import PROMPT_COMPLETION_DATABASE_CONFIG,PRODUCTION_DB_CONFIG
 from correction_layer.annotations_calculation import GeometryCenterCalculator
@@ -28,37 +28,21 @@ class ConnectToDb:
         #     host=self.host,
         #     port=self.port
         # )
-        return mysql.connector.connect(
-    database=self.dbname,
-    user=self.user,
-    password=self.password,
-    host=self.host,
-    port=self.port
-)
+        return get_production_pool().acquire()
 
 
     def get_annotation_row_by_name(self, site_id,org_id, name):
 
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT shape, geometry, height
-            FROM annotations
-            WHERE site_id=%s AND organization_id=%s AND name=%s 
-            LIMIT 1;
-        """, (site_id,org_id, name))
-
-        row = cursor.fetchone()
-        conn.close()
+        # Served from the in-memory site snapshot
+        row = get_site_snapshot(site_id).find(name, org_id)
 
         if not row:
             return None
 
         return {
-            "shape": row[0],
-            "geometry": row[1],
-            "height": row[2]
+            "shape": row["shape"],
+            "geometry": row["geometry"],
+            "height": row["height"]
         }
     def get_center_of_annotations(self,name,validated):
         site_id=validated["site_id"]
@@ -1,10 +1,11 @@
 from langgraph.graph import StateGraph, END
-from .nodes import State, generate, retry, decide
+from .nodes import State, agenerate, generate, retry, decide
 
-def build_app():
+def build_app(async_nodes: bool = False):
+    """`async_nodes` builds the graph for ainvoke: generation awaits the LLM."""
     graph = StateGraph(State)
 
-    graph.add_node("generate", generate)
+    graph.add_node("generate", agenerate if async_nodes else generate)
     graph.add_node("retry", retry)
 
     graph.set_entry_point("generate")
@@ -1,4 +1,4 @@
-from langchain_openai import ChatOpenAI
+from llm_layer import get_llm_registry, get_prompt_cache
 from langchain_core.prompts import ChatPromptTemplate
 from .schemas import MissionResponse
 import os
@@ -7,22 +7,16 @@ from .location_resolver import LocationResolver
 
 load_dotenv()
 
-llm = ChatOpenAI(
-    model="gpt-4o",
-    temperature=0,
-    api_key=os.getenv("OPENAI_API_KEY")
-)
+MODEL = "gpt-4o"
+llm = get_llm_registry().chat(MODEL, 0)
 
 # Structured output
-structured_llm = llm.with_structured_output(MissionResponse)
+structured_llm = get_llm_registry().chat(MODEL, 0, schema=MissionResponse)
 
 from .location_resolver import LocationResolver
 
-def get_prompt(org_id, site_id, user_id):
-    resolver = LocationResolver()
-    data = resolver.resolve(site_id, user_id,org_id)
-    print("data_from_intent:",data)
-    system_prompt = f"""
+# Static instructions first: identical for every site, so the provider can cache this prefix
+INTENT_INSTRUCTIONS = """
 You are an expert intent extractor for drone flight planning. Your job is to parse natural language instructions and convert them into structured JSON.
 
 ═══════════════════════════════════════════
@@ -107,7 +101,7 @@ WAYPOINT RULES
 ═══════════════════════════════════════════
 LOCATION MATCHING
 ═══════════════════════════════════════════
-23. Valid location names are restricted to this list: {data}
+23. Valid location names are restricted to the list under SITE LOCATIONS at the end of this prompt.
 
 24. Location matching — use this priority order:
 
@@ -214,7 +208,29 @@ EDGE CASES
 37. Use full field names at all times.
 38. takeoff_config must always be present in output even if all its fields are null.
 """
-    return ChatPromptTemplate.from_messages([
-    ("system", system_prompt),
-    ("human", "{input}")
-])
\ No newline at end of file
+
+
+def site_locations_block(data) -> str:
+    return f"""
+═══════════════════════════════════════════
+SITE LOCATIONS
+═══════════════════════════════════════════
+{data}
+"""
+
+
+def get_prompt(org_id, site_id, user_id):
+    def render():
+        resolver = LocationResolver()
+        data = resolver.resolve(site_id, user_id,org_id)
+        print("data_from_intent:",data)
+        system_prompt = INTENT_INSTRUCTIONS + site_locations_block(data)
+        return ChatPromptTemplate.from_messages([
+            ("system", system_prompt),
+            ("human", "{input}")
+        ])
+
+    # Rendered once per site snapshot version
+    return get_prompt_cache().site_prompt(
+        "intent", site_id, org_id, render, static_len=len(INTENT_INSTRUCTIONS)
+    )
\ No newline at end of file
@@ -1,7 +1,7 @@
 
 import json
 from app.config import PROMPT_COMPLETION_DATABASE_CONFIG,PRODUCTION_DB_CONFIG
-import mysql.connector
+from database_layer import get_site_snapshot_cache
 #import psycopg
 # -----------------------------
 # Logging Cursor (GLOBAL)
@@ -23,30 +23,13 @@ import mysql.connector
 
 class LocationResolver:
     def __init__(self):
-        #Apply logging globally
-        
-        # self.conn = psycopg.connect(
-        #     dbname=PROMPT_COMPLETION_DATABASE_CONFIG["DB_NAME"],
-        #     user=PROMPT_COMPLETION_DATABASE_CONFIG["DB_USER"],
-        #     password=PROMPT_COMPLETION_DATABASE_CONFIG["DB_PASSWORD"],
-        #     host=PROMPT_COMPLETION_DATABASE_CONFIG["DB_HOST"],
-        #     port=PROMPT_COMPLETION_DATABASE_CONFIG["DB_PORT"],
-        #     cursor_factory=LoggingCursor   #global logging
-        # )
-        
-        self.conn=mysql.connector.connect(
-            database = PRODUCTION_DB_CONFIG["PRODUCTION_DB_NAME"],
-        user = PRODUCTION_DB_CONFIG["PRODUCTION_DB_USER"],
-        password = PRODUCTION_DB_CONFIG["PRODUCTION_DB_PASSWORD"],
-        host = PRODUCTION_DB_CONFIG["PRODUCTION_HOST"],
-        port = PRODUCTION_DB_CONFIG["PRODUCTION_PORT"])
+        # Site annotations are read from the shared snapshot cache
+        self.snapshots = get_site_snapshot_cache()
 
     def resolve(self,site_id,user_id,org_id):
-        query = f"SELECT name FROM annotations where site_id={site_id} and organization_id={org_id};"
-
-        with self.conn.cursor() as cursor:
-            cursor.execute(query)
-            results = cursor.fetchall()
+        # Annotations of this site that belong to the organization
+        snapshot = self.snapshots.get(site_id)
+        results = [(row["name"],) for row in snapshot.for_org(org_id)]
 
         clean_list = [row[0] for row in results]
         # Optional: print first row
@@ -56,8 +39,8 @@ class LocationResolver:
         return results
 
     def close(self):
-        if self.conn:
-            self.conn.close()
+        # Nothing is held open; kept so existing callers still work
+        pass
 
 
 # if __name__ == "__main__":
@@ -9,10 +9,8 @@ import copy
 from graphdb import Neo4jMissionDB
 from mission_classifier_layer.model_selection import Selection
 
-def run_pipeline_intent(validated):
-    app = build_app()
-
-    result = app.invoke({
+def _initial_state(validated):
+    return {
     "input": validated["prompt"],
     "org_id": validated["org_id"],
     "site_id": validated["site_id"],
@@ -20,8 +18,10 @@ def run_pipeline_intent(validated):
     "retries": 0,
     "result": None,
     "error": None
-})
+}
 
+
+def _output(result):
     if result["result"] is not None:
         
         return result["result"].dict()
@@ -32,6 +32,17 @@ def run_pipeline_intent(validated):
         }
 
 
+def run_pipeline_intent(validated):
+    app = build_app()
+    return _output(app.invoke(_initial_state(validated)))
+
+
+async def arun_pipeline_intent(validated):
+    """run_pipeline_intent for async callers."""
+    app = build_app(async_nodes=True)
+    return _output(await app.ainvoke(_initial_state(validated)))
+
+
 # if __name__ == "__main__":
 
 #     prompt = "go to pallet ,move to north 200 m then turn right move 300 m,then go to equipment"
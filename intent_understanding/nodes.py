@@ -2,7 +2,11 @@ from typing import TypedDict, Optional
 from .schemas import MissionResponse
 from .validation_intent import validate_waypoints
 import traceback
-from .llm_setup import get_prompt, structured_llm
+from .llm_setup import MODEL, get_prompt, structured_llm
+from llm_layer import INTERACTIVE, allm_call, get_llm_cache, llm_call, site_version
+from database_layer import run_blocking
+from app.config import MISSION_RETRY_MIN_REMAINING
+from app.deadline import has_budget
 # -----------------------------
 # State Definition
 # -----------------------------
@@ -29,24 +33,48 @@ def generate(state: State) -> State:
 
     chain = prompt | structured_llm
     try:
-        result = chain.invoke({"input": state["input"]})
-        print("RAW LLM OUTPUT:", result)
+        result = get_llm_cache().call(
+            "intent",
+            MODEL,
+            prompt.format_messages(input=state["input"]),
+            # Checked before it is cached: a bad answer must not be replayed
+            lambda: _check(llm_call("intent", INTERACTIVE, chain.invoke, {"input": state["input"]})),
+            version=site_version(state["site_id"])
+        )
 
-        print("STEP 1: Before validation")
+        state["result"] = result
+        state["error"] = None
+
+    except Exception as e:
+        print("FINAL ERROR:", e)
+        state["error"] = str(e)
+
+    return state
+
+
+async def agenerate(state: State) -> State:
+    """generate() for the async graph: awaits the LLM, reads the DB on a worker thread."""
+    prompt = await run_blocking(
+        get_prompt,
+        state["org_id"],
+        state["site_id"],
+        state["user_id"]
+    )
+    version = await run_blocking(site_version, state["site_id"])
 
-        # Print every waypoint field before validation
-        for i, wp in enumerate(result.waypoints):
-            print(f"wp[{i}] type={repr(wp.type)} angle={repr(wp.angle_degrees)} dist={repr(wp.distance_meters)} loc={repr(wp.location)}")
+    chain = prompt | structured_llm
 
-        try:
-            validate_waypoints(result)
-            print("STEP 2: Validation passed")
-        except Exception as e:
-            print("FULL TRACEBACK:")
-            traceback.print_exc()
-            raise e
+    async def compute():
+        return _check(await allm_call("intent", INTERACTIVE, chain.ainvoke, {"input": state["input"]}))
 
-        print("STEP 3: After validation")
+    try:
+        result = await get_llm_cache().acall(
+            "intent",
+            MODEL,
+            prompt.format_messages(input=state["input"]),
+            compute,
+            version=version
+        )
 
         state["result"] = result
         state["error"] = None
@@ -58,6 +86,27 @@ def generate(state: State) -> State:
     return state
 
 
+def _check(result):
+    print("RAW LLM OUTPUT:", result)
+
+    print("STEP 1: Before validation")
+
+    # Print every waypoint field before validation
+    for i, wp in enumerate(result.waypoints):
+        print(f"wp[{i}] type={repr(wp.type)} angle={repr(wp.angle_degrees)} dist={repr(wp.distance_meters)} loc={repr(wp.location)}")
+
+    try:
+        validate_waypoints(result)
+        print("STEP 2: Validation passed")
+    except Exception as e:
+        print("FULL TRACEBACK:")
+        traceback.print_exc()
+        raise e
+
+    print("STEP 3: After validation")
+    return result
+
+
 # -----------------------------
 # Retry Node
 # -----------------------------
@@ -92,4 +141,8 @@ def decide(state: State):
     if state["retries"] >= MAX_RETRIES:
         return "fail"
 
+    # No time left in the mission for another LLM round trip
+    if not has_budget(MISSION_RETRY_MIN_REMAINING):
+        return "fail"
+
     return "retry"
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+LLM Layer
+- Process-wide registry of long-lived LLM clients and chains
+- One shared keep-alive HTTP pool for every client
+- Exact-match response cache keyed by stage, model, prompt and site version
+- Embedding-based semantic cache for near-duplicate prompts
+- A dedicated event loop for async LLM calls on the shared async pool
+- Process-wide rate / concurrency limiter with priority lanes
+- Per-stage deadlines and hedged requests (llm_call / allm_call)
+- Record / replay fixture backend for offline runs (LLM_BACKEND)
+- Per-site rendered prompt cache for prefix-cache-friendly prompts
+"""
+
+from .registry import LLMClientRegistry, get_llm_registry
+from .prompt_cache import SitePromptCache, get_prompt_cache
+from .response_cache import (
+    LLMResponseCache,
+    get_llm_cache,
+    render_prompt,
+    site_version,
+)
+from .fake_backend import (
+    FixtureMissing,
+    FixtureStore,
+    LatencyModel,
+    get_fixture_store,
+)
+from .hedging import (
+    HedgedCaller,
+    StageDeadlineExceeded,
+    allm_call,
+    get_llm_hedger,
+    llm_call,
+)
+from .limiter import (
+    BACKGROUND,
+    INTERACTIVE,
+    LLMLimiter,
+    LimiterTimeout,
+    get_llm_limiter,
+)
+from .loop import get_llm_loop, on_llm_loop, run_on_llm_loop, submit_to_llm_loop
+from .semantic_cache import (
+    HashingEmbedder,
+    OpenAIEmbedder,
+    SemanticCache,
+    get_semantic_cache,
+    normalize_prompt,
+)
+
+__all__ = [
+    "LLMClientRegistry",
+    "get_llm_registry",
+    "LLMResponseCache",
+    "get_llm_cache",
+    "render_prompt",
+    "site_version",
+    "HashingEmbedder",
+    "OpenAIEmbedder",
+    "SemanticCache",
+    "get_semantic_cache",
+    "normalize_prompt",
+    "get_llm_loop",
+    "on_llm_loop",
+    "run_on_llm_loop",
+    "submit_to_llm_loop",
+    "BACKGROUND",
+    "INTERACTIVE",
+    "LLMLimiter",
+    "LimiterTimeout",
+    "get_llm_limiter",
+    "HedgedCaller",
+    "StageDeadlineExceeded",
+    "allm_call",
+    "get_llm_hedger",
+    "llm_call",
+    "FixtureMissing",
+    "FixtureStore",
+    "LatencyModel",
+    "get_fixture_store",
+    "SitePromptCache",
+    "get_prompt_cache",
+]
@@ -0,0 +1,266 @@
+"""
+Record / replay LLM backend.
+`record` wraps the real clients and saves every answer as a fixture
+keyed by a hash of (model, output schema, rendered prompt). `replay`
+serves those fixtures with no network, including structured-output
+stages (MissionResponse, MissionPlan), after a simulated latency drawn
+from a seeded distribution, so throughput and concurrency changes can
+be measured reproducibly offline.
+"""
+
+import os
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from types import SimpleNamespace
+from typing import Optional
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable
+
+from app.config import LLM_FIXTURES_PATH, LLM_FAKE_LATENCY, LLM_FAKE_SEED
+from .response_cache import render_prompt
+
+logger = logging.getLogger(__name__)
+
+
+class FixtureMissing(KeyError):
+    """Replay found no recorded answer for a prompt."""
+
+
+def fixture_key(model: str, schema, prompt) -> str:
+    schema_name = getattr(schema, "__name__", schema) or ""
+    text = f"{model}\n{schema_name}\n{render_prompt(prompt)}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class FixtureStore:
+    """JSON file of recorded answers: key -> {model, schema, prompt, content, latency}."""
+
+    def __init__(self, path: str = LLM_FIXTURES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fixtures = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self._fixtures = json.load(f)
+
+    def __len__(self):
+        return len(self._fixtures)
+
+    def get(self, key: str) -> dict:
+        with self._lock:
+            fixture = self._fixtures.get(key)
+        if fixture is None:
+            raise FixtureMissing(f"No recorded LLM answer for {key} in {self.path}")
+        return fixture
+
+    def put(self, key: str, model: str, schema, prompt, content: str, latency: float):
+        with self._lock:
+            self._fixtures[key] = {
+                "model": model,
+                "schema": getattr(schema, "__name__", schema),
+                "prompt": render_prompt(prompt)[-300:],     # tail, for humans reading the file
+                "content": content,
+                "latency": round(latency, 4),
+            }
+            self._save()
+
+    def _save(self):
+        # Called with self._lock held
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._fixtures, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+class LatencyModel:
+    """
+    Seeded latency distribution for replayed calls.
+
+    none | recorded | fixed:S | uniform:A,B | lognormal:MEDIAN,SIGMA
+    """
+
+    def __init__(self, spec: str = LLM_FAKE_LATENCY, seed: int = LLM_FAKE_SEED):
+        self.spec = spec
+        kind, _, args = spec.partition(":")
+        self.kind = kind
+        self.args = [float(a) for a in args.split(",") if a]
+        if kind not in ("none", "recorded", "fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, recorded: float = 0.0) -> float:
+        if self.kind == "none":
+            return 0.0
+        if self.kind == "recorded":
+            return recorded or 0.0
+        if self.kind == "fixed":
+            return self.args[0]
+        with self._lock:
+            if self.kind == "uniform":
+                return self._rng.uniform(self.args[0], self.args[1])
+            return self._rng.lognormvariate(math.log(self.args[0]), self.args[1])
+
+
+def _parse(content: str, schema):
+    return schema.model_validate_json(content) if schema is not None else AIMessage(content=content)
+
+
+def _dump(output, schema) -> str:
+    if schema is not None:
+        return output.model_dump_json()
+    return output.content if hasattr(output, "content") else str(output)
+
+
+# ---------------- Chat models ---------------- #
+
+class ReplayChat(Runnable):
+    """Stands in for ChatOpenAI (schema=None) or its structured-output runnable."""
+
+    def __init__(self, store: FixtureStore, latency: LatencyModel, model: str, schema=None):
+        self.store = store
+        self.latency = latency
+        self.model = model
+        self.schema = schema
+
+    def _lookup(self, input):
+        fixture = self.store.get(fixture_key(self.model, self.schema, input))
+        return fixture, self.latency.sample(fixture.get("latency", 0.0))
+
+    def invoke(self, input, config=None, **kwargs):
+        fixture, delay = self._lookup(input)
+        time.sleep(delay)
+        return _parse(fixture["content"], self.schema)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        fixture, delay = self._lookup(input)
+        await asyncio.sleep(delay)
+        return _parse(fixture["content"], self.schema)
+
+
+class RecordingChat(Runnable):
+    """Passes calls to the real runnable and records each answer."""
+
+    def __init__(self, inner, store: FixtureStore, model: str, schema=None):
+        self.inner = inner
+        self.store = store
+        self.model = model
+        self.schema = schema
+
+    def invoke(self, input, config=None, **kwargs):
+        start = time.monotonic()
+        output = self.inner.invoke(input, config, **kwargs)
+        self._record(input, output, time.monotonic() - start)
+        return output
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        start = time.monotonic()
+        output = await self.inner.ainvoke(input, config, **kwargs)
+        self._record(input, output, time.monotonic() - start)
+        return output
+
+    def _record(self, input, output, latency):
+        key = fixture_key(self.model, self.schema, input)
+        self.store.put(key, self.model, self.schema, input, _dump(output, self.schema), latency)
+
+
+# ---------------- Raw OpenAI clients ---------------- #
+
+def _completion(content: str):
+    message = SimpleNamespace(role="assistant", content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")])
+
+
+def _embeddings(texts):
+    from .semantic_cache import HashingEmbedder
+
+    texts = [texts] if isinstance(texts, str) else list(texts)
+    vectors = HashingEmbedder().embed(texts)
+    return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=v.tolist()) for i, v in enumerate(vectors)])
+
+
+class ReplayOpenAI:
+    """
+    Stands in for OpenAI / AsyncOpenAI: chat.completions.create from
+    fixtures, embeddings from the offline hashing embedder.
+    """
+
+    def __init__(self, store: FixtureStore, latency: LatencyModel, is_async: bool = False):
+        self.store = store
+        self.latency = latency
+        self.is_async = is_async
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.embeddings = SimpleNamespace(create=self._embed)
+
+    def _create(self, model, messages, **kwargs):
+        fixture = self.store.get(fixture_key(model, None, messages))
+        delay = self.latency.sample(fixture.get("latency", 0.0))
+        return self._after(delay, _completion(fixture["content"]))
+
+    def _embed(self, model, input, **kwargs):
+        return self._after(0.0, _embeddings(input))
+
+    def _after(self, delay, value):
+        if not self.is_async:
+            time.sleep(delay)
+            return value
+
+        async def later():
+            await asyncio.sleep(delay)
+            return value
+        return later()
+
+
+class RecordingOpenAI:
+    """Wraps OpenAI / AsyncOpenAI and records chat completion answers."""
+
+    def __init__(self, inner, store: FixtureStore, is_async: bool = False):
+        self.inner = inner
+        self.store = store
+        self.is_async = is_async
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.embeddings = inner.embeddings
+
+    def _create(self, model, messages, **kwargs):
+        start = time.monotonic()
+        response = self.inner.chat.completions.create(model=model, messages=messages, **kwargs)
+        if not self.is_async:
+            self._record(model, messages, response, time.monotonic() - start)
+            return response
+
+        async def recorded():
+            result = await response
+            self._record(model, messages, result, time.monotonic() - start)
+            return result
+        return recorded()
+
+    def _record(self, model, messages, response, latency):
+        key = fixture_key(model, None, messages)
+        self.store.put(key, model, None, messages, response.choices[0].message.content, latency)
+
+
+# ---------------- Shared store ---------------- #
+
+_store: Optional[FixtureStore] = None
+_store_lock = threading.Lock()
+
+
+def get_fixture_store() -> FixtureStore:
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FixtureStore()
+
+    return _store
@@ -0,0 +1,297 @@
+"""
+Per-stage deadlines and hedged requests for LLM calls.
+Every call gets its stage's deadline (LLM_STAGE_DEADLINES), capped by
+what is left of the current mission's deadline. Once a stage
+has enough latency samples, a call still running at the stage's observed
+p95 gets one duplicate; whichever answers first wins. Hedge rate and
+hedge win rate are reported per stage.
+
+With a limiter lane, latency samples are service time only (measured
+once the limiter slot is held), and no duplicate is sent while other
+calls are queued for a slot: under overload a hedge would only join the
+same queue.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Callable, Optional
+
+from app.config import (
+    LLM_STAGE_DEADLINES,
+    LLM_DEFAULT_DEADLINE,
+    LLM_HEDGING_ENABLED,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_MIN_DELAY,
+    LLM_MAX_CONCURRENCY,
+)
+from app.deadline import cap_timeout, check_cancelled
+from .limiter import LLMLimiter, LimiterTimeout, get_llm_limiter
+from .loop import on_llm_loop
+from .prompt_cache import get_prompt_cache
+
+logger = logging.getLogger(__name__)
+
+
+class StageDeadlineExceeded(TimeoutError):
+    """An LLM call did not answer within its stage deadline."""
+
+
+class HedgedCaller:
+    """
+    Runs LLM calls with a stage deadline and optional hedging.
+
+    - call(stage, fn, ..., lane=None)   sync; runs fn on a worker thread.
+      A call that misses its deadline is abandoned (threads cannot be
+      interrupted): if it is still queued for a limiter slot it gives up
+      at the deadline, and one already running keeps its slot until the
+      request it sent finishes.
+    - acall(stage, fn, ..., lane=None)  async; fn returns a coroutine.
+      Losers and late calls are cancelled and free their slots.
+    With `lane`, each attempt takes a slot in that limiter lane.
+    """
+
+    def __init__(
+        self,
+        deadlines: Optional[dict] = None,
+        default_deadline: float = LLM_DEFAULT_DEADLINE,
+        hedging: bool = LLM_HEDGING_ENABLED,
+        percentile: float = LLM_HEDGE_PERCENTILE,
+        min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+        min_delay: float = LLM_HEDGE_MIN_DELAY,
+        window: int = 200,
+        max_workers: int = 2 * LLM_MAX_CONCURRENCY,
+        limiter: Optional[LLMLimiter] = None,
+    ):
+        self.deadlines = dict(LLM_STAGE_DEADLINES if deadlines is None else deadlines)
+        self.default_deadline = default_deadline
+        self.hedging = hedging
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.limiter = limiter
+
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+        self._stats = defaultdict(lambda: {
+            "calls": 0, "hedged": 0, "hedge_wins": 0, "hedges_held_back": 0,
+            "deadline_exceeded": 0, "errors": 0,
+        })
+
+    # ---------------- Public ---------------- #
+
+    def deadline_for(self, stage: str) -> float:
+        return self.deadlines.get(stage, self.default_deadline)
+
+    def hedge_delay(self, stage: str) -> Optional[float]:
+        """Seconds after which a duplicate is sent, or None if the stage is not hedged yet."""
+        if not self.hedging:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies[stage])
+        if len(samples) < self.min_samples:
+            return None
+        p = samples[int(round(self.percentile / 100 * (len(samples) - 1)))]
+        return max(p, self.min_delay)
+
+    def call(self, stage: str, fn: Callable, *args, lane: Optional[str] = None, **kwargs):
+        self._bump(stage, "calls")
+        deadline = self._deadline(stage)
+        end = time.monotonic() + deadline
+
+        primary = self._executor.submit(self._timed, stage, lane, end, fn, args, kwargs)
+        running = [primary]
+
+        delay = self.hedge_delay(stage)
+        if delay is not None and delay < deadline:
+            done, _ = wait(running, timeout=delay)
+            if not done and self._may_hedge(stage, lane):
+                self._bump(stage, "hedged")
+                running.append(self._executor.submit(self._timed, stage, lane, end, fn, args, kwargs))
+
+        first_error = None
+        while running:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                running.remove(future)
+                if future.exception() is None:
+                    if future is not primary:
+                        self._bump(stage, "hedge_wins")
+                    return future.result()
+                first_error = first_error or future.exception()
+
+        if first_error is not None and not running:
+            self._bump(stage, "errors")
+            raise first_error
+
+        self._bump(stage, "deadline_exceeded")
+        raise StageDeadlineExceeded(f"LLM call for {stage} exceeded its {deadline:.1f}s deadline")
+
+    async def acall(self, stage: str, fn: Callable, *args, lane: Optional[str] = None, **kwargs):
+        self._bump(stage, "calls")
+        deadline = self._deadline(stage)
+        end = time.monotonic() + deadline
+
+        async def timed():
+            try:
+                async with self._aslot(lane, end):
+                    start = time.monotonic()
+                    result = await fn(*args, **kwargs)
+                    self._record(stage, time.monotonic() - start)
+                    return result
+            except LimiterTimeout as e:
+                raise self._queue_timeout(stage, end, e) from e
+
+        primary = asyncio.ensure_future(timed())
+        running = {primary}
+
+        try:
+            delay = self.hedge_delay(stage)
+            if delay is not None and delay < deadline:
+                done, _ = await asyncio.wait(running, timeout=delay)
+                if not done and self._may_hedge(stage, lane):
+                    self._bump(stage, "hedged")
+                    running.add(asyncio.ensure_future(timed()))
+
+            first_error = None
+            while running:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, running = await asyncio.wait(running, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._bump(stage, "hedge_wins")
+                        return task.result()
+                    first_error = first_error or task.exception()
+
+            if first_error is not None and not running:
+                self._bump(stage, "errors")
+                raise first_error
+
+            self._bump(stage, "deadline_exceeded")
+            raise StageDeadlineExceeded(f"LLM call for {stage} exceeded its {deadline:.1f}s deadline")
+        finally:
+            for task in running:
+                task.cancel()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stages = {stage: dict(s) for stage, s in self._stats.items()}
+            latencies = {stage: sorted(l) for stage, l in self._latencies.items()}
+
+        for stage, s in stages.items():
+            samples = latencies.get(stage) or []
+            s["hedge_rate"] = round(s["hedged"] / s["calls"], 4) if s["calls"] else 0.0
+            s["hedge_win_rate"] = round(s["hedge_wins"] / s["hedged"], 4) if s["hedged"] else 0.0
+            s["p50_ms"] = round(samples[len(samples) // 2] * 1000, 1) if samples else None
+            s["p95_ms"] = round(samples[int(0.95 * (len(samples) - 1))] * 1000, 1) if samples else None
+            s["deadline_s"] = self.deadline_for(stage)
+        return stages
+
+    # ---------------- Internal ---------------- #
+
+    def _deadline(self, stage):
+        """Stage deadline, capped by the mission's; fails fast once the mission is out of time."""
+        check_cancelled()
+        deadline = cap_timeout(self.deadline_for(stage))
+        if deadline <= 0:
+            self._bump(stage, "deadline_exceeded")
+            raise StageDeadlineExceeded(f"LLM call for {stage} skipped: the mission deadline has passed")
+        return deadline
+
+    def _may_hedge(self, stage, lane) -> bool:
+        """No duplicate while calls are queued for a slot: it would only add to the queue."""
+        if lane is not None and self._limiter().queued() > 0:
+            self._bump(stage, "hedges_held_back")
+            return False
+        return True
+
+    def _limiter(self) -> LLMLimiter:
+        return self.limiter or get_llm_limiter()
+
+    def _slot(self, lane, end):
+        if lane is None:
+            return nullcontext()
+        # Stop queueing at the call's deadline: by then nobody waits for the answer
+        return self._limiter().slot(lane, timeout=max(end - time.monotonic(), 0))
+
+    def _aslot(self, lane, end):
+        if lane is None:
+            return nullcontext()
+        return self._limiter().aslot(lane, timeout=max(end - time.monotonic(), 0))
+
+    def _timed(self, stage, lane, end, fn, args, kwargs):
+        try:
+            with self._slot(lane, end):
+                if time.monotonic() >= end:
+                    # Granted after the caller gave up: hand the slot straight back
+                    raise StageDeadlineExceeded(f"LLM call for {stage} abandoned before it started")
+                start = time.monotonic()
+                result = fn(*args, **kwargs)
+                self._record(stage, time.monotonic() - start)
+                return result
+        except LimiterTimeout as e:
+            raise self._queue_timeout(stage, end, e) from e
+
+    @staticmethod
+    def _queue_timeout(stage, end, error):
+        """A slot wait cut short by the call's own deadline is a missed deadline."""
+        if time.monotonic() >= end:
+            return StageDeadlineExceeded(f"LLM call for {stage} still queued at its deadline")
+        return error
+
+    def _record(self, stage, seconds):
+        with self._lock:
+            self._latencies[stage].append(seconds)
+
+    def _bump(self, stage, key):
+        with self._lock:
+            self._stats[stage][key] += 1
+
+
+# ---------------- Shared caller ---------------- #
+
+_hedger: Optional[HedgedCaller] = None
+_hedger_lock = threading.Lock()
+
+
+def get_llm_hedger() -> HedgedCaller:
+    global _hedger
+
+    if _hedger is None:
+        with _hedger_lock:
+            if _hedger is None:
+                _hedger = HedgedCaller()
+
+    return _hedger
+
+
+def llm_call(stage: str, lane: str, fn: Callable, *args, **kwargs):
+    """One outbound LLM call: limiter slot in `lane`, `stage` deadline, hedging."""
+    result = get_llm_hedger().call(stage, fn, *args, lane=lane, **kwargs)
+    get_prompt_cache().record_usage(stage, result)
+    return result
+
+
+async def allm_call(stage: str, lane: str, fn: Callable, *args, **kwargs):
+    """
+    Async llm_call; `fn` returns a coroutine. It always runs on the LLM loop
+    (where the shared async HTTP pool lives), whichever loop awaits it.
+    """
+    async def call():
+        result = await get_llm_hedger().acall(stage, fn, *args, lane=lane, **kwargs)
+        get_prompt_cache().record_usage(stage, result)
+        return result
+
+    return await on_llm_loop(call())
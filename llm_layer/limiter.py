@@ -0,0 +1,292 @@
+"""
+Process-wide limiter for outbound LLM calls.
+A token bucket bounds the request rate and a counter bounds calls in
+flight. Waiting calls are served by priority lane: interactive work
+(completion check, classification, extraction) always goes before
+background work (parameter optimization). Queue wait is tracked per lane.
+Sync callers wait on a condition variable; async callers wait on a
+future of their own loop (no thread is held while queued). Both share
+the same lanes, and freed slots are handed out in lane order.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Optional
+
+from app.config import (
+    LLM_MAX_CONCURRENCY,
+    LLM_RATE_PER_SEC,
+    LLM_RATE_BURST,
+    LLM_QUEUE_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+LANES = (INTERACTIVE, BACKGROUND)    # highest priority first
+
+
+class LimiterTimeout(TimeoutError):
+    """No LLM slot became free within the queue timeout."""
+
+
+class _Ticket:
+    __slots__ = ("lane", "granted", "loop", "future")
+
+    def __init__(self, lane: str, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.lane = lane
+        self.granted = False
+        # Async waiters: woken through their own loop when granted
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+
+    def wake(self):
+        if self.future is not None:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class LLMLimiter:
+    """
+    Token bucket + concurrency cap with priority lanes.
+
+    - slot(lane) / run(lane, fn, ...)    for sync callers
+    - aslot(lane) / arun(lane, fn, ...)  for async callers; a cancelled
+      waiter gives its place (or its slot) back
+    - slot(lane, timeout) / aslot(lane, timeout) wait at most `timeout`
+      (never longer than the queue timeout)
+    - queued() / stats()                 waiters, and queue wait per lane
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = LLM_MAX_CONCURRENCY,
+        rate: float = LLM_RATE_PER_SEC,
+        burst: int = LLM_RATE_BURST,
+        queue_timeout: Optional[float] = LLM_QUEUE_TIMEOUT,
+        lanes=LANES,
+    ):
+        if max_concurrent < 1 or rate <= 0 or burst < 1:
+            raise ValueError("max_concurrent, rate and burst must be positive")
+
+        self.max_concurrent = max_concurrent
+        self.rate = rate
+        self.burst = burst
+        self.queue_timeout = queue_timeout
+        self.lanes = tuple(lanes)
+
+        self._cond = threading.Condition()
+        self._queues = {lane: deque() for lane in self.lanes}
+        self._active = 0
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+
+        self._stats = {
+            lane: {"calls": 0, "timeouts": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+            for lane in self.lanes
+        }
+
+    # ---------------- Public ---------------- #
+
+    @contextmanager
+    def slot(self, lane: str = INTERACTIVE, timeout: Optional[float] = None):
+        self._wait(_Ticket(self._check_lane(lane)), self._queue_timeout(timeout))
+        try:
+            yield
+        finally:
+            self.release()
+
+    def run(self, lane: str, fn: Callable, *args, **kwargs):
+        with self.slot(lane):
+            return fn(*args, **kwargs)
+
+    @asynccontextmanager
+    async def aslot(self, lane: str = INTERACTIVE, timeout: Optional[float] = None):
+        ticket = _Ticket(self._check_lane(lane), asyncio.get_running_loop())
+        try:
+            await self._await(ticket, self._queue_timeout(timeout))
+        except asyncio.CancelledError:
+            self._abandon(ticket)
+            raise
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def arun(self, lane: str, fn: Callable, *args, **kwargs):
+        async with self.aslot(lane):
+            return await fn(*args, **kwargs)
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._grant()
+
+    def queued(self) -> int:
+        """Calls waiting for a slot, all lanes."""
+        with self._cond:
+            return sum(len(q) for q in self._queues.values())
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill(time.monotonic())
+            lanes = {}
+            for lane, s in self._stats.items():
+                s = dict(s)
+                s["queued"] = len(self._queues[lane])
+                s["wait_ms_avg"] = round(s["wait_ms_total"] / s["calls"], 3) if s["calls"] else 0.0
+                lanes[lane] = s
+            return {"active": self._active, "tokens": round(self._tokens, 3), "lanes": lanes}
+
+    # ---------------- Internal ---------------- #
+
+    def _queue_timeout(self, timeout: Optional[float]) -> Optional[float]:
+        """The queue timeout, tightened to `timeout` when one is given."""
+        if timeout is None:
+            return self.queue_timeout
+        return timeout if self.queue_timeout is None else min(timeout, self.queue_timeout)
+
+    def _check_lane(self, lane: str) -> str:
+        if lane not in self._queues:
+            raise ValueError(f"Unknown LLM lane: {lane}")
+        return lane
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _next_in_line(self) -> Optional[_Ticket]:
+        for lane in self.lanes:
+            if self._queues[lane]:
+                return self._queues[lane][0]
+        return None
+
+    def _grant(self) -> Optional[float]:
+        """
+        Hand free slots to the waiters at the head of the lanes (self._cond
+        held). Returns the seconds until the next token when the bucket is
+        what holds the head waiter back, else None.
+        """
+        self._refill(time.monotonic())
+        pause = None
+
+        while self._active < self.max_concurrent:
+            ticket = self._next_in_line()
+            if ticket is None:
+                break
+            if self._tokens < 1:
+                pause = (1 - self._tokens) / self.rate
+                break
+            self._queues[ticket.lane].popleft()
+            self._tokens -= 1
+            self._active += 1
+            ticket.granted = True
+            try:
+                ticket.wake()
+            except RuntimeError:
+                # The waiter's loop is gone: nobody will use or release the slot
+                ticket.granted = False
+                self._active -= 1
+
+        self._cond.notify_all()
+        return pause
+
+    def _wait(self, ticket: _Ticket, timeout: Optional[float]):
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+
+        with self._cond:
+            self._queues[ticket.lane].append(ticket)
+            while True:
+                pause = self._grant()
+                if ticket.granted:
+                    break
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timed_out(ticket, timeout)
+                    pause = remaining if pause is None else min(pause, remaining)
+                self._cond.wait(pause)
+
+            self._record_wait(ticket, start)
+
+    async def _await(self, ticket: _Ticket, timeout: Optional[float]):
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+
+        with self._cond:
+            self._queues[ticket.lane].append(ticket)
+            pause = self._grant()
+
+        while True:
+            with self._cond:
+                if ticket.granted:
+                    self._record_wait(ticket, start)
+                    return
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timed_out(ticket, timeout)
+                    pause = remaining if pause is None else min(pause, remaining)
+
+            # Woken when granted; the timeout only re-checks tokens and the deadline
+            try:
+                await asyncio.wait_for(asyncio.shield(ticket.future), pause)
+            except asyncio.TimeoutError:
+                pass
+
+            with self._cond:
+                pause = None if ticket.granted else self._grant()
+
+    def _timed_out(self, ticket: _Ticket, timeout: Optional[float]):
+        # Called with self._cond held
+        self._queues[ticket.lane].remove(ticket)
+        self._stats[ticket.lane]["timeouts"] += 1
+        self._grant()
+        raise LimiterTimeout(f"No LLM slot for {ticket.lane} call within {timeout}s")
+
+    def _record_wait(self, ticket: _Ticket, start: float):
+        # Called with self._cond held
+        waited_ms = (time.monotonic() - start) * 1000
+        s = self._stats[ticket.lane]
+        s["calls"] += 1
+        s["wait_ms_total"] += waited_ms
+        s["wait_ms_max"] = max(s["wait_ms_max"], waited_ms)
+
+        if waited_ms > 1000:
+            logger.warning(f"LLM {ticket.lane} call waited {waited_ms:.0f} ms for a slot")
+
+    def _abandon(self, ticket: _Ticket):
+        with self._cond:
+            if ticket.granted:
+                # Granted just as the waiter was cancelled: hand the slot back
+                self._active -= 1
+            elif ticket in self._queues[ticket.lane]:
+                self._queues[ticket.lane].remove(ticket)
+            self._grant()
+
+
+# ---------------- Shared limiter ---------------- #
+
+_limiter: Optional[LLMLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_llm_limiter() -> LLMLimiter:
+    global _limiter
+
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = LLMLimiter()
+
+    return _limiter
@@ -0,0 +1,69 @@
+"""
+Dedicated event loop for async LLM calls.
+httpx async connections belong to the loop that opened them, so the
+shared async pool is only ever used from this one long-lived loop.
+Sync code blocks on run_on_llm_loop(); async code on any loop awaits
+on_llm_loop(coro). Submitted coroutines see the submitter's context
+variables (the mission deadline among them).
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Optional
+
+logger = logging.getLogger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_llm_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="llm-loop", daemon=True)
+                thread.start()
+                _loop = loop
+                logger.info("LLM event loop started")
+
+    return _loop
+
+
+def submit_to_llm_loop(coro: Awaitable) -> Future:
+    return asyncio.run_coroutine_threadsafe(_in_context(contextvars.copy_context(), coro), get_llm_loop())
+
+
+async def _in_context(context: contextvars.Context, coro: Awaitable):
+    # Tasks on the LLM loop start from that thread's context, not the submitter's
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+def run_on_llm_loop(coro: Awaitable, timeout: Optional[float] = None):
+    """Run `coro` on the LLM loop and wait for its result (from a non-loop thread)."""
+    future = submit_to_llm_loop(coro)
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        future.cancel()
+        raise
+
+
+async def on_llm_loop(coro: Awaitable):
+    """Await `coro` on the LLM loop from any event loop (directly when already on it)."""
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+
+    if running is get_llm_loop():
+        return await coro
+    # Cancelling the awaiting task cancels the coroutine on the LLM loop too
+    return await asyncio.wrap_future(submit_to_llm_loop(coro))
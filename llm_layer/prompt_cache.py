@@ -0,0 +1,158 @@
+"""
+Per-site rendered prompt cache.
+Long system prompts are laid out static-instructions-first with the
+site's data appended last, so the provider can reuse the cached prefix
+across sites. The rendered per-site prompt is memoized by site snapshot
+version. stats() reports render time, the static share of each prompt
+and, where responses carry usage, the provider's cached-token ratio.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Callable, Optional
+
+from .response_cache import site_version
+
+logger = logging.getLogger(__name__)
+
+
+class SitePromptCache:
+    """
+    LRU of rendered per-site prompts.
+
+    - site_prompt(name, site_id, org_id, render, static_len) renders once
+      per (name, site, org, snapshot version); without a version (no
+      snapshot available) it renders every time
+    - record_usage(stage, result) collects prompt / cached token counts
+      from AIMessage.usage_metadata or an OpenAI response's usage
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._prompts = defaultdict(lambda: {
+            "hits": 0, "renders": 0, "render_ms_total": 0.0, "static_ratio": None,
+        })
+        self._usage = defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+
+    # ---------------- Public ---------------- #
+
+    def site_prompt(
+        self,
+        name: str,
+        site_id,
+        org_id,
+        render: Callable[[], object],
+        static_len: int = 0,
+        version: Optional[str] = None,
+    ):
+        """
+        `version` defaults to the site's annotation snapshot version; pass
+        one explicitly when the site data comes from elsewhere.
+        """
+        if version is None:
+            version = site_version(site_id)
+        if version is None:
+            return self._render(name, render, static_len)
+
+        key = (name, site_id, org_id, version)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._prompts[name]["hits"] += 1
+                return self._entries[key]
+
+        prompt = self._render(name, render, static_len)
+
+        with self._lock:
+            self._entries[key] = prompt
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return prompt
+
+    def record_usage(self, stage: str, result):
+        prompt_tokens, cached_tokens = _usage_of(result)
+        if prompt_tokens is None:
+            return
+        with self._lock:
+            u = self._usage[stage]
+            u["calls"] += 1
+            u["prompt_tokens"] += prompt_tokens
+            u["cached_tokens"] += cached_tokens
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            prompts = {name: dict(s) for name, s in self._prompts.items()}
+            usage = {stage: dict(u) for stage, u in self._usage.items()}
+
+        for s in prompts.values():
+            s["render_ms_avg"] = round(s["render_ms_total"] / s["renders"], 3) if s["renders"] else 0.0
+        for u in usage.values():
+            u["cached_ratio"] = round(u["cached_tokens"] / u["prompt_tokens"], 4) if u["prompt_tokens"] else 0.0
+        return {"prompts": prompts, "usage": usage}
+
+    # ---------------- Internal ---------------- #
+
+    def _render(self, name, render, static_len):
+        start = time.monotonic()
+        prompt = render()
+        elapsed_ms = (time.monotonic() - start) * 1000
+
+        total_len = _text_length(prompt)
+        with self._lock:
+            s = self._prompts[name]
+            s["renders"] += 1
+            s["render_ms_total"] += elapsed_ms
+            if total_len:
+                s["static_ratio"] = round(static_len / total_len, 4)
+        return prompt
+
+
+def _text_length(prompt) -> int:
+    if isinstance(prompt, str):
+        return len(prompt)
+    messages = getattr(prompt, "messages", None)
+    if messages:
+        return sum(len(getattr(getattr(m, "prompt", None), "template", "") or getattr(m, "content", ""))
+                   for m in messages)
+    return 0
+
+
+def _usage_of(result):
+    """(prompt_tokens, cached_tokens) of an LLM result, or (None, 0) if it carries no usage."""
+    usage = getattr(result, "usage_metadata", None)
+    if usage:
+        details = usage.get("input_token_details") or {}
+        return usage.get("input_tokens", 0), details.get("cache_read", 0) or 0
+
+    usage = getattr(result, "usage", None)
+    if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        return usage.prompt_tokens, getattr(details, "cached_tokens", 0) or 0
+
+    return None, 0
+
+
+# ---------------- Shared cache ---------------- #
+
+_prompt_cache: Optional[SitePromptCache] = None
+_prompt_cache_lock = threading.Lock()
+
+
+def get_prompt_cache() -> SitePromptCache:
+    global _prompt_cache
+
+    if _prompt_cache is None:
+        with _prompt_cache_lock:
+            if _prompt_cache is None:
+                _prompt_cache = SitePromptCache()
+
+    return _prompt_cache
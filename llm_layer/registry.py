@@ -0,0 +1,176 @@
+"""
+Process-wide LLM client registry.
+Chat clients are keyed by (model, temperature, structured schema) and kept
+for the life of the process. Every client shares one keep-alive HTTP pool,
+so TLS and connection setup are paid once per host, not once per request.
+LLM_BACKEND=record / replay swaps in the fixture backend (fake_backend).
+"""
+
+import logging
+import threading
+from typing import Callable, Hashable, Optional
+
+import httpx
+from langchain_openai import ChatOpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from app.config import (
+    LLM_BACKEND,
+    OPENAI_API_KEY,
+    LLM_HTTP_MAX_CONNECTIONS,
+    LLM_HTTP_MAX_KEEPALIVE,
+    LLM_HTTP_TIMEOUT,
+)
+from . import fake_backend
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClientRegistry:
+    """
+    Hands out long-lived LLM clients and chains.
+
+    - chat(model, temperature, schema) -> ChatOpenAI, or its
+      with_structured_output(schema) runnable when a schema is given
+    - chain(key, build)                -> memoized prompt | llm | parser chains
+    - openai() / async_openai()        -> raw OpenAI clients on the same pool
+    - stats()                          -> created / reused counts
+    """
+
+    BACKENDS = ("openai", "record", "replay")
+
+    def __init__(
+        self,
+        api_key: Optional[str] = OPENAI_API_KEY,
+        max_connections: int = LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = LLM_HTTP_MAX_KEEPALIVE,
+        timeout: float = LLM_HTTP_TIMEOUT,
+        backend: str = LLM_BACKEND,
+        fixtures=None,
+        latency=None,
+    ):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown LLM backend: {backend}")
+
+        self.api_key = api_key
+        self.backend = backend
+        self._fixture_store = fixtures
+        self._latency = latency
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+        )
+        self._http_client = httpx.Client(limits=limits, timeout=timeout)
+        self._http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+
+        self._clients = {}
+        self._lock = threading.RLock()
+        self._stats = {"created": 0, "reused": 0}
+
+    # ---------------- Public ---------------- #
+
+    def chat(self, model: str, temperature: float = 0, schema=None, **kwargs):
+        key = ("chat", model, temperature, schema, tuple(sorted(kwargs.items())))
+
+        def build():
+            if self.backend == "replay":
+                return fake_backend.ReplayChat(self._fixtures(), self._latency_model(), model, schema)
+
+            if schema is not None:
+                # Structured clients wrap the plain client for the same model
+                base = self.chat(model, temperature, **kwargs)
+                if self.backend == "record":
+                    base = base.inner
+                client = base.with_structured_output(schema)
+            else:
+                options = dict(kwargs)
+                if self.api_key:
+                    options.setdefault("api_key", self.api_key)
+                client = ChatOpenAI(
+                    model=model,
+                    temperature=temperature,
+                    http_client=self._http_client,
+                    http_async_client=self._http_async_client,
+                    **options
+                )
+
+            if self.backend == "record":
+                client = fake_backend.RecordingChat(client, self._fixtures(), model, schema)
+            return client
+
+        return self._get(key, build)
+
+    def chain(self, key: Hashable, build: Callable[[], object]):
+        """Memoize a runnable (e.g. prompt | llm | parser) under `key`."""
+        return self._get(("chain", key), build)
+
+    def openai(self) -> OpenAI:
+        return self._get(("openai",), lambda: self._raw_client(is_async=False))
+
+    def async_openai(self) -> AsyncOpenAI:
+        return self._get(("async_openai",), lambda: self._raw_client(is_async=True))
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["clients"] = len(self._clients)
+        return s
+
+    def close(self):
+        with self._lock:
+            self._clients.clear()
+        self._http_client.close()
+
+    # ---------------- Internal ---------------- #
+
+    def _raw_client(self, is_async: bool):
+        if self.backend == "replay":
+            return fake_backend.ReplayOpenAI(self._fixtures(), self._latency_model(), is_async=is_async)
+
+        if is_async:
+            client = AsyncOpenAI(api_key=self.api_key or None, http_client=self._http_async_client)
+        else:
+            client = OpenAI(api_key=self.api_key or None, http_client=self._http_client)
+        if self.backend == "record":
+            client = fake_backend.RecordingOpenAI(client, self._fixtures(), is_async=is_async)
+        return client
+
+    def _fixtures(self):
+        if self._fixture_store is None:
+            self._fixture_store = fake_backend.get_fixture_store()
+        return self._fixture_store
+
+    def _latency_model(self):
+        if self._latency is None:
+            self._latency = fake_backend.LatencyModel()
+        return self._latency
+
+    def _get(self, key, build):
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._stats["reused"] += 1
+                return client
+
+            client = build()
+            self._clients[key] = client
+            self._stats["created"] += 1
+            logger.info(f"LLM client created: {key[:3]}")
+            return client
+
+
+# ---------------- Shared registry ---------------- #
+
+_registry: Optional[LLMClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_llm_registry() -> LLMClientRegistry:
+    global _registry
+
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = LLMClientRegistry()
+
+    return _registry
@@ -0,0 +1,276 @@
+"""
+Exact-match LLM response cache.
+Every pipeline stage runs at temperature 0, so the same rendered prompt
+sent to the same model gives the same answer. Responses are keyed by
+(stage, model, rendered prompt hash, site snapshot version) and kept in
+an LRU with TTL, optionally backed by a persistent SQLite tier. From
+async code (acall) the SQLite reads and commits run on a worker thread,
+never on the event loop.
+"""
+
+import copy
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Awaitable, Callable, Optional
+
+from app.config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_SIZE,
+    LLM_CACHE_TTL,
+    LLM_CACHE_DISK_PATH,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def render_prompt(prompt) -> str:
+    """Canonical text of a prompt: a string, a PromptValue, or a list of messages / (role, text) pairs."""
+    if isinstance(prompt, str):
+        return prompt
+    if hasattr(prompt, "to_string"):
+        return prompt.to_string()
+    if isinstance(prompt, (list, tuple)):
+        parts = []
+        for m in prompt:
+            if isinstance(m, (list, tuple)) and len(m) == 2:
+                parts.append(f"{m[0]}: {m[1]}")
+            elif hasattr(m, "content"):
+                parts.append(f"{getattr(m, 'type', type(m).__name__)}: {m.content}")
+            else:
+                parts.append(str(m))
+        return "\n".join(parts)
+    return json.dumps(prompt, sort_keys=True, default=str)
+
+
+def site_version(site_id) -> Optional[str]:
+    """Current annotation snapshot version of a site, or None if it cannot be read."""
+    # Imported here: the snapshot cache pulls in the DB pool
+    from database_layer import get_site_snapshot
+
+    try:
+        return get_site_snapshot(site_id).version
+    except Exception as e:
+        logger.warning(f"No snapshot version for site {site_id}, bypassing LLM cache: {e}")
+        return None
+
+
+class LLMResponseCache:
+    """
+    LRU + TTL cache of LLM responses.
+
+    - call(stage, model, prompt, compute, version) returns the cached
+      response or runs `compute` and stores its result
+    - version=None means freshness cannot be checked: the cache is bypassed
+    - disk_path adds a persistent tier that survives restarts
+    - stats() reports hits / misses per stage
+    """
+
+    def __init__(
+        self,
+        max_entries: int = LLM_CACHE_SIZE,
+        ttl: float = LLM_CACHE_TTL,
+        disk_path: Optional[str] = LLM_CACHE_DISK_PATH,
+        enabled: bool = LLM_CACHE_ENABLED,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+
+        self._entries = OrderedDict()   # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {
+            "hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "evictions": 0,
+        })
+
+        self._disk = None
+        self._disk_lock = threading.Lock()     # the SQLite tier, kept apart so disk I/O never stalls memory hits
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False, timeout=30)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                "key TEXT PRIMARY KEY, stage TEXT, stored_at REAL, value BLOB)"
+            )
+            self._disk.commit()
+
+    # ---------------- Public ---------------- #
+
+    @staticmethod
+    def make_key(stage: str, model: str, prompt, version: str = "") -> str:
+        digest = hashlib.sha256(render_prompt(prompt).encode("utf-8")).hexdigest()
+        return f"{stage}|{model}|{version}|{digest}"
+
+    def call(self, stage: str, model: str, prompt, compute: Callable[[], object], version: Optional[str] = ""):
+        if not self.enabled or version is None:
+            self._bump(stage, "bypassed")
+            return compute()
+
+        key = self.make_key(stage, model, prompt, version)
+        found, value = self.get(stage, key)
+        if found:
+            return value
+
+        value = compute()
+        self.put(stage, key, value)
+        return value
+
+    async def acall(self, stage: str, model: str, prompt, compute: Callable[[], Awaitable], version: Optional[str] = ""):
+        """call() for a `compute` that returns a coroutine."""
+        if not self.enabled or version is None:
+            self._bump(stage, "bypassed")
+            return await compute()
+
+        # Imported here: database_layer pulls in the DB pool
+        from database_layer import run_blocking
+
+        key = self.make_key(stage, model, prompt, version)
+        found, value = self._memory_get(stage, key, time.time())
+        if not found:
+            if self._disk is None:
+                found, value = self._disk_lookup(stage, key, time.time())     # only counts the miss
+            else:
+                # SQLite lookups and commits go to a worker thread
+                found, value = await run_blocking(self._disk_lookup, stage, key, time.time())
+        if found:
+            return value
+
+        value = await compute()
+        stored_at, value = self._store(stage, key, value)
+        if self._disk is not None:
+            await run_blocking(self._disk_put, stage, key, stored_at, value)
+        return value
+
+    def get(self, stage: str, key: str):
+        """(found, value). The value is a copy, so callers may mutate it."""
+        now = time.time()
+        found, value = self._memory_get(stage, key, now)
+        if found:
+            return found, value
+        return self._disk_lookup(stage, key, now)
+
+    def put(self, stage: str, key: str, value):
+        stored_at, value = self._store(stage, key, value)
+        self._disk_put(stage, key, stored_at, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._disk is not None:
+            with self._disk_lock:
+                self._disk.execute("DELETE FROM llm_responses")
+                self._disk.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stages = {stage: dict(s) for stage, s in self._stats.items()}
+            entries = len(self._entries)
+
+        totals = defaultdict(int)
+        for s in stages.values():
+            for k, v in s.items():
+                totals[k] += v
+        served = totals["hits"] + totals["disk_hits"]
+        lookups = served + totals["misses"]
+
+        return {
+            **totals,
+            "entries": entries,
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            "stages": stages,
+        }
+
+    # ---------------- Internal ---------------- #
+
+    def _memory_get(self, stage, key, now):
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                stored_at, value = cached
+                if now - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats[stage]["hits"] += 1
+                    return True, copy.deepcopy(value)
+                del self._entries[key]
+        return False, None
+
+    def _disk_lookup(self, stage, key, now):
+        stored = self._disk_get(key, now)
+        if stored is not None:
+            stored_at, value = stored
+            self._remember(stage, key, stored_at, value)
+            self._bump(stage, "disk_hits")
+            return True, copy.deepcopy(value)
+
+        self._bump(stage, "misses")
+        return False, None
+
+    def _store(self, stage, key, value):
+        stored_at = time.time()
+        value = copy.deepcopy(value)
+        self._remember(stage, key, stored_at, value)
+        self._bump(stage, "stores")
+        return stored_at, value
+
+    def _remember(self, stage, key, stored_at, value):
+        with self._lock:
+            self._entries[key] = (stored_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats[stage]["evictions"] += 1
+
+    def _disk_get(self, key, now):
+        if self._disk is None:
+            return None
+        with self._disk_lock:
+            row = self._disk.execute(
+                "SELECT stored_at, value FROM llm_responses WHERE key=?", (key,)
+            ).fetchone()
+        if row is None or now - row[0] > self.ttl:
+            return None
+        try:
+            return row[0], pickle.loads(row[1])
+        except Exception as e:
+            logger.warning(f"Unreadable LLM cache entry {key}: {e}")
+            return None
+
+    def _disk_put(self, stage, key, stored_at, value):
+        if self._disk is None:
+            return
+        try:
+            blob = pickle.dumps(value)
+        except Exception as e:
+            logger.warning(f"LLM response for {stage} not persisted: {e}")
+            return
+        with self._disk_lock:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, stage, stored_at, value) VALUES (?, ?, ?, ?)",
+                (key, stage, stored_at, blob)
+            )
+            self._disk.commit()
+
+    def _bump(self, stage, key):
+        with self._lock:
+            self._stats[stage][key] += 1
+
+
+# ---------------- Shared cache ---------------- #
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    global _llm_cache
+
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMResponseCache()
+
+    return _llm_cache
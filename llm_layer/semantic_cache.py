@@ -0,0 +1,391 @@
+"""
+Embedding-based semantic cache.
+Prompts are normalized and embedded (MODEL_FOR_EMBEDDING by default); a
+NumPy cosine search over the past prompts of the same stage, model and
+site finds near-duplicates. Above the similarity threshold, and when
+the numbers, the site's place names and the location words of both
+prompts match, the cached answer is reused instead of a chat completion.
+
+A prompt is embedded once: the completion check and the classification
+of the same turn share the vector (and a call still in flight).
+
+The embedder is pluggable: HashingEmbedder needs no network and stands
+in for the OpenAI embeddings offline and in tests.
+"""
+
+import re
+import copy
+import asyncio
+import time
+import zlib
+import logging
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, FrozenSet, List, Optional
+
+import numpy as np
+
+from app.deadline import cap_timeout
+from app.config import (
+    MODEL_FOR_EMBEDDING,
+    LLM_SEMANTIC_CACHE_ENABLED,
+    LLM_SEMANTIC_CACHE_THRESHOLD,
+    LLM_SEMANTIC_CACHE_MAX_PER_SITE,
+    LLM_SEMANTIC_EMBEDDER,
+)
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+_LOCATION_WORDS = frozenset({
+    "north", "south", "east", "west", "northeast", "northwest", "southeast", "southwest",
+    "left", "right", "front", "behind", "above", "below", "up", "down", "inside", "outside",
+})
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lower-case, punctuation-free, single-spaced form of a prompt."""
+    return " ".join(_WORD_RE.findall(prompt.lower()))
+
+
+def _numeric_signature(text: str) -> Counter:
+    # "hover 10 m", "hover 20 m" and "hover 10" embed almost identically but
+    # must not share an answer: numbers and the word after them have to match
+    tokens = text.split() + [""]
+    return Counter(
+        (t, tokens[i + 1]) for i, t in enumerate(tokens[:-1]) if any(c.isdigit() for c in t)
+    )
+
+
+def _location_signature(text: str) -> Counter:
+    # "the north tower" / "the south tower" and "gate b" / "gate c" differ in
+    # one short word, which barely moves the embedding
+    return Counter(
+        t for t in text.split()
+        if t in _LOCATION_WORDS or (len(t) == 1 and t.isalpha() and t not in ("a", "i"))
+    )
+
+
+def _signature(text: str, places: FrozenSet[str]) -> tuple:
+    """What two prompts must share, beyond similarity, to share an answer."""
+    return _numeric_signature(text), frozenset(places), _location_signature(text)
+
+
+def site_places(site_id, text: str) -> Optional[FrozenSet[str]]:
+    """Annotation names of the site found in a normalized prompt; None if the site cannot be read."""
+    # Imported here: the snapshot cache pulls in the DB pool
+    from database_layer import get_site_snapshot
+
+    if site_id is None:
+        return frozenset()
+    try:
+        snapshot = get_site_snapshot(site_id)
+    except Exception as e:
+        logger.warning(f"No annotations for site {site_id}, bypassing semantic cache: {e}")
+        return None
+
+    pattern = snapshot.derived("semantic_cache_places", _place_pattern)
+    return frozenset(pattern.findall(text)) if pattern is not None else frozenset()
+
+
+def _place_pattern(snapshot):
+    # Longest names first, so "gate a" is found whole rather than as "gate"
+    names = sorted({n for n in map(normalize_prompt, snapshot.names) if n}, key=len, reverse=True)
+    if not names:
+        return None
+    return re.compile(r"(?<![a-z0-9])(?:" + "|".join(map(re.escape, names)) + r")(?![a-z0-9])")
+
+
+# ---------------- Embedders ---------------- #
+
+class HashingEmbedder:
+    """Offline embedder: hashed word and character-trigram counts, L2-normalized."""
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = text.split()
+            padded = f" {text} "
+            features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+            for f in features:
+                out[row, zlib.crc32(f.encode("utf-8")) % self.dim] += 1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+class OpenAIEmbedder:
+    """OpenAI embeddings through the shared client registry."""
+
+    def __init__(self, model: str = MODEL_FOR_EMBEDDING):
+        self.model = model
+        self.name = model
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        from .hedging import llm_call
+        from .limiter import INTERACTIVE
+        from .registry import get_llm_registry
+
+        response = llm_call(
+            "embedding", INTERACTIVE, get_llm_registry().openai().embeddings.create, model=self.model, input=texts
+        )
+        out = np.array([item.embedding for item in response.data], dtype=np.float32)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+def make_embedder(kind: str = LLM_SEMANTIC_EMBEDDER):
+    if kind == "hashing":
+        return HashingEmbedder()
+    if kind == "openai":
+        return OpenAIEmbedder()
+    raise ValueError(f"Unknown embedder: {kind}")
+
+
+# ---------------- Cache ---------------- #
+
+class _Scope:
+    """Past prompts of one (stage, model, site): unit vectors + answers, as a ring buffer."""
+
+    def __init__(self, dim: int, capacity: int):
+        self.capacity = capacity
+        self.vectors = np.zeros((min(capacity, 64), dim), dtype=np.float32)
+        self.texts = []
+        self.signatures = []
+        self.values = []
+        self.next_slot = 0
+
+    def __len__(self):
+        return len(self.texts)
+
+    def nearest(self, vector: np.ndarray):
+        if not self.texts:
+            return None, -1.0
+        sims = self.vectors[:len(self.texts)] @ vector
+        best = int(np.argmax(sims))
+        return best, float(sims[best])
+
+    def add(self, text: str, signature: tuple, vector: np.ndarray, value):
+        if len(self.texts) < self.capacity:
+            slot = len(self.texts)
+            if slot == len(self.vectors):
+                grown = np.zeros((min(2 * slot, self.capacity), self.vectors.shape[1]), dtype=np.float32)
+                grown[:slot] = self.vectors
+                self.vectors = grown
+            self.texts.append(text)
+            self.signatures.append(signature)
+            self.values.append(value)
+        else:
+            # Full: overwrite the oldest entry
+            slot = self.next_slot
+            self.next_slot = (slot + 1) % self.capacity
+            self.texts[slot] = text
+            self.signatures[slot] = signature
+            self.values[slot] = value
+        self.vectors[slot] = vector
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour answer cache.
+
+    - call(stage, model, scope, prompt, compute) reuses the answer of the
+      most similar past prompt in the same (stage, model, scope) when
+      cosine similarity >= threshold and the numbers, place names and
+      location words in both prompts match; otherwise runs `compute` and
+      remembers its result
+    - find_places(scope, text) returns the scope's place names in a prompt
+      (default: the site's annotations), or None to bypass the cache
+    - the last max_embeddings prompt vectors are shared across stages
+    - embedder failures bypass the cache, they never fail the call
+    """
+
+    def __init__(
+        self,
+        embedder=None,
+        threshold: float = LLM_SEMANTIC_CACHE_THRESHOLD,
+        max_per_scope: int = LLM_SEMANTIC_CACHE_MAX_PER_SITE,
+        enabled: bool = LLM_SEMANTIC_CACHE_ENABLED,
+        find_places: Optional[Callable[[object, str], Optional[FrozenSet[str]]]] = None,
+        max_embeddings: int = 256,
+    ):
+        self.embedder = embedder or make_embedder()
+        self.threshold = threshold
+        self.max_per_scope = max_per_scope
+        self.enabled = enabled
+        self.find_places = find_places or site_places
+        self.max_embeddings = max_embeddings
+
+        self._scopes = {}
+        self._embeddings = OrderedDict()    # normalized prompt -> unit vector
+        self._embedding = {}                # normalized prompt -> Future of a call in flight
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {
+            "hits": 0, "misses": 0, "bypassed": 0, "embeds_reused": 0, "embed_ms_total": 0.0,
+        })
+
+    # ---------------- Public ---------------- #
+
+    def call(self, stage: str, model: str, scope, prompt: str, compute: Callable[[], object]):
+        if not self.enabled or not isinstance(prompt, str):
+            self._bump(stage, "bypassed")
+            return compute()
+
+        text = normalize_prompt(prompt)
+        prepared = self._prepare(stage, scope, text)
+        if prepared is None:
+            return compute()
+
+        vector, signature = prepared
+        found, value = self._lookup(stage, model, scope, vector, signature)
+        if found:
+            return value
+
+        value = compute()
+        self._store(stage, model, scope, text, signature, vector, value)
+        return value
+
+    async def acall(self, stage: str, model: str, scope, prompt: str, compute: Callable[[], Awaitable]):
+        """call() for a `compute` that returns a coroutine."""
+        if not self.enabled or not isinstance(prompt, str):
+            self._bump(stage, "bypassed")
+            return await compute()
+
+        text = normalize_prompt(prompt)
+        # The embedder and the place names may need the network / DB: keep them off the event loop
+        prepared = await asyncio.to_thread(self._prepare, stage, scope, text)
+        if prepared is None:
+            return await compute()
+
+        vector, signature = prepared
+        found, value = self._lookup(stage, model, scope, vector, signature)
+        if found:
+            return value
+
+        value = await compute()
+        self._store(stage, model, scope, text, signature, vector, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._scopes.clear()
+            self._embeddings.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stages = {stage: dict(s) for stage, s in self._stats.items()}
+            prompts = sum(len(s) for s in self._scopes.values())
+
+        hits = sum(s["hits"] for s in stages.values())
+        misses = sum(s["misses"] for s in stages.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "prompts": prompts,
+            "embedder": self.embedder.name,
+            "stages": stages,
+        }
+
+    # ---------------- Internal ---------------- #
+
+    def _prepare(self, stage, scope, text):
+        """(vector, signature) of a normalized prompt, or None to bypass the cache."""
+        places = self.find_places(scope, text)
+        if places is None:
+            self._bump(stage, "bypassed")
+            return None
+
+        vector = self._embed(stage, text)
+        if vector is None:
+            return None
+        return vector, _signature(text, places)
+
+    def _lookup(self, stage, model, scope, vector, signature):
+        key = (stage, model, scope)
+        with self._lock:
+            entries = self._scopes.get(key)
+            if entries is not None:
+                best, similarity = entries.nearest(vector)
+                if (best is not None and similarity >= self.threshold
+                        and entries.signatures[best] == signature):
+                    self._stats[stage]["hits"] += 1
+                    logger.info(f"Semantic cache hit for {stage} (similarity {similarity:.3f})")
+                    return True, copy.deepcopy(entries.values[best])
+            self._stats[stage]["misses"] += 1
+        return False, None
+
+    def _store(self, stage, model, scope, text, signature, vector, value):
+        key = (stage, model, scope)
+        with self._lock:
+            entries = self._scopes.get(key)
+            if entries is None:
+                entries = self._scopes[key] = _Scope(vector.shape[0], self.max_per_scope)
+            entries.add(text, signature, vector, copy.deepcopy(value))
+
+    def _embed(self, stage: str, text: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._embeddings.get(text)
+            if vector is not None:
+                self._embeddings.move_to_end(text)
+                self._stats[stage]["embeds_reused"] += 1
+                return vector
+            pending = self._embedding.get(text)
+            if pending is None:
+                pending = self._embedding[text] = Future()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            # Another stage is embedding the same prompt right now: share its call
+            try:
+                vector = pending.result(timeout=cap_timeout(None))
+            except Exception:
+                vector = None
+            self._bump(stage, "embeds_reused" if vector is not None else "bypassed")
+            return vector
+
+        start = time.monotonic()
+        vector = None
+        try:
+            vector = self.embedder.embed([text])[0]
+        except Exception as e:
+            logger.warning(f"Embedding failed, bypassing semantic cache for {stage}: {e}")
+            self._bump(stage, "bypassed")
+        finally:
+            with self._lock:
+                del self._embedding[text]
+                if vector is not None:
+                    self._embeddings[text] = vector
+                    while len(self._embeddings) > self.max_embeddings:
+                        self._embeddings.popitem(last=False)
+                    self._stats[stage]["embed_ms_total"] += (time.monotonic() - start) * 1000
+            pending.set_result(vector)
+        return vector
+
+    def _bump(self, stage, key):
+        with self._lock:
+            self._stats[stage][key] += 1
+
+
+# ---------------- Shared cache ---------------- #
+
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache:
+    global _semantic_cache
+
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache()
+
+    return _semantic_cache
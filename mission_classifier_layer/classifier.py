@@ -1,11 +1,11 @@
 from dataclasses import dataclass
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from app.config import (OPENAI_API_KEY,
 WORK_PATTERN_PROMPT,MODEL_FOR_CLASSIFICATION,
 TEMPERATURE_FOR_CLASSIFICATION)
 from typing import Dict,Any
+from llm_layer import INTERACTIVE, allm_call, get_llm_registry, get_llm_cache, get_semantic_cache, llm_call
 
 # data ={
 #         "user_id":1,
@@ -28,15 +28,15 @@ class Classifier:
     
 
     def build_work_pattern_chain(self):
-        llm=ChatOpenAI(
-            model=MODEL_FOR_CLASSIFICATION,
-            temperature=TEMPERATURE_FOR_CLASSIFICATION,
-            api_key=OPENAI_API_KEY
-        )
-        prompt=ChatPromptTemplate.from_template(WORK_PATTERN_PROMPT)
-        parser=JsonOutputParser()
-        chain =prompt| llm | parser
-        return chain
+        registry=get_llm_registry()
+
+        def build():
+            llm=registry.chat(MODEL_FOR_CLASSIFICATION,TEMPERATURE_FOR_CLASSIFICATION)
+            prompt=ChatPromptTemplate.from_template(WORK_PATTERN_PROMPT)
+            parser=JsonOutputParser()
+            return prompt| llm | parser
+
+        return registry.chain(("work_pattern",MODEL_FOR_CLASSIFICATION),build)
     
     def doctrine_classifier(self, work_pattern: str, mission_text: str) -> str:
         text = mission_text.lower()
@@ -95,10 +95,45 @@ class Classifier:
         chain = self.build_work_pattern_chain()
 
         # Step 1: LLM → work pattern
-        llm_result = chain.invoke({
-            "mission_text": mission_text
-        })
+        llm_result = get_llm_cache().call(
+            "work_pattern",
+            MODEL_FOR_CLASSIFICATION,
+            ChatPromptTemplate.from_template(WORK_PATTERN_PROMPT).format_messages(mission_text=mission_text),
+            lambda: get_semantic_cache().call(
+                "work_pattern", MODEL_FOR_CLASSIFICATION, self.validated.get("site_id"), mission_text,
+                lambda: self._checked(llm_call("work_pattern", INTERACTIVE, chain.invoke, {"mission_text": mission_text}))
+            )
+        )
+        return self._interpret(llm_result, mission_text)
+
+    async def aclassify_mission(self) -> dict:
+        """classify_mission for async callers."""
+        mission_text=self.validated["prompt"]
+        chain = self.build_work_pattern_chain()
+
+        async def compute():
+            return self._checked(await allm_call("work_pattern", INTERACTIVE, chain.ainvoke, {"mission_text": mission_text}))
+
+        llm_result = await get_llm_cache().acall(
+            "work_pattern",
+            MODEL_FOR_CLASSIFICATION,
+            ChatPromptTemplate.from_template(WORK_PATTERN_PROMPT).format_messages(mission_text=mission_text),
+            lambda: get_semantic_cache().acall(
+                "work_pattern", MODEL_FOR_CLASSIFICATION, self.validated.get("site_id"), mission_text,
+                compute
+            )
+        )
+        return self._interpret(llm_result, mission_text)
 
+    @staticmethod
+    def _checked(llm_result):
+        # Runs inside the cached calls: an answer _interpret cannot read is never cached
+        missing = [key for key in ("work_pattern", "category") if not isinstance(llm_result, dict) or key not in llm_result]
+        if missing:
+            raise ValueError(f"Work pattern answer is missing {missing}: {llm_result!r}")
+        return llm_result
+
+    def _interpret(self, llm_result: dict, mission_text: str) -> dict:
         work_pattern = llm_result["work_pattern"]
         try:
             reason=llm_result["reason"]
@@ -124,7 +159,12 @@ class Classifier:
 
 class FillJson(Classifier):
     def append_data_to_json(self):
-        mission_data=self.classify_mission()
+        return self._fill(self.classify_mission())
+
+    async def aappend_data_to_json(self):
+        return self._fill(await self.aclassify_mission())
+
+    def _fill(self, mission_data):
         self.validated["class"]=mission_data["mission_type"]
         self.validated["reason"]=mission_data["reason"]
         self.validated["category"]=mission_data["category"]
@@ -17,7 +17,14 @@ class Selection:
 
     def select_model(self)->Dict:
         json_data=FillJson(self.validated)
-        validated=json_data.append_data_to_json()
+        return self._choose_model(json_data.append_data_to_json())
+
+    async def aselect_model(self)->Dict:
+        json_data=FillJson(self.validated)
+        return self._choose_model(await json_data.aappend_data_to_json())
+
+    @staticmethod
+    def _choose_model(validated)->Dict:
         complexity=validated["complexity"]
         if validated["class"]=="point":
             if complexity<=COMPLEXITY_THRESHOLD_FOR_POINT_MISSION:
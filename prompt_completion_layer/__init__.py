@@ -16,7 +16,7 @@ from .models import (
 from .validator import PreCheckPrompt
 from .prompt_completion_status import PromptCompletionChecker
 from .orchestrator import PromptCompletionPipeline
-from .db_manager import PromptCompletionDB
+from .db_manager import PromptCompletionDB, sync_prompt_writes
 
 __all__ = [
     "CompletionStatus",
@@ -28,4 +28,5 @@ __all__ = [
     "PromptCompletionChecker",
     "PromptCompletionPipeline",
     "PromptCompletionDB",
+    "sync_prompt_writes",
 ]
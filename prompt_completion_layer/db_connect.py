@@ -1,6 +1,7 @@
 
 from app.config import PROMPT_COMPLETION_DATABASE_CONFIG,PRODUCTION_DB_CONFIG
-import mysql.connector
+from database_layer import get_production_pool
+from .db_manager import sync_prompt_writes
 #import psycopg
 class ConnectToDb:
     def __init__(self):
@@ -23,14 +24,9 @@ class ConnectToDb:
         #     host=self.host,
         #     port=self.port
         # )
-        return mysql.connector.connect(
-    database=self.dbname,
-    user=self.user,
-    password=self.password,
-    host=self.host,
-    port=self.port
-)
+        return get_production_pool().acquire()
     def execute_query(self):
+        sync_prompt_writes()    # rows may still be in the write-behind queue
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM prompt_conversations;")
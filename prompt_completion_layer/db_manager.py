@@ -1,23 +1,175 @@
 """
 Database operations for prompt completion layer.
 Stores prompt validation and completion results in database.
+
+By default an insert lets AUTO_INCREMENT pick the record id. With
+PROMPT_CLIENT_IDS=1 the id comes from new_record_id() instead, which
+lets PROMPT_WRITE_BEHIND=1 queue the insert. Both need
+database_layer/migrations/001_client_generated_ids.sql applied first; if
+`prompt_conversations.id` is not a BIGINT yet, client ids (and write-
+behind) stay off and an error is logged.
 """
 
 
-import mysql.connector
+from database_layer import get_production_pool, new_record_id, WriteBehindQueue, close_on_exit
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 import logging
-from app.config import PROMPT_COMPLETION_DATABASE_CONFIG,PRODUCTION_DB_CONFIG
+import threading
+from app.config import (
+    DB_BACKEND,
+    PROMPT_COMPLETION_DATABASE_CONFIG,
+    PRODUCTION_DB_CONFIG,
+    PROMPT_CLIENT_IDS,
+    PROMPT_WRITE_BEHIND,
+    PROMPT_WRITE_QUEUE_MAX,
+    PROMPT_WRITE_BATCH_SIZE,
+    PROMPT_WRITE_FLUSH_INTERVAL,
+)
 from .models import PromptCompletionResponse, CompletionCheckResult
 #import psycopg
 logger = logging.getLogger(__name__)
 
 
+# ---------------- Batched writes ---------------- #
+
+INSERT_COLUMNS = "(id, user_id, status, initial_prompt, site_id, organization_id, created_at)"
+
+_client_ids_supported: Optional[bool] = None
+_client_ids_lock = threading.Lock()
+
+
+def client_ids_supported() -> bool:
+    """
+    Whether prompt_conversations.id can hold a new_record_id() value
+    (migration 001 applied). Checked once per process.
+    """
+    global _client_ids_supported
+
+    if _client_ids_supported is None:
+        with _client_ids_lock:
+            if _client_ids_supported is None:
+                _client_ids_supported = _check_id_column()
+
+    return _client_ids_supported
+
+
+def _check_id_column() -> bool:
+    if DB_BACKEND == "sqlite":
+        return True     # INTEGER PRIMARY KEY is 64-bit
+
+    conn = get_production_pool().acquire()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT DATA_TYPE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'prompt_conversations' AND COLUMN_NAME = 'id'"
+        )
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+    if row is not None and str(row[0]).lower() == "bigint":
+        return True
+    logger.error(
+        f"PROMPT_CLIENT_IDS is on but prompt_conversations.id is {row[0] if row else 'missing'}, not BIGINT: "
+        f"apply database_layer/migrations/001_client_generated_ids.sql. "
+        f"Using AUTO_INCREMENT ids and direct writes until then."
+    )
+    return False
+
+
+def flush_prompt_writes(batch: List[tuple]):
+    """
+    Write a batch of queued operations in as few statements as possible:
+    one multi-row INSERT, then one CASE-based UPDATE for status changes
+    (last status per record wins). Inserts go first, since a status
+    update is always queued after the insert of its record.
+    """
+    inserts = [row for kind, row in batch if kind == "insert"]
+    statuses = OrderedDict()
+    for kind, row in batch:
+        if kind == "status":
+            statuses[row[0]] = row
+
+    conn = get_production_pool().acquire()
+    cursor = conn.cursor()
+    try:
+        if inserts:
+            values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(inserts))
+            cursor.execute(
+                f"INSERT INTO prompt_conversations {INSERT_COLUMNS} VALUES {values}",
+                [v for row in inserts for v in row]
+            )
+
+        if statuses:
+            rows = list(statuses.values())
+            cases = " ".join(["WHEN %s THEN %s"] * len(rows))
+            ids = ", ".join(["%s"] * len(rows))
+            cursor.execute(
+                f"""
+                UPDATE prompt_conversations
+                SET status = CASE id {cases} END,
+                    updated_at = CASE id {cases} END
+                WHERE id IN ({ids});
+                """,
+                [v for r in rows for v in (r[0], r[1])]
+                + [v for r in rows for v in (r[0], r[2])]
+                + [r[0] for r in rows]
+            )
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+_write_queue: Optional[WriteBehindQueue] = None
+_write_queue_lock = threading.Lock()
+
+
+def get_prompt_write_queue() -> WriteBehindQueue:
+    """Process-wide write-behind queue for prompt_conversations (flushed at exit)."""
+    global _write_queue
+
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                _write_queue = close_on_exit(WriteBehindQueue(
+                    flush_prompt_writes,
+                    max_pending=PROMPT_WRITE_QUEUE_MAX,
+                    batch_size=PROMPT_WRITE_BATCH_SIZE,
+                    interval=PROMPT_WRITE_FLUSH_INTERVAL,
+                    name="prompt-writes",
+                ))
+
+    return _write_queue
+
+
+def sync_prompt_writes(timeout: Optional[float] = None) -> bool:
+    """
+    Wait until every queued prompt_conversations write is in the DB.
+    Code that reads the table directly (not through PromptCompletionDB,
+    whose readers already do this) must call it first: a record id is
+    handed out before its row is written. Returns False on timeout.
+    """
+    if _write_queue is None:
+        return True
+    return _write_queue.flush(timeout)
+
+
 class PromptCompletionDB:
     """Handle database operations for prompt completion."""
     
-    def __init__(self):
+    def __init__(self, write_behind: bool = PROMPT_WRITE_BEHIND, client_ids: bool = PROMPT_CLIENT_IDS):
+        if write_behind and not client_ids:
+            # A queued insert has no AUTO_INCREMENT id to hand back
+            raise ValueError("Prompt write-behind needs client-generated ids (PROMPT_CLIENT_IDS=1)")
         
         # self.dbname = PROMPT_COMPLETION_DATABASE_CONFIG["DB_NAME"]
         # self.user = PROMPT_COMPLETION_DATABASE_CONFIG["DB_USER"]
@@ -29,6 +181,8 @@ class PromptCompletionDB:
         self.password = PRODUCTION_DB_CONFIG["PRODUCTION_DB_PASSWORD"]
         self.host = PRODUCTION_DB_CONFIG["PRODUCTION_HOST"]
         self.port = PRODUCTION_DB_CONFIG["PRODUCTION_PORT"]
+        self.write_behind = write_behind
+        self.client_ids = client_ids
     def get_connection(self):
         # return psycopg.connect(
         #     dbname=self.dbname,
@@ -37,13 +191,7 @@ class PromptCompletionDB:
         #     host=self.host,
         #     port=self.port
         # )
-        return mysql.connector.connect(
-    database=self.dbname,
-    user=self.user,
-    password=self.password,
-    host=self.host,
-    port=self.port
-)
+        return get_production_pool().acquire()
     def save_prompt_completion(
     self,
     response: PromptCompletionResponse,
@@ -64,61 +212,42 @@ class PromptCompletionDB:
                 If None, derived from completion result
 
         Returns:
-            ID of inserted record
+            ID of the record. With write-behind on, the row is only queued
+            when this returns: the methods of this class flush pending
+            writes before reading or updating it, and anything else that
+            queries prompt_conversations must call sync_prompt_writes()
+            first.
         """
-        conn = None
-        cursor = None
-
-        try:
-            # Determine status from completion result if not provided
-            if status is None:
-                if response.completion_result.is_complete:
-                    status = "APPROVED"
-                else:
-                    status = "REJECTED"
-
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            # MySQL-compatible INSERT query
-            query = """
-            INSERT INTO prompt_conversations
-            (user_id, status, initial_prompt, site_id, organization_id, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            """
-
-            values = (
-                user_id,
-                status,
-                response.original_prompt,
-                site_id,
-                org_id,
-                datetime.utcnow()
-            )
-
-            cursor.execute(query, values)
-            conn.commit()
-
-            # MySQL way to get inserted ID
-            record_id = cursor.lastrowid
+        # Determine status from completion result if not provided
+        if status is None:
+            if response.completion_result.is_complete:
+                status = "APPROVED"
+            else:
+                status = "REJECTED"
 
-            logger.info(f"Saved prompt completion to DB: record_id={record_id}")
-
-            return record_id
+        fields = (
+            user_id,
+            status,
+            response.original_prompt,
+            site_id,
+            org_id,
+            datetime.utcnow()
+        )
 
+        try:
+            if self._client_ids():
+                # The ID is ours, so with write-behind the caller never waits for the INSERT
+                record_id = new_record_id()
+                self._write(("insert", (record_id,) + fields))
+            else:
+                record_id = self._insert_auto_increment(fields)
         except Exception as e:
-            if conn:
-                conn.rollback()
-
             logger.error(f"Error saving to database: {str(e)}")
             raise
 
-        finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
-    
+        logger.info(f"Saved prompt completion to DB: record_id={record_id}")
+        return record_id
+
     def update_prompt_final(
         self,
         record_id: int,
@@ -136,6 +265,7 @@ class PromptCompletionDB:
         Returns:
             True if successful
         """
+        self._sync_pending()
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
@@ -180,35 +310,53 @@ class PromptCompletionDB:
             True if successful
         """
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            query = """
-            UPDATE prompt_conversations 
-            SET status = %s, updated_at = %s
-            WHERE id = %s;
-            """
-            
-            cursor.execute(
-                query,
-                (
-                    status,
-                    datetime.utcnow(),
-                    record_id
-                )
-            )
-            
-            conn.commit()
+            self._write(("status", (record_id, status, datetime.utcnow())))
             logger.info(f"Updated status of prompt record: {record_id} to {status}")
-            
-            cursor.close()
-            conn.close()
-            
             return True
-            
+
         except Exception as e:
             logger.error(f"Error updating status of record: {str(e)}")
             raise
+
+    # ----------------------------------
+
+    def _client_ids(self) -> bool:
+        return self.client_ids and client_ids_supported()
+
+    def _write(self, op: tuple):
+        """Queue a write, or run it right away when write-behind is off."""
+        if self.write_behind and self._client_ids():
+            get_prompt_write_queue().put(op)
+        else:
+            flush_prompt_writes([op])
+
+    def _sync_pending(self):
+        """Flush queued writes before statements that must see them."""
+        if self.write_behind:
+            sync_prompt_writes()
+
+    def _insert_auto_increment(self, fields: tuple) -> int:
+        """INSERT a record and let AUTO_INCREMENT pick its id."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                INSERT INTO prompt_conversations
+                (user_id, status, initial_prompt, site_id, organization_id, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                """,
+                fields
+            )
+            conn.commit()
+            return cursor.lastrowid
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
     def close_prompt(self, record_id: int) -> bool:
         """
         Mark a prompt as ended.
@@ -219,6 +367,7 @@ class PromptCompletionDB:
         Returns:
             True if successful
         """
+        self._sync_pending()
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
@@ -253,6 +402,7 @@ class PromptCompletionDB:
         Returns:
             Dictionary with record data
         """
+        self._sync_pending()
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
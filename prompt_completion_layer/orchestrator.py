@@ -9,6 +9,7 @@ import time
 import logging
 from datetime import datetime
 from app.config import MODEL_NAME_FOR_PROMPT_COMPLETION
+from database_layer import run_blocking
 from .models import (
     PromptCompletionRequest,
     PromptCompletionResponse,
@@ -62,81 +63,106 @@ class PromptCompletionPipeline:
         logger.info(f"Processing request {request_id}")
         
         try:
-            # Step 1: Validate prompt
-            logger.info("Step 1: Validating prompt")
-            self.validator.prompt = request.prompt
-            validation_result = self.validator.validate()
-            print("validation Omkar:",validation_result)
-            cleaned_prompt = self.validator.clean_prompt()
-            
-            if validation_result.is_valid and validation_result.acceptance_value==3:
+            validation_result, cleaned_prompt = self._validate(request)
 
-            # Step 2: Check completion with LLM
+            completion_result = None
+            if self._accepted(validation_result):
+                # Step 2: Check completion with LLM
                 logger.info("Step 2: Checking with LLM")
-                completion_result = self.checker.check_completion(cleaned_prompt)
-                
-                # Step 3: Build response
-                processing_time = (time.time() - start_time) * 1000
-                logger.info(f"Step 3: Building response for prompt completion")
-                response = PromptCompletionResponse(
-                    request_id=request_id,
-                    original_prompt=request.prompt,
-                    validation_result=validation_result,
-                    completion_result=completion_result,
-                    timestamp=datetime.utcnow(),
-                    processing_time_ms=processing_time
-                )
-                
-                # Step 4: Save to database if enabled
-                if self.save_to_db and user_id and site_id and org_id:
-                    logger.info("Step 4: Saving to database")
-                    try:
-                        db_record_id = self.db.save_prompt_completion(
-                            response=response,
-                            user_id=user_id,
-                            site_id=site_id,
-                            org_id=org_id,
-                            status="APPROVED" if completion_result.is_complete else "REJECTED"
-                        )
-                        response.request_id = str(db_record_id)  # Use DB ID as request ID
-                        logger.info(f"Saved to database with record ID: {db_record_id}")
-                    except Exception as db_error:
-                        logger.error(f"Prompt CompletionDatabase save failed: {str(db_error)}")
-                        # Continue even if DB save fails
-                
-                logger.info(f"Request {request_id} completed in {processing_time:.2f}ms")
-                return response
-            else:
-                processing_time = (time.time() - start_time) * 1000
-                logger.info(f"Step 3: Building response for prompt completion")
-                response = PromptCompletionResponse(
-                    request_id=request_id,
-                    original_prompt=request.prompt,
-                    validation_result=validation_result,
-                    completion_result=dict({'status': 'invalid response','is_complete': False, 'confidence': 0.0}),
-                    timestamp=datetime.utcnow(),
-                    processing_time_ms=processing_time
-                )
-                if self.save_to_db and user_id and site_id and org_id:
-                    logger.info("Step 4: Saving to database")
-                    try:
-                        db_record_id = self.db.save_prompt_completion(
-                            response=response,
-                            user_id=user_id,
-                            site_id=site_id,
-                            org_id=org_id,
-                            status="REJECTED"
-                        )
-                        response.request_id = str(db_record_id)  # Use DB ID as request ID
-                        logger.info(f"Saved to database with record ID: {db_record_id}")
-                    except Exception as db_error:
-                        logger.error(f"Prompt CompletionDatabase save failed: {str(db_error)}")
-                        # Continue even if DB save fails
-                
-                logger.info(f"Request {request_id} completed in {processing_time:.2f}ms")
-                logger.info(f"please enter a valid prompt as the prompt should be minimum{MODEL_NAME_FOR_PROMPT_COMPLETION} and maximum {MODEL_NAME_FOR_PROMPT_COMPLETION} tokens")
-                return response
+                completion_result = self.checker.check_completion(cleaned_prompt, site_id=site_id)
+
+            response = self._build_response(request, request_id, start_time, validation_result, completion_result)
+            self._save(response, completion_result, user_id, site_id, org_id)
+            self._log_done(request_id, response, completion_result)
+            return response
             
         except Exception as e:
             logger.error(f"Error processing request {request_id}: {str(e)}", exc_info=True)
             raise
+
+    async def aprocess(
+        self,
+        request: PromptCompletionRequest,
+        user_id: int = None,
+        site_id: int = None,
+        org_id: int = None
+    ) -> PromptCompletionResponse:
+        """process() for async callers: awaits the LLM, saves on a worker thread."""
+        start_time = time.time()
+        request_id = str(uuid.uuid4())
+
+        logger.info(f"Processing request {request_id}")
+
+        try:
+            validation_result, cleaned_prompt = self._validate(request)
+
+            completion_result = None
+            if self._accepted(validation_result):
+                logger.info("Step 2: Checking with LLM")
+                completion_result = await self.checker.acheck_completion(cleaned_prompt, site_id=site_id)
+
+            response = self._build_response(request, request_id, start_time, validation_result, completion_result)
+            await run_blocking(self._save, response, completion_result, user_id, site_id, org_id)
+            self._log_done(request_id, response, completion_result)
+            return response
+
+        except Exception as e:
+            logger.error(f"Error processing request {request_id}: {str(e)}", exc_info=True)
+            raise
+
+    # ---------------- Steps ---------------- #
+
+    def _validate(self, request: PromptCompletionRequest):
+        # Step 1: Validate prompt
+        logger.info("Step 1: Validating prompt")
+        self.validator.prompt = request.prompt
+        validation_result = self.validator.validate()
+        print("validation Omkar:",validation_result)
+        cleaned_prompt = self.validator.clean_prompt()
+        return validation_result, cleaned_prompt
+
+    @staticmethod
+    def _accepted(validation_result) -> bool:
+        return validation_result.is_valid and validation_result.acceptance_value==3
+
+    @staticmethod
+    def _build_response(request, request_id, start_time, validation_result, completion_result):
+        # Step 3: Build response (no completion result: the prompt failed validation)
+        processing_time = (time.time() - start_time) * 1000
+        logger.info(f"Step 3: Building response for prompt completion")
+        return PromptCompletionResponse(
+            request_id=request_id,
+            original_prompt=request.prompt,
+            validation_result=validation_result,
+            completion_result=completion_result if completion_result is not None
+                else dict({'status': 'invalid response','is_complete': False, 'confidence': 0.0}),
+            timestamp=datetime.utcnow(),
+            processing_time_ms=processing_time
+        )
+
+    def _save(self, response, completion_result, user_id, site_id, org_id):
+        # Step 4: Save to database if enabled
+        if not (self.save_to_db and user_id and site_id and org_id):
+            return
+
+        logger.info("Step 4: Saving to database")
+        status = "APPROVED" if completion_result is not None and completion_result.is_complete else "REJECTED"
+        try:
+            db_record_id = self.db.save_prompt_completion(
+                response=response,
+                user_id=user_id,
+                site_id=site_id,
+                org_id=org_id,
+                status=status
+            )
+            response.request_id = str(db_record_id)  # Use DB ID as request ID
+            logger.info(f"Saved to database with record ID: {db_record_id}")
+        except Exception as db_error:
+            logger.error(f"Prompt CompletionDatabase save failed: {str(db_error)}")
+            # Continue even if DB save fails
+
+    @staticmethod
+    def _log_done(request_id, response, completion_result):
+        logger.info(f"Request {request_id} completed in {response.processing_time_ms:.2f}ms")
+        if completion_result is None:
+            logger.info(f"please enter a valid prompt as the prompt should be minimum{MODEL_NAME_FOR_PROMPT_COMPLETION} and maximum {MODEL_NAME_FOR_PROMPT_COMPLETION} tokens")
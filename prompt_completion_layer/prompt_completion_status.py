@@ -7,7 +7,6 @@ import os
 import logging
 import json
 from app.config import OPENAI_API_KEY, MODEL_NAME_FOR_PROMPT_COMPLETION, TEMPERATURE_FOR_PROMPT_COMPLETION
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.runnables import RunnablePassthrough
@@ -15,6 +14,7 @@ from pydantic import BaseModel, Field
 from typing import Optional
 
 from .models import CompletionCheckResult, CompletionStatus
+from llm_layer import INTERACTIVE, allm_call, get_llm_registry, get_llm_cache, get_semantic_cache, llm_call
 
 logger = logging.getLogger(__name__)
 
@@ -97,12 +97,8 @@ Confidence scoring:
         if not self.api_key:
             logger.warning("OPENAI_API_KEY not found")
         
-        # Initialize LLM
-        self.llm = ChatOpenAI(
-            model=model_name,
-            temperature=TEMPERATURE_FOR_PROMPT_COMPLETION,
-            api_key=self.api_key
-        )
+        # Initialize LLM (shared, long-lived client)
+        self.llm = get_llm_registry().chat(model_name, TEMPERATURE_FOR_PROMPT_COMPLETION)
         
         # Setup LangChain pipeline
         self._setup_chain()
@@ -120,17 +116,21 @@ Confidence scoring:
         # Create parser
         self.parser = JsonOutputParser(pydantic_object=CompletionAnalysisOutput)
         
-        # Build the chain: prompt -> LLM -> parser
-        self.chain = self.prompt_template | self.llm | self.parser
+        # Build the chain once per model: prompt -> LLM -> parser
+        self.chain = get_llm_registry().chain(
+            ("prompt_completion", self.model_name),
+            lambda: self.prompt_template | self.llm | self.parser
+        )
         
         logger.debug("LangChain pipeline setup complete")
 
-    def check_completion(self, prompt: str) -> CompletionCheckResult:
+    def check_completion(self, prompt: str, site_id=None) -> CompletionCheckResult:
         """
         Check if prompt is complete using LangChain pipeline.
         
         Args:
             prompt: The prompt to analyze
+            site_id: Site the prompt belongs to (scopes the semantic cache)
             
         Returns:
             CompletionCheckResult with status and confidence
@@ -143,7 +143,15 @@ Confidence scoring:
             logger.info(f"Checking prompt completion ({len(prompt)} chars)")
             
             # Invoke the LangChain pipeline
-            analysis_output = self.chain.invoke({"prompt": prompt})
+            analysis_output = get_llm_cache().call(
+                "prompt_completion",
+                self.model_name,
+                self.prompt_template.format_messages(prompt=prompt),
+                lambda: get_semantic_cache().call(
+                    "prompt_completion", self.model_name, site_id, prompt,
+                    lambda: llm_call("prompt_completion", INTERACTIVE, self.chain.invoke, {"prompt": prompt})
+                )
+            )
             logger.debug(f"LLM analysis output: {analysis_output}")
             
             # Convert LangChain output to CompletionCheckResult
@@ -155,6 +163,34 @@ Confidence scoring:
         except Exception as e:
             logger.error(f"Error in check_completion: {str(e)}", exc_info=True)
             return self._error_result(str(e))
+    async def acheck_completion(self, prompt: str, site_id=None) -> CompletionCheckResult:
+        """check_completion for async callers (awaits the LLM instead of blocking)."""
+        if not prompt or prompt.strip() == "":
+            logger.error("Empty prompt provided")
+            return self._error_result("Empty prompt provided")
+
+        try:
+            logger.info(f"Checking prompt completion ({len(prompt)} chars)")
+
+            analysis_output = await get_llm_cache().acall(
+                "prompt_completion",
+                self.model_name,
+                self.prompt_template.format_messages(prompt=prompt),
+                lambda: get_semantic_cache().acall(
+                    "prompt_completion", self.model_name, site_id, prompt,
+                    lambda: allm_call("prompt_completion", INTERACTIVE, self.chain.ainvoke, {"prompt": prompt})
+                )
+            )
+            logger.debug(f"LLM analysis output: {analysis_output}")
+
+            result = self._convert_output_to_result(analysis_output)
+            logger.info(f"Completion check result: {result.status}")
+            return result
+
+        except Exception as e:
+            logger.error(f"Error in acheck_completion: {str(e)}", exc_info=True)
+            return self._error_result(str(e))
+
     def _convert_output_to_result(self, analysis_output: dict) -> CompletionCheckResult:
         try:
             is_complete = analysis_output.get("is_complete")
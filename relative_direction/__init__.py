@@ -1,7 +1,8 @@
 from .gps_calculator import GpsCalculationRelative
-from .main_relative import run_pipeline_relative
+from .main_relative import run_pipeline_relative, arun_pipeline_relative
 
 __all__=[
     GpsCalculationRelative,
-    run_pipeline_relative
+    run_pipeline_relative,
+    arun_pipeline_relative
 ]
\ No newline at end of file
@@ -1,18 +1,15 @@
-from langchain_openai import ChatOpenAI
+from llm_layer import get_llm_registry
 from langchain_core.prompts import ChatPromptTemplate
 from .schemas import MissionResponse
 import os
 from dotenv import load_dotenv
 load_dotenv()
 # LLM
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0,
-    api_key=os.getenv("OPENAI_API_KEY")
-)
+MODEL = "gpt-4o-mini"
+llm = get_llm_registry().chat(MODEL, 0)
 
 # Structured output
-structured_llm = llm.with_structured_output(MissionResponse)
+structured_llm = get_llm_registry().chat(MODEL, 0, schema=MissionResponse)
 from langchain_core.prompts import ChatPromptTemplate
 system_prompt = """
 You are a strict intent extractor for drone mission planning. Your ONLY job is to convert user instructions into structured JSON. You are NOT a planner, advisor, or explainer.
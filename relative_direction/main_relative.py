@@ -8,16 +8,16 @@ from correction_layer import (ConnectToDb, GeofenceValidator, CheckThreshold)
 import copy
 from graphdb import Neo4jMissionDB
 from mission_classifier_layer.model_selection import Selection
-def run_pipeline_relative(user_input: str):
-    app = build_app()
-
-    result = app.invoke({
+def _initial_state(user_input: str):
+    return {
         "input": user_input,
         "retries": 0,
         "result": None,
         "error": None
-    })
+    }
 
+
+def _output(result):
     if result["result"] is not None:
         
         return result["result"].dict()
@@ -28,6 +28,17 @@ def run_pipeline_relative(user_input: str):
         }
 
 
+def run_pipeline_relative(user_input: str):
+    app = build_app()
+    return _output(app.invoke(_initial_state(user_input)))
+
+
+async def arun_pipeline_relative(user_input: str):
+    """run_pipeline_relative for async callers."""
+    app = build_app(async_nodes=True)
+    return _output(await app.ainvoke(_initial_state(user_input)))
+
+
 # if __name__ == "__main__":
 
 #     prompt = "Move in 25 degrees 200 meters then north south 20 meters and take a photo"
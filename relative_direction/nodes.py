@@ -1,7 +1,10 @@
 from typing import TypedDict, Optional
 from .schemas import MissionResponse
 from .validation import validate_waypoints
-from .llm_setup import prompt, structured_llm
+from .llm_setup import MODEL, prompt, structured_llm
+from llm_layer import INTERACTIVE, allm_call, get_llm_cache, llm_call
+from app.config import MISSION_RETRY_MIN_REMAINING
+from app.deadline import has_budget
 
 # -----------------------------
 # State Definition
@@ -22,8 +25,13 @@ def generate(state: State) -> State:
     chain = prompt | structured_llm
 
     try:
-        result = chain.invoke({"input": state["input"]})
-        validate_waypoints(result)
+        result = get_llm_cache().call(
+            "relative_direction",
+            MODEL,
+            prompt.format_messages(input=state["input"]),
+            # Validated before it is cached: a bad answer must not be replayed
+            lambda: _validated(llm_call("relative_direction", INTERACTIVE, chain.invoke, {"input": state["input"]}))
+        )
 
         state["result"] = result
         state["error"] = None
@@ -35,6 +43,36 @@ def generate(state: State) -> State:
     return state
 
 
+async def agenerate(state: State) -> State:
+    """generate() for the async graph: awaits the LLM instead of blocking."""
+    chain = prompt | structured_llm
+
+    async def compute():
+        return _validated(await allm_call("relative_direction", INTERACTIVE, chain.ainvoke, {"input": state["input"]}))
+
+    try:
+        result = await get_llm_cache().acall(
+            "relative_direction",
+            MODEL,
+            prompt.format_messages(input=state["input"]),
+            compute
+        )
+
+        state["result"] = result
+        state["error"] = None
+
+    except Exception as e:
+        print("❌ ERROR:", str(e))
+        state["error"] = str(e)
+
+    return state
+
+
+def _validated(result):
+    validate_waypoints(result)
+    return result
+
+
 # -----------------------------
 # Retry Node
 # -----------------------------
@@ -65,5 +103,8 @@ def decide(state: State):
         return "success"
     elif state["retries"] >= MAX_RETRIES:
         return "fail"
+    elif not has_budget(MISSION_RETRY_MIN_REMAINING):
+        # No time left in the mission for another LLM round trip
+        return "fail"
     else:
         return "retry"
\ No newline at end of file
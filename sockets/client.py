@@ -66,6 +66,9 @@ def on_user_connected(data):
 def on_user_disconnected(data):
     print(f"user disconnected: {data}")
     user_id = data.get("user_id") or data.get("id")
+    if user_id:
+        # Nobody is left to receive the answer: stop the user's missions
+        mission_engine.cancel_missions(user_id=user_id, reason="user disconnected")
     if user_id and user_id in user_cache:
         del user_cache[user_id]
         print(f"Cleared cache for user_id={user_id}")
@@ -84,7 +87,9 @@ async def on_user_message(data):
 
     # ── Prompt ────────────────────────────────────────────────────
     if msg_type == "prompt":
-        cid    = str(uuid.uuid4())
+        # Keep the conversation's cid so a follow-up prompt supersedes its
+        # predecessor; only a prompt that opens a conversation gets a new one
+        cid    = cid or str(uuid.uuid4())
         prompt = data["message"]
 
         await sio.emit("argos-ai:progress", {
@@ -32,6 +32,9 @@ async def connect(sid, environ, auth):
 async def disconnect(sid):
     print(f"Client disconnected: {sid}")
 
+    # Nobody is left to receive the answer: stop the mission's LLM calls and background work
+    mission_engine.cancel_missions(cid=sid, reason="client disconnected")
+
     if sid in mission_engine.sessions:
         del mission_engine.sessions[sid]
         print("Session cleared for:", sid)
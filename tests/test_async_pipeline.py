@@ -0,0 +1,52 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+
+sys.path.append(os.path.abspath("."))
+
+import app.prompt_run as prompt_run
+from app.prompt_run import MissionEngine
+
+
+def test_missions_share_one_loop_while_waiting_on_the_llm(monkeypatch):
+    async def fake_relative(prompt):
+        await asyncio.sleep(0.3)        # stands in for the LLM round trip
+        return {"waypoints": [{"location": "gate"}], "finish": None}
+
+    def locate(extracted):
+        output = {"type": "point", "waypoints": extracted["model_for_extraction_json_output"]["waypoints"]}
+        return {**extracted, "model_for_extraction_json_output": output}
+
+    monkeypatch.setattr(prompt_run, "arun_pipeline_relative", fake_relative)
+    monkeypatch.setattr(MissionEngine, "_prefetch_annotations_sync", staticmethod(lambda site_id: None))
+    monkeypatch.setattr(MissionEngine, "_prefetch_geofences_sync", staticmethod(lambda site_id: None))
+    monkeypatch.setattr(MissionEngine, "_locate_sync", staticmethod(locate))
+    monkeypatch.setattr(MissionEngine, "_geofence_sync", staticmethod(lambda located, fences: located))
+    monkeypatch.setattr(MissionEngine, "_check_sync", staticmethod(lambda merged: {"status": "ok", "mission": merged}))
+    monkeypatch.setattr(MissionEngine, "_save_result_sync", lambda self, result: None)
+
+    engine = MissionEngine(sio=None)
+    engine.emit_progress = lambda *args: None
+    selected = {"class": "point", "category": "relative_direction"}
+
+    async def run_all():
+        threads_before = threading.active_count()
+        responses = await asyncio.gather(*(
+            engine._continue_pipeline({"user_id": 1}, {"prompt": f"mission {i}", "site_id": 1}, f"c{i}", selected)
+            for i in range(200)
+        ))
+        return responses, threading.active_count() - threads_before
+
+    start = time.monotonic()
+    responses, extra_threads = asyncio.run(run_all())
+    elapsed = time.monotonic() - start
+
+    assert all(r["type"] == "success" for r in responses)
+    assert elapsed < 2.0                # 200 x 0.3 s waits overlapped on one loop
+    assert extra_threads <= 40          # only the bounded executor, not a thread per mission
+
+    # Relative missions skip the absolute-only stages
+    stats = engine.pipeline.stats()
+    assert stats["optimize"]["skipped"] == 200 and stats["graph_insert"]["skipped"] == 200
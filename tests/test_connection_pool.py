@@ -0,0 +1,61 @@
+import sys
+import os
+import sqlite3
+import threading
+
+sys.path.append(os.path.abspath("."))
+
+import pytest
+from database_layer.pool import ConnectionPool, PoolTimeout
+
+
+def _pool(size=2, timeout=0.05):
+    return ConnectionPool(
+        lambda: sqlite3.connect(":memory:", check_same_thread=False),
+        size=size,
+        timeout=timeout,
+        name="test",
+    )
+
+
+def test_close_returns_connection_for_reuse():
+    pool = _pool()
+
+    conn = pool.acquire()
+    raw = conn._entry.raw
+    conn.close()
+
+    again = pool.acquire()
+    assert again._entry.raw is raw
+    again.close()
+
+    stats = pool.stats()
+    assert stats["created"] == 1
+    assert stats["reused"] == 1
+    assert stats["in_use"] == 0
+
+
+def test_pool_is_bounded_and_times_out():
+    pool = _pool(size=1)
+    held = pool.acquire()
+
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    held.close()
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_waiter_gets_released_connection():
+    pool = _pool(size=1, timeout=2)
+    held = pool.acquire()
+    got = []
+
+    t = threading.Thread(target=lambda: got.append(pool.acquire()))
+    t.start()
+    held.close()
+    t.join(2)
+
+    assert got and got[0]._entry is not None
+    got[0].close()
+    assert pool.stats()["open"] == 1
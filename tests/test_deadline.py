@@ -0,0 +1,117 @@
+import sys
+import os
+import time
+import sqlite3
+import asyncio
+
+sys.path.append(os.path.abspath("."))
+
+import pytest
+from app.deadline import Deadline, cap_timeout, current_deadline, deadline_scope, has_budget
+from app.stage_graph import Stage, StageGraph
+from database_layer.pool import ConnectionPool, PoolTimeout
+from llm_layer.hedging import HedgedCaller, StageDeadlineExceeded
+from llm_layer.loop import on_llm_loop, run_on_llm_loop
+from relative_direction.nodes import decide
+
+
+def test_timeouts_are_capped_only_inside_a_mission():
+    assert cap_timeout(5) == 5 and cap_timeout(None) is None and has_budget(1e9)
+
+    with deadline_scope(Deadline(1.0)):
+        assert cap_timeout(5) <= 1.0
+        assert cap_timeout(0.2) == 0.2
+        assert has_budget(0.5) and not has_budget(2.0)
+
+    assert current_deadline() is None
+
+
+def test_llm_call_is_cut_at_the_mission_deadline():
+    caller = HedgedCaller(deadlines={"s": 5}, hedging=False)
+
+    with deadline_scope(Deadline(0.2)):
+        start = time.monotonic()
+        with pytest.raises(StageDeadlineExceeded):
+            caller.call("s", time.sleep, 1)
+        assert time.monotonic() - start < 0.5
+
+    calls = []
+    with deadline_scope(Deadline(0)):
+        with pytest.raises(StageDeadlineExceeded):
+            caller.call("s", calls.append, 1)
+    assert calls == []                              # an expired mission makes no call
+
+    assert caller.stats()["s"]["deadline_exceeded"] == 2
+
+
+def test_deadline_follows_work_onto_the_llm_loop():
+    async def remaining():
+        return current_deadline()
+
+    deadline = Deadline(30)
+    with deadline_scope(deadline):
+        assert run_on_llm_loop(remaining()) is deadline
+
+    async def from_another_loop():
+        with deadline_scope(deadline):
+            return await on_llm_loop(remaining())
+
+    assert asyncio.run(from_another_loop()) is deadline
+
+
+def test_pool_wait_stops_at_the_mission_deadline():
+    pool = ConnectionPool(lambda: sqlite3.connect(":memory:", check_same_thread=False),
+                          size=1, timeout=10, name="test")
+    held = pool.acquire()
+
+    with deadline_scope(Deadline(0.1)):
+        start = time.monotonic()
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+        assert time.monotonic() - start < 1
+
+    held.close()
+
+
+def test_optional_stages_give_way_when_time_runs_low():
+    async def slow(x):
+        await asyncio.sleep(1)
+        return "optimized"
+
+    graph = StageGraph([
+        Stage("extra", lambda x: "extra", inputs=("x",), output="extra", optional=True, min_budget=5),
+        Stage("slow", slow, inputs=("x",), output="slow", optional=True, timeout=10),
+        Stage("core", lambda x: x + 1, inputs=("x",), output="core"),
+    ], initial=("x",))
+
+    async def run():
+        with deadline_scope(Deadline(0.2)):
+            return await graph.run({"x": 1})
+
+    start = time.monotonic()
+    run = asyncio.run(run())
+
+    assert time.monotonic() - start < 0.6           # slow's 10s timeout was capped
+    assert run.values == {"x": 1, "extra": None, "slow": None, "core": 2}
+    assert run.skipped == ["extra"] and run.fallbacks == ["slow"]
+
+
+def test_retry_loop_gives_up_without_budget():
+    state = {"input": "go north", "result": None, "error": "bad json", "retries": 0}
+    assert decide(state) == "retry"
+
+    with deadline_scope(Deadline(1)):
+        assert decide(state) == "fail"
+
+
+def test_child_deadline_shares_cancellation_not_time():
+    parent = Deadline(0.0)
+    child = Deadline(30, parent=parent)
+    assert parent.expired() and not child.expired()
+
+    parent.cancel("client disconnected")
+    assert child.cancelled and child.remaining() == 0.0
+    assert child.cancel_reason == "client disconnected"
+
+    child.cancel("own reason")
+    assert child.cancel_reason == "own reason" and parent.cancel_reason == "client disconnected"
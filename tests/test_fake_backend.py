@@ -0,0 +1,73 @@
+import sys
+import os
+import time
+import asyncio
+
+sys.path.append(os.path.abspath("."))
+
+import pytest
+from types import SimpleNamespace
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+from intelligence_layer.intelligence_schema import MissionPlan
+from llm_layer.fake_backend import (
+    FixtureMissing, FixtureStore, LatencyModel, RecordingChat, RecordingOpenAI,
+)
+from llm_layer.registry import LLMClientRegistry
+
+PROMPT = ChatPromptTemplate.from_messages([("system", "classify"), ("user", "{mission_text}")])
+
+
+def test_record_then_replay_chat_and_structured_stages(tmp_path):
+    path = str(tmp_path / "fixtures.json")
+    store = FixtureStore(path)
+
+    # Record: real runnables stubbed by lambdas standing in for the provider
+    plain = RecordingChat(RunnableLambda(lambda _: AIMessage(content='{"work_pattern": "grid"}')), store, "gpt-5-nano")
+    (PROMPT | plain).invoke({"mission_text": "survey the field"})
+
+    plan = MissionPlan(waypoints=[{"location": "Gate", "action": ["HOVER"]}])
+    structured = RecordingChat(RunnableLambda(lambda _: plan), store, "gpt-4o-mini", MissionPlan)
+    structured.invoke([("user", "fly to gate and hover")])
+
+    raw = RecordingOpenAI(SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kw: SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content='["HOVER"]'))]))),
+        embeddings=None,
+    ), store)
+    messages = [{"role": "user", "content": "gate"}]
+    raw.chat.completions.create(model="gpt-4o-mini", messages=messages)
+
+    # Replay from the saved file, offline
+    registry = LLMClientRegistry(api_key=None, backend="replay",
+                                 fixtures=FixtureStore(path), latency=LatencyModel("fixed:0.05"))
+    chain = PROMPT | registry.chat("gpt-5-nano", 0) | JsonOutputParser()
+
+    start = time.monotonic()
+    assert chain.invoke({"mission_text": "survey the field"}) == {"work_pattern": "grid"}
+    assert time.monotonic() - start >= 0.05
+
+    replayed = registry.chat("gpt-4o-mini", 0, schema=MissionPlan).invoke([("user", "fly to gate and hover")])
+    assert replayed == plan
+
+    response = registry.openai().chat.completions.create(model="gpt-4o-mini", messages=messages)
+    assert response.choices[0].message.content == '["HOVER"]'
+
+    async def async_call():
+        return await registry.async_openai().chat.completions.create(model="gpt-4o-mini", messages=messages)
+    assert asyncio.run(async_call()).choices[0].message.content == '["HOVER"]'
+
+    with pytest.raises(FixtureMissing):
+        chain.invoke({"mission_text": "something never recorded"})
+
+
+def test_latency_distributions_are_seeded():
+    first = LatencyModel("lognormal:0.8,0.3", seed=7)
+    second = LatencyModel("lognormal:0.8,0.3", seed=7)
+    assert [first.sample() for _ in range(5)] == [second.sample() for _ in range(5)]
+    assert LatencyModel("recorded").sample(1.25) == 1.25
+    assert 0.2 <= LatencyModel("uniform:0.2,0.4").sample() <= 0.4
+    assert first.sample() > 0
@@ -0,0 +1,44 @@
+import sys
+import os
+import random
+from difflib import SequenceMatcher
+
+sys.path.append(os.path.abspath("."))
+
+from correction_layer.fuzzy_matcher import FuzzyLocationMatcher
+
+
+def _full_scan(query, names, threshold):
+    names = [n.lower() for n in names]
+    if query in names:
+        return query
+
+    scores = {}
+    for name in names:
+        overlap = len(set(query.split()) & set(name.split())) / max(len(set(query.split())), 1)
+        scores[name] = max(SequenceMatcher(None, query, name).ratio(), overlap)
+
+    best_name, best_score = max(scores.items(), key=lambda x: x[1])
+    return best_name if best_score >= threshold else None
+
+
+def test_exact_and_near_matches():
+    matcher = FuzzyLocationMatcher(["Tower A", "Tower B", "North Gate", "Solar Panel 3"])
+
+    assert matcher.best("tower a") == "tower a"
+    assert matcher.best("nort gate") == "north gate"
+    assert matcher.best("solar panel") == "solar panel 3"
+    assert matcher.best("parking lot") is None
+
+
+def test_matches_full_scan():
+    rng = random.Random(7)
+    alphabet = "abcde fg"
+
+    for _ in range(500):
+        names = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12))) for _ in range(20)]
+        query = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12)))
+        matcher = FuzzyLocationMatcher(names)
+
+        for threshold in (0.5, 0.8):
+            assert matcher.best(query, threshold) == _full_scan(query, names, threshold)
@@ -0,0 +1,100 @@
+import sys
+import os
+import json
+
+sys.path.append(os.path.abspath("."))
+
+from correction_layer.geofence_engine import CompiledGeofences, compile_geofences
+from correction_layer.geofence_validator import GeofenceValidator
+
+SQUARE = [[0, 0], [1, 0], [1, 1], [0, 1]]
+
+
+def _fence(kind, coords):
+    return {"type": kind, "coordinates": json.dumps(coords)}
+
+
+def test_contains_matrix_per_fence_type():
+    fences = CompiledGeofences([
+        _fence("polygon", SQUARE),
+        _fence("rectangle", {"west": 2, "east": 3, "south": 2, "north": 3}),
+        _fence("circle", [10, 10, 1000]),
+    ])
+
+    inside = fences.contains([(0.5, 0.5), (2.5, 2.5), (10.001, 10.0), (5, 5)])
+
+    assert inside.tolist() == [
+        [True, False, False],
+        [False, True, False],
+        [False, False, True],
+        [False, False, False],
+    ]
+
+
+def test_validate_matches_point_checks():
+    validator = GeofenceValidator()
+    validator.fetch_geofences = lambda site_id: [_fence("polygon", SQUARE)]
+
+    mission = {
+        "site_id": 1,
+        "model_for_extraction_json_output": {"waypoints": [
+            {"location": [0.5, 0.5]},
+            {"location": {"lat": 5, "lon": 5}},
+            {"location": "unknown"},
+        ]},
+    }
+    waypoints = validator.validate(mission)["model_for_extraction_json_output"]["waypoints"]
+
+    assert [wp["location"] for wp in waypoints] == [[0.5, 0.5], [], []]
+    assert validator.point_in_polygon((0.5, 0.5), SQUARE)
+
+
+def test_compiled_fences_are_reused():
+    rows = [_fence("polygon", SQUARE)]
+    assert compile_geofences(rows) is compile_geofences([dict(r) for r in rows])
+
+
+def test_leg_leaving_concave_polygon_is_reported():
+    # U shape: the notch between the arms is outside the fence
+    u_shape = [[0, 0], [3, 0], [3, 3], [2, 3], [2, 1], [1, 1], [1, 3], [0, 3]]
+    validator = GeofenceValidator()
+    validator.fetch_geofences = lambda site_id: [_fence("polygon", u_shape)]
+
+    mission = {
+        "site_id": 1,
+        "model_for_extraction_json_output": {"waypoints": [
+            {"location": [0.5, 0.5]},
+            {"location": [0.5, 2.5]},
+            {"location": [2.5, 2.5]},
+        ]},
+    }
+    validated = validator.validate(mission, check_legs=True)
+    waypoints = validated["model_for_extraction_json_output"]["waypoints"]
+
+    # Both vertices of the second leg are inside, but the leg crosses the notch
+    assert validated["geofence_violation"] == {"leg": 1, "from_waypoint": 1, "to_waypoint": 2}
+    assert waypoints[2]["location"] == []
+    assert waypoints[1]["location"] == [0.5, 2.5]
+
+
+def test_only_path_missions_have_their_legs_checked():
+    import copy
+    from app.prompt_run import MissionEngine
+
+    u_shape = [[0, 0], [3, 0], [3, 3], [2, 3], [2, 1], [1, 1], [1, 3], [0, 3]]
+    fences = compile_geofences([_fence("polygon", u_shape)])
+    mission = {
+        "site_id": 1,
+        "model_for_extraction_json_output": {"waypoints": [
+            {"location": [0.5, 2.5]},
+            {"location": [2.5, 2.5]},
+        ]},
+    }
+
+    path = MissionEngine._geofence_sync({**copy.deepcopy(mission), "class": "path"}, fences)
+    assert path["geofence_violation"] == {"leg": 0, "from_waypoint": 0, "to_waypoint": 1}
+
+    # Two separate stops of a point mission are not flown as a leg
+    point = MissionEngine._geofence_sync({**copy.deepcopy(mission), "class": "point"}, fences)
+    assert "geofence_violation" not in point
+    assert point["model_for_extraction_json_output"]["waypoints"][1]["location"] == [2.5, 2.5]
@@ -0,0 +1,185 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath("."))
+
+from langchain_core.messages import SystemMessage, HumanMessage
+from llm_layer.response_cache import LLMResponseCache
+
+
+def counting(value):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return dict(value)
+
+    return compute, calls
+
+
+def test_identical_prompts_are_served_from_cache():
+    cache = LLMResponseCache(disk_path=None, enabled=True)
+    compute, calls = counting({"work_pattern": "grid"})
+    messages = [SystemMessage(content="classify"), HumanMessage(content="survey the field")]
+
+    first = cache.call("work_pattern", "gpt-4o-mini", messages, compute)
+    first["work_pattern"] = "mutated"
+    second = cache.call("work_pattern", "gpt-4o-mini", list(messages), compute)
+
+    assert second == {"work_pattern": "grid"}
+    assert len(calls) == 1
+
+    # Model, stage and snapshot version are all part of the key
+    cache.call("work_pattern", "gpt-4o", messages, compute)
+    cache.call("intent", "gpt-4o-mini", messages, compute)
+    cache.call("work_pattern", "gpt-4o-mini", messages, compute, version="v2")
+    assert len(calls) == 4
+
+    # Unknown version: never cached
+    cache.call("work_pattern", "gpt-4o-mini", messages, compute, version=None)
+    assert len(calls) == 5
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 4 and stats["bypassed"] == 1
+    assert stats["stages"]["intent"]["misses"] == 1
+
+
+def test_lru_ttl_and_disk_tier(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    cache = LLMResponseCache(max_entries=1, disk_path=path, enabled=True)
+    compute, calls = counting({"ok": True})
+
+    cache.call("grid", "m", "prompt a", compute)
+    cache.call("grid", "m", "prompt b", compute)     # evicts "a" from memory
+    cache.call("grid", "m", "prompt a", compute)     # served from disk
+    assert len(calls) == 2
+    assert cache.stats()["disk_hits"] == 1
+
+    # A new process sees the persisted responses
+    restarted = LLMResponseCache(disk_path=path, enabled=True)
+    restarted.call("grid", "m", "prompt b", compute)
+    assert len(calls) == 2
+
+    expired = LLMResponseCache(ttl=-1, disk_path=path, enabled=True)
+    expired.call("grid", "m", "prompt b", compute)
+    assert len(calls) == 3
+
+
+def test_invalid_llm_output_is_not_cached(monkeypatch):
+    from types import SimpleNamespace
+    import relative_direction.nodes as nodes
+
+    cache = LLMResponseCache(disk_path=None, enabled=True)
+    answers = iter([
+        SimpleNamespace(waypoints=[SimpleNamespace(angle_degrees=90, distance_meters=None)]),
+        SimpleNamespace(waypoints=[SimpleNamespace(angle_degrees=90, distance_meters=50)]),
+    ])
+    monkeypatch.setattr(nodes, "get_llm_cache", lambda: cache)
+    monkeypatch.setattr(nodes, "llm_call", lambda *args: next(answers))
+
+    state = {"input": "go 50 m east", "result": None, "error": None, "retries": 0}
+    assert nodes.generate(dict(state))["error"] == "distance missing"
+    assert cache.stats()["entries"] == 0
+
+    # The same prompt asks the model again instead of replaying the bad answer
+    assert nodes.generate(dict(state))["error"] is None
+    assert cache.stats()["entries"] == 1 and cache.stats()["hits"] == 0
+
+
+def test_async_calls_keep_sqlite_off_the_event_loop(tmp_path):
+    import asyncio
+    import threading
+
+    cache = LLMResponseCache(max_entries=1, disk_path=str(tmp_path / "llm.sqlite3"), enabled=True)
+    threads = []
+    disk_get, disk_put = cache._disk_get, cache._disk_put
+    cache._disk_get = lambda *args: threads.append(threading.current_thread()) or disk_get(*args)
+    cache._disk_put = lambda *args: threads.append(threading.current_thread()) or disk_put(*args)
+
+    async def compute():
+        return {"ok": True}
+
+    async def scenario():
+        await cache.acall("grid", "m", "prompt a", compute)
+        await cache.acall("grid", "m", "prompt b", compute)     # evicts "a" from memory
+        return await cache.acall("grid", "m", "prompt a", compute)
+
+    assert asyncio.run(scenario()) == {"ok": True}
+    assert cache.stats()["disk_hits"] == 1
+    assert len(threads) == 5 and threading.main_thread() not in threads
+
+
+def test_unparsable_extraction_is_not_cached(monkeypatch):
+    import pytest
+    from langchain_core.messages import AIMessage
+    import validation_layer.prompt_to_json_extraction as extraction
+
+    cache = LLMResponseCache(disk_path=None, enabled=True)
+    answers = iter([
+        AIMessage(content="Sure! Here is the mission: {"),
+        AIMessage(content='{"finish": {"type": "LAND", "duration": null}, "waypoints": []}'),
+    ])
+    monkeypatch.setattr(extraction, "get_llm_cache", lambda: cache)
+    monkeypatch.setattr(extraction, "site_version", lambda site_id: "v1")
+    monkeypatch.setattr(extraction, "llm_call", lambda *args: next(answers))
+
+    def convert():
+        converter = extraction.PromptToJsonConvert(
+            {"model_for_extraction": "gpt-4o-mini", "site_id": 1, "org_id": 1, "user_id": 1, "prompt": "land"}
+        )
+        converter._messages = lambda: [HumanMessage(content="land")]
+        return converter.convert()
+
+    with pytest.raises(Exception):
+        convert()
+    assert cache.stats()["entries"] == 0
+
+    assert convert()["model_for_extraction_json_output"]["finish_action"]["type"] == "LAND"
+    assert cache.stats()["entries"] == 1 and cache.stats()["hits"] == 0
+
+
+def test_classification_missing_work_pattern_is_not_cached(monkeypatch):
+    import pytest
+    from types import SimpleNamespace
+    import mission_classifier_layer.classifier as classifier
+    from llm_layer.semantic_cache import HashingEmbedder, SemanticCache
+
+    cache = LLMResponseCache(disk_path=None, enabled=True)
+    semantic = SemanticCache(embedder=HashingEmbedder(), enabled=True, find_places=lambda scope, text: frozenset())
+    answers = iter([
+        {"category": "absolute_location"},
+        {"work_pattern": "stop_and_work", "category": "absolute_location"},
+    ])
+    monkeypatch.setattr(classifier, "get_llm_cache", lambda: cache)
+    monkeypatch.setattr(classifier, "get_semantic_cache", lambda: semantic)
+    monkeypatch.setattr(classifier, "llm_call", lambda *args: next(answers))
+    monkeypatch.setattr(classifier.Classifier, "build_work_pattern_chain", lambda self: SimpleNamespace(invoke=None))
+
+    mission = classifier.Classifier({"prompt": "fly to the gate and hover", "site_id": 1})
+    with pytest.raises(ValueError):
+        mission.classify_mission()
+    assert cache.stats()["entries"] == 0 and semantic.stats()["prompts"] == 0
+
+    assert mission.classify_mission()["mission_type"] == "point"
+    assert cache.stats()["entries"] == 1 and semantic.stats()["prompts"] == 1
+
+
+def test_async_calls_without_a_disk_tier_stay_on_the_loop(monkeypatch):
+    import asyncio
+    import database_layer
+
+    async def no_thread_hops(*args, **kwargs):
+        raise AssertionError("no disk tier: nothing to offload")
+
+    monkeypatch.setattr(database_layer, "run_blocking", no_thread_hops)
+    cache = LLMResponseCache(disk_path=None, enabled=True)
+
+    async def compute():
+        return {"ok": True}
+
+    async def scenario():
+        await cache.acall("grid", "m", "prompt a", compute)
+        return await cache.acall("grid", "m", "prompt a", compute)
+
+    assert asyncio.run(scenario()) == {"ok": True}
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
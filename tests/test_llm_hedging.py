@@ -0,0 +1,115 @@
+import sys
+import os
+import time
+import asyncio
+import itertools
+
+sys.path.append(os.path.abspath("."))
+
+import pytest
+from llm_layer.hedging import HedgedCaller, StageDeadlineExceeded
+from llm_layer.limiter import INTERACTIVE, LLMLimiter
+
+
+def warmed(caller, stage, seconds=0.01, n=20):
+    for _ in range(n):
+        caller._record(stage, seconds)
+
+
+def test_slow_call_is_hedged_and_the_duplicate_wins():
+    caller = HedgedCaller(deadlines={"s": 2}, hedging=True, min_samples=20, min_delay=0.05)
+    warmed(caller, "s")
+    attempts = itertools.count()
+
+    def slow_then_fast():
+        if next(attempts) == 0:
+            time.sleep(1)
+            return "primary"
+        return "hedge"
+
+    start = time.monotonic()
+    assert caller.call("s", slow_then_fast) == "hedge"
+    assert time.monotonic() - start < 0.5
+
+    stats = caller.stats()["s"]
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+    assert stats["hedge_rate"] == 1.0 and stats["hedge_win_rate"] == 1.0
+
+
+def test_no_hedging_before_enough_samples_and_deadline_enforced():
+    caller = HedgedCaller(deadlines={"s": 0.2}, hedging=True, min_samples=20)
+    warmed(caller, "s", n=5)
+
+    with pytest.raises(StageDeadlineExceeded):
+        caller.call("s", time.sleep, 1)
+
+    stats = caller.stats()["s"]
+    assert stats["hedged"] == 0 and stats["deadline_exceeded"] == 1
+
+    with pytest.raises(ValueError):
+        caller.call("s", int, "not a number")
+
+
+def test_async_hedge_cancels_the_loser():
+    caller = HedgedCaller(deadlines={"s": 2}, hedging=True, min_samples=20, min_delay=0.05)
+    warmed(caller, "s")
+    attempts = itertools.count()
+    cancelled = []
+
+    async def slow_then_fast():
+        if next(attempts) == 0:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "primary"
+        return "hedge"
+
+    async def scenario():
+        result = await caller.acall("s", slow_then_fast)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == "hedge"
+    assert cancelled == [True]
+
+
+def test_samples_are_service_time_and_no_hedge_while_queued():
+    limiter = LLMLimiter(max_concurrent=1, rate=1000, burst=1000)
+    caller = HedgedCaller(deadlines={"s": 2}, hedging=True, min_samples=20, min_delay=0.05, limiter=limiter)
+
+    with limiter.slot(INTERACTIVE):                 # the only slot is busy
+        queued = caller._executor.submit(caller.call, "s", time.sleep, 0.01, lane=INTERACTIVE)
+        time.sleep(0.3)
+    queued.result()
+
+    # 0.3 s in the queue, 0.01 s of service
+    assert max(caller._latencies["s"]) < 0.1
+
+    warmed(caller, "s")
+    hold = limiter.slot(INTERACTIVE)
+    hold.__enter__()
+    waiting = caller._executor.submit(caller.call, "s", time.sleep, 0, lane=INTERACTIVE)
+    time.sleep(0.2)
+    hold.__exit__(None, None, None)
+    waiting.result()
+
+    stats = caller.stats()["s"]
+    assert stats["hedged"] == 0 and stats["hedges_held_back"] == 1
+
+
+def test_abandoned_sync_call_gives_its_queue_place_back():
+    limiter = LLMLimiter(max_concurrent=1, rate=1000, burst=1000, queue_timeout=30)
+    caller = HedgedCaller(deadlines={"s": 0.1}, hedging=False, limiter=limiter)
+    calls = []
+
+    with limiter.slot(INTERACTIVE):
+        with pytest.raises(StageDeadlineExceeded):
+            caller.call("s", calls.append, 1, lane=INTERACTIVE)
+        time.sleep(0.1)
+        # The abandoned thread stopped waiting at the deadline
+        assert limiter.queued() == 0
+
+    time.sleep(0.05)
+    assert calls == [] and limiter.stats()["active"] == 0
@@ -0,0 +1,118 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+
+sys.path.append(os.path.abspath("."))
+
+import pytest
+from llm_layer.limiter import BACKGROUND, INTERACTIVE, LLMLimiter, LimiterTimeout
+
+
+def test_interactive_calls_jump_the_background_queue():
+    limiter = LLMLimiter(max_concurrent=1, rate=1000, burst=1000)
+    order = []
+
+    hold = limiter.slot(BACKGROUND)     # take the only slot
+    hold.__enter__()
+
+    def call(lane, name):
+        limiter.run(lane, order.append, name)
+
+    threads = [threading.Thread(target=call, args=(BACKGROUND, f"bg{i}")) for i in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    fg = threading.Thread(target=call, args=(INTERACTIVE, "fg"))
+    fg.start()
+    time.sleep(0.05)
+
+    hold.__exit__(None, None, None)
+    for t in threads + [fg]:
+        t.join(2)
+
+    assert order[0] == "fg"
+    stats = limiter.stats()
+    assert stats["active"] == 0
+    assert stats["lanes"][BACKGROUND]["calls"] == 4
+    assert stats["lanes"][INTERACTIVE]["wait_ms_max"] > 0
+
+
+def test_token_bucket_and_queue_timeout():
+    limiter = LLMLimiter(max_concurrent=10, rate=20, burst=2, queue_timeout=1)
+
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.run(INTERACTIVE, lambda: None)
+    # 2 from the burst, 4 more at 20/s
+    assert time.monotonic() - start >= 0.18
+
+    held = LLMLimiter(max_concurrent=1, rate=1000, burst=1000, queue_timeout=0.1)
+    with held.slot(INTERACTIVE):
+        with pytest.raises(LimiterTimeout):
+            held.run(INTERACTIVE, lambda: None)
+    assert held.stats()["lanes"][INTERACTIVE]["timeouts"] == 1
+
+
+def test_cancelled_async_waiter_returns_its_place():
+    limiter = LLMLimiter(max_concurrent=1, rate=1000, burst=1000)
+
+    async def scenario():
+        async with limiter.aslot(INTERACTIVE):
+            waiter = asyncio.create_task(limiter.arun(BACKGROUND, asyncio.sleep, 0))
+            await asyncio.sleep(0.05)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+        await limiter.arun(BACKGROUND, asyncio.sleep, 0)
+
+    asyncio.run(scenario())
+    time.sleep(0.05)
+    stats = limiter.stats()
+    assert stats["active"] == 0
+    assert stats["lanes"][BACKGROUND]["queued"] == 0
+
+
+def test_async_waiters_hold_no_threads_and_keep_lane_order():
+    limiter = LLMLimiter(max_concurrent=1, rate=1000, burst=1000, queue_timeout=5)
+    order = []
+
+    async def call(lane, name):
+        await limiter.arun(lane, asyncio.sleep, 0)
+        order.append(name)
+
+    def executor_threads():
+        return sum(t.name.startswith("asyncio") for t in threading.enumerate())
+
+    async def scenario():
+        async with limiter.aslot(BACKGROUND):
+            waiters = [asyncio.create_task(call(BACKGROUND, f"bg{i}")) for i in range(100)]
+            await asyncio.sleep(0.05)
+            waiters.append(asyncio.create_task(call(INTERACTIVE, "fg")))
+            await asyncio.sleep(0.05)
+            assert executor_threads() == 0       # nobody parked in the loop's executor
+            assert limiter.stats()["lanes"][BACKGROUND]["queued"] == 100
+        await asyncio.gather(*waiters)
+
+    asyncio.run(scenario())
+    assert order[0] == "fg" and order[1:] == [f"bg{i}" for i in range(100)]
+
+
+def test_async_queue_timeout_starts_when_queued():
+    limiter = LLMLimiter(max_concurrent=1, rate=1000, burst=1000, queue_timeout=0.1)
+
+    async def scenario():
+        async with limiter.aslot(INTERACTIVE):
+            start = time.monotonic()
+            results = await asyncio.gather(
+                *[limiter.arun(BACKGROUND, asyncio.sleep, 0) for _ in range(50)],
+                return_exceptions=True,
+            )
+            assert time.monotonic() - start < 0.5
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, LimiterTimeout) for r in results)
+    stats = limiter.stats()
+    assert stats["active"] == 0 and stats["lanes"][BACKGROUND]["timeouts"] == 50
@@ -0,0 +1,41 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath("."))
+
+from pydantic import BaseModel
+from llm_layer.registry import LLMClientRegistry
+
+
+class Answer(BaseModel):
+    text: str
+
+
+def test_clients_are_reused_per_model_temperature_and_schema():
+    registry = LLMClientRegistry(api_key="sk-test")
+
+    a = registry.chat("gpt-4o-mini", 0)
+    assert registry.chat("gpt-4o-mini", 0) is a
+    assert registry.chat("gpt-4o-mini", 0.5) is not a
+
+    structured = registry.chat("gpt-4o-mini", 0, schema=Answer)
+    assert registry.chat("gpt-4o-mini", 0, schema=Answer) is structured
+
+    stats = registry.stats()
+    assert stats["created"] == 3
+    assert stats["reused"] == 3     # two direct hits + the base client behind the schema
+
+
+def test_clients_share_one_http_pool():
+    registry = LLMClientRegistry(api_key="sk-test")
+
+    a = registry.chat("gpt-4o-mini", 0)
+    b = registry.chat("gpt-4o", 0)
+    assert a.http_client is b.http_client
+    assert a.http_async_client is b.http_async_client
+    assert registry.openai()._client is a.http_client
+
+    built = []
+    chain = registry.chain("k", lambda: built.append(1) or object())
+    assert registry.chain("k", lambda: built.append(1) or object()) is chain
+    assert built == [1]
@@ -0,0 +1,119 @@
+import sys
+import os
+import time
+import sqlite3
+import asyncio
+import threading
+
+sys.path.append(os.path.abspath("."))
+
+import pytest
+import app.prompt_run as prompt_run
+from app.deadline import Deadline, MissionCancelled, deadline_scope
+from database_layer import run_blocking
+from database_layer.pool import ConnectionPool
+from llm_layer.hedging import HedgedCaller
+
+
+class FakeRunner:
+    def __init__(self, *args):
+        pass
+
+    async def aprocess_prompt(self, prompt):
+        return {"success": True, "db_record_id": "42", "status": "accepted"}
+
+
+def make_engine(monkeypatch):
+    monkeypatch.setattr(prompt_run, "PromptRunner", FakeRunner)
+    engine = prompt_run.MissionEngine(sio=None)
+    engine.emit_progress = lambda *args: None
+    stopped = []
+
+    async def classify(validated, data):
+        return {**validated, "category": "absolute_location"}
+
+    async def slow_pipeline(data, validated, cid, selected=None):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            stopped.append(cid)
+            raise
+        return {"type": "success"}
+
+    engine._select_model = classify
+    engine._continue_pipeline = slow_pipeline
+    return engine, stopped
+
+
+def data(user_id):
+    return {"message": "fly to gate at 20 m", "user_id": user_id, "site_id": 1, "organization_id": 1}
+
+
+def test_disconnect_cancels_the_running_mission(monkeypatch):
+    engine, stopped = make_engine(monkeypatch)
+
+    async def scenario():
+        mission = asyncio.create_task(engine.main("c1", data(1)))
+        await asyncio.sleep(0.1)
+        assert engine.missions.active("c1") == 1
+        assert engine.cancel_missions(cid="c1", reason="client disconnected") == 1
+        return await mission
+
+    start = time.monotonic()
+    response = asyncio.run(scenario())
+
+    assert time.monotonic() - start < 1
+    assert response["type"] == "cancelled" and "client disconnected" in response["payload"]["message"]
+    assert stopped == ["c1"]
+    assert engine.missions.stats() == {"started": 1, "finished": 1, "cancelled": 1, "active": 0}
+
+
+def test_new_prompt_supersedes_the_conversations_previous_mission(monkeypatch):
+    engine, stopped = make_engine(monkeypatch)
+
+    async def scenario():
+        first = asyncio.create_task(engine.main("c1", data(7)))
+        other_tab = asyncio.create_task(engine.main("c2", data(7)))
+        await asyncio.sleep(0.1)
+        second = asyncio.create_task(engine.main("c1", data(7)))
+        first_response = await first
+        await asyncio.sleep(0.1)
+        assert engine.missions.active("c1") == 1 and engine.missions.active("c2") == 1
+        second.cancel()
+        other_tab.cancel()
+        await asyncio.gather(second, other_tab, return_exceptions=True)
+        return first_response
+
+    assert asyncio.run(scenario())["type"] == "cancelled"
+    assert stopped[0] == "c1"                       # the same user's other conversation kept running
+
+
+def test_blocking_work_stops_at_its_next_cancellation_point():
+    deadline = Deadline(30)
+    started, finished = threading.Event(), threading.Event()
+    pool = ConnectionPool(lambda: sqlite3.connect(":memory:", check_same_thread=False), size=1, name="test")
+
+    def blocking_stage():
+        started.set()
+        time.sleep(0.2)
+        try:
+            pool.acquire()                          # next DB query of the cancelled mission
+        finally:
+            finished.set()
+
+    async def scenario():
+        with deadline_scope(deadline):
+            job = asyncio.ensure_future(run_blocking(blocking_stage))
+        await asyncio.to_thread(started.wait)
+        deadline.cancel("client disconnected")
+        with pytest.raises(MissionCancelled):
+            await job
+
+    asyncio.run(scenario())
+    assert finished.is_set() and pool.stats()["acquired"] == 0
+
+    calls = []
+    with deadline_scope(deadline):
+        with pytest.raises(MissionCancelled):
+            HedgedCaller(hedging=False).call("s", calls.append, 1)
+    assert calls == []
@@ -0,0 +1,28 @@
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.abspath("."))
+
+import pytest
+from database_layer.offload import LoopBlockingError, check_off_loop, run_blocking
+
+
+def test_guard_flags_calls_on_the_loop_thread():
+    async def on_loop():
+        check_off_loop("test query", mode="raise")
+
+    with pytest.raises(LoopBlockingError):
+        asyncio.run(on_loop())
+
+
+def test_run_blocking_moves_work_off_the_loop():
+    def query(value):
+        check_off_loop("test query", mode="raise")
+        return value * 2
+
+    async def handler():
+        return await run_blocking(query, 21)
+
+    assert asyncio.run(handler()) == 42
+    check_off_loop("sync caller", mode="raise")
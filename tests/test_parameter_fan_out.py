@@ -0,0 +1,42 @@
+import sys
+import os
+import time
+import asyncio
+
+sys.path.append(os.path.abspath("."))
+
+import intelligence_layer.parameter_model_setup as pms
+
+
+def item(location, speed):
+    return {"location": {"location": location, "action": []}, "value": [{"speed": speed}]}
+
+
+def test_fan_out_is_concurrent_capped_and_returns_partial_results(monkeypatch):
+    in_flight, peak = [0], [0]
+
+    async def fake_extract(user_prompt, location, all_locations, candidates):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        try:
+            if location == "slow":
+                await asyncio.sleep(5)
+            if location == "broken":
+                raise ValueError("bad json")
+            await asyncio.sleep(0.1)
+            return {"actions": ["HOVER"], "speed": 1, "altitude": 20, "altitude_mode": "AGL", "reason": location}
+        finally:
+            in_flight[0] -= 1
+
+    monkeypatch.setattr(pms, "aextract_action_and_params", fake_extract)
+    data = [item(f"stop {i}", 9) for i in range(6)] + [item("slow", 7), item("broken", 6)]
+
+    start = time.monotonic()
+    results = asyncio.run(pms._fan_out("p", data, [], max_concurrency=3, call_timeout=0.5, budget=2))
+    elapsed = time.monotonic() - start
+
+    assert [r["reason"] for r in results[:6]] == [f"stop {i}" for i in range(6)]
+    assert results[6]["reason"] == "Fallback" and results[6]["speed"] == 7
+    assert results[7]["reason"] == "Fallback" and results[7]["speed"] == 6
+    assert peak[0] == 3
+    assert elapsed < 1.5
@@ -0,0 +1,71 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath("."))
+
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage
+from llm_layer.prompt_cache import SitePromptCache
+from grid.llm.prompts import GRID_INSTRUCTIONS, build_system_prompt
+
+
+def test_site_prompt_is_rendered_once_per_version():
+    cache = SitePromptCache()
+    renders = []
+
+    def render():
+        renders.append(1)
+        return "STATIC" + f"locations {len(renders)}"
+
+    first = cache.site_prompt("intent", 1, 7, render, static_len=6, version="v1")
+    again = cache.site_prompt("intent", 1, 7, render, static_len=6, version="v1")
+    assert first == again and len(renders) == 1
+
+    # A new snapshot version, another site or another org renders again
+    cache.site_prompt("intent", 1, 7, render, static_len=6, version="v2")
+    cache.site_prompt("intent", 2, 7, render, static_len=6, version="v1")
+    cache.site_prompt("intent", 1, 8, render, static_len=6, version="v1")
+    assert len(renders) == 4
+
+    stats = cache.stats()["prompts"]["intent"]
+    assert stats["hits"] == 1 and stats["renders"] == 4
+    assert 0 < stats["static_ratio"] < 1
+
+
+def test_cached_token_ratio_from_usage():
+    cache = SitePromptCache()
+
+    cache.record_usage("intent", AIMessage(content="{}", usage_metadata={
+        "input_tokens": 1000, "output_tokens": 10, "total_tokens": 1010,
+        "input_token_details": {"cache_read": 768},
+    }))
+    cache.record_usage("intent", SimpleNamespace(usage=SimpleNamespace(
+        prompt_tokens=1000, prompt_tokens_details=SimpleNamespace(cached_tokens=0),
+    )))
+    cache.record_usage("intent", {"no": "usage"})
+
+    usage = cache.stats()["usage"]["intent"]
+    assert usage["calls"] == 2
+    assert usage["cached_ratio"] == 0.384
+
+
+def test_grid_prompt_starts_with_static_instructions():
+    def validated(site_name, prompt):
+        return {
+            "site_id": 1,
+            "user_prompt": prompt,
+            "data": {"organization": {"id": 3, "sites": [{
+                "id": 1, "name": site_name, "binding": [],
+                "sections": [{"annotations": [{
+                    "name": "North Field", "shape": "circle", "geometry": {"radius": 10},
+                }]}],
+            }]}},
+        }
+
+    a = build_system_prompt(validated("Farm A", "grid over north field at 40 m"))
+    b = build_system_prompt(validated("Farm B", "grid over north field at 60 m"))
+
+    assert a.startswith(GRID_INSTRUCTIONS) and b.startswith(GRID_INSTRUCTIONS)
+    assert "Farm A" in a and "Farm B" in b
+    assert a.index("North Field") > len(GRID_INSTRUCTIONS)
@@ -0,0 +1,120 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath("."))
+
+import numpy as np
+from llm_layer.semantic_cache import HashingEmbedder, SemanticCache, normalize_prompt
+
+
+def no_places(scope, text):
+    return frozenset()
+
+
+def counting():
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"work_pattern": f"answer-{len(calls)}"}
+
+    return compute, calls
+
+
+def test_hashing_embedder_is_normalized_and_stable():
+    embedder = HashingEmbedder(dim=256)
+    vectors = embedder.embed(["survey the north field", "survey the north field", "land now"])
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert np.allclose(vectors[0], vectors[1])
+    assert vectors[0] @ vectors[2] < 0.5
+
+
+def test_near_duplicates_reuse_the_answer_within_a_site():
+    cache = SemanticCache(embedder=HashingEmbedder(), threshold=0.9, enabled=True, find_places=no_places)
+    compute, calls = counting()
+
+    first = cache.call("work_pattern", "m", 1, "Fly to the Admin Building at 30 m and hover.", compute)
+    again = cache.call("work_pattern", "m", 1, "fly to the admin building at 30 m and hover", compute)
+    assert again == first and len(calls) == 1
+
+    # Different site, different numbers or missing unit: no reuse
+    cache.call("work_pattern", "m", 2, "fly to the admin building at 30 m and hover", compute)
+    cache.call("work_pattern", "m", 1, "fly to the admin building at 40 m and hover", compute)
+    cache.call("work_pattern", "m", 1, "fly to the admin building at 30 and hover", compute)
+    assert len(calls) == 4
+
+    assert cache.stats()["hits"] == 1
+    assert normalize_prompt("  Hover, 10 m!! ") == "hover 10 m"
+
+
+def test_embedder_failure_bypasses_the_cache():
+    class Broken:
+        name = "broken"
+
+        def embed(self, texts):
+            raise RuntimeError("offline")
+
+    cache = SemanticCache(embedder=Broken(), enabled=True, find_places=no_places)
+    compute, calls = counting()
+    cache.call("work_pattern", "m", 1, "hover", compute)
+    cache.call("work_pattern", "m", 1, "hover", compute)
+    assert len(calls) == 2
+    assert cache.stats()["stages"]["work_pattern"]["bypassed"] == 2
+
+
+def test_places_and_location_words_must_match():
+    import re
+
+    def places(scope, text):
+        return frozenset(re.findall(r"gate [ab]|hangar", text))
+
+    cache = SemanticCache(embedder=HashingEmbedder(), threshold=0.8, enabled=True, find_places=places)
+    compute, calls = counting()
+
+    cache.call("work_pattern", "m", 1, "fly to gate a at 30 m and hover", compute)
+    cache.call("work_pattern", "m", 1, "fly to gate b at 30 m and hover", compute)
+    cache.call("work_pattern", "m", 1, "circle the north tower at 30 m", compute)
+    cache.call("work_pattern", "m", 1, "circle the south tower at 30 m", compute)
+    assert len(calls) == 4 and cache.stats()["hits"] == 0
+
+    cache.call("work_pattern", "m", 1, "Fly to Gate A at 30 m and hover!", compute)
+    assert len(calls) == 4
+
+    # Site annotations unreadable: no reuse at all
+    blind = SemanticCache(embedder=HashingEmbedder(), enabled=True, find_places=lambda scope, text: None)
+    blind.call("work_pattern", "m", 1, "hover", compute)
+    assert len(calls) == 5 and blind.stats()["stages"]["work_pattern"]["bypassed"] == 1
+
+
+def test_a_prompt_is_embedded_once_across_stages():
+    import threading
+    import time
+
+    class Counting(HashingEmbedder):
+        def __init__(self):
+            super().__init__()
+            self.calls = 0
+
+        def embed(self, texts):
+            self.calls += 1
+            time.sleep(0.2)
+            return super().embed(texts)
+
+    embedder = Counting()
+    cache = SemanticCache(embedder=embedder, enabled=True, find_places=no_places)
+    compute, calls = counting()
+    prompt = "fly to the admin building at 30 m and hover"
+
+    # The completion check and the speculative classification run concurrently
+    stages = [
+        threading.Thread(target=cache.call, args=(stage, "m", 1, prompt, compute))
+        for stage in ("prompt_completion", "work_pattern")
+    ]
+    for t in stages:
+        t.start()
+    for t in stages:
+        t.join()
+    cache.call("intent", "m", 1, prompt, compute)
+
+    assert embedder.calls == 1
+    assert sum(s["embeds_reused"] for s in cache.stats()["stages"].values()) == 2
@@ -0,0 +1,37 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath("."))
+
+import intelligence_layer.model_setup as model_setup
+
+
+class FakeGraphValidator:
+    def __init__(self, **kwargs):
+        pass
+
+    def validate_location(self, user_id, location):
+        return [{"speed": 4, "location": location}]
+
+
+def test_graph_lookup_reuses_json_extraction(monkeypatch):
+    def no_second_extraction(*args):
+        raise AssertionError("extract_intent must not run")
+
+    monkeypatch.setattr(model_setup, "extract_intent", no_second_extraction)
+    monkeypatch.setattr(model_setup, "GraphValidator", FakeGraphValidator)
+
+    json_output = {"waypoints": [
+        {"location": "Gate", "actions": [{"type": "HOVER"}, {"type": "IMAGE_CAPTURE_SINGLE"}]},
+        {"location": "Dock", "actions": None},
+    ]}
+    validated = {"prompt": "p", "user_id": 1, "model_for_extraction_json_output": json_output}
+
+    waypoints = model_setup.waypoints_from_extraction(json_output)
+    assert waypoints == [
+        {"location": "Gate", "action": ["HOVER", "IMAGE_CAPTURE_SINGLE"]},
+        {"location": "Dock", "action": []},
+    ]
+
+    validated = model_setup.add_to_json(validated, waypoints)
+    assert [g["value"][0]["location"] for g in validated["graphdb_data"]] == ["Gate", "Dock"]
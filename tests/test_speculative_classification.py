@@ -0,0 +1,98 @@
+import sys
+import os
+import time
+import asyncio
+
+sys.path.append(os.path.abspath("."))
+
+import app.prompt_run as prompt_run
+
+
+class FakeDb:
+    def update_status_of_prompt(self, record_id, status):
+        pass
+
+
+class FakeRunner:
+    status = "accepted"
+
+    def __init__(self, *args):
+        self.db = FakeDb()
+
+    async def aprocess_prompt(self, prompt):
+        await asyncio.sleep(0.2)
+        return {"success": True, "db_record_id": "42", "status": self.status}
+
+
+def make_engine(monkeypatch, status):
+    monkeypatch.setattr(prompt_run, "PromptRunner", type("Runner", (FakeRunner,), {"status": status}))
+    engine = prompt_run.MissionEngine(sio=None)
+    engine.emit_progress = lambda *args: None
+
+    calls = {"classified": [], "continued": []}
+
+    async def classify(validated, data):
+        calls["classified"].append(time.monotonic())
+        await asyncio.sleep(0.2)
+        return {**validated, "class": "point", "category": "absolute_location"}
+
+    async def continue_pipeline(data, validated, cid, selected=None):
+        calls["continued"].append((validated, selected))
+        return {"type": "success"}
+
+    engine._select_model = classify
+    engine._continue_pipeline = continue_pipeline
+    return engine, calls
+
+
+DATA = {"message": "fly to gate at 20 m", "user_id": 1, "site_id": 1, "organization_id": 1}
+
+
+def test_accepted_prompt_reuses_speculative_classification(monkeypatch):
+    engine, calls = make_engine(monkeypatch, "accepted")
+
+    start = time.monotonic()
+    assert asyncio.run(engine.main("c1", DATA)) == {"type": "success"}
+    elapsed = time.monotonic() - start
+
+    validated, selected = calls["continued"][0]
+    assert selected["class"] == "point"
+    assert validated["db_record_id"] == "42"
+    assert elapsed < 0.35     # both 0.2 s calls overlapped
+
+
+def test_rejected_prompt_keeps_speculative_classification_for_accept(monkeypatch):
+    engine, calls = make_engine(monkeypatch, "rejected")
+
+    async def scenario():
+        response = await engine.main("c2", DATA)
+        assert response["type"] == "validate"
+        assert calls["continued"] == []
+        assert "class" not in engine.sessions["c2"]["validated"]
+
+        return await engine.handle_validate_action("c2", {**DATA, "param": 1})
+
+    assert asyncio.run(scenario()) == {"type": "success"}
+    validated, selected = calls["continued"][0]
+    assert selected["class"] == "point" and validated["db_record_id"] == "42"
+    assert len(calls["classified"]) == 1        # Accept did not classify again
+
+
+def test_user_reject_discards_speculative_classification(monkeypatch):
+    engine, calls = make_engine(monkeypatch, "rejected")
+
+    async def slow_classify(validated, data):
+        await asyncio.sleep(5)
+
+    engine._select_model = slow_classify
+
+    async def scenario():
+        await engine.main("c3", DATA)
+        speculative = engine.sessions["c3"]["speculative"]
+        response = await engine.handle_validate_action("c3", {**DATA, "param": 2})
+        await asyncio.sleep(0)
+        return response, speculative
+
+    response, speculative = asyncio.run(scenario())
+    assert response["type"] == "rejected"
+    assert speculative.cancelled() and calls["continued"] == []
@@ -0,0 +1,29 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath("."))
+
+from database_layer import ConnectionPool, SiteSnapshotCache, connect_sqlite, seed_from_data_json
+
+
+def test_seed_and_read_through_pool(tmp_path):
+    path = str(tmp_path / "local.sqlite3")
+    conn = connect_sqlite(path)
+    counts = seed_from_data_json(conn, "data.json", replicate=3)
+    conn.close()
+
+    assert counts["annotations"] > 0 and counts["geofences"] > 0
+
+    pool = ConnectionPool(lambda: connect_sqlite(path), size=2, name="local")
+    snapshots = SiteSnapshotCache(pool_getter=lambda: pool)
+    snapshot = snapshots.get(2)
+
+    # Copies are named "<name> 2", "<name> 3"
+    assert snapshot.find("Cricket ground") is not None
+    assert snapshot.find("cricket ground 3")["center"] is not None
+    assert len(snapshot.annotations) % 3 == 0
+
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM geofences WHERE site_id = %s AND is_active = 1", (2,))
+        assert cursor.fetchone()[0] == 3
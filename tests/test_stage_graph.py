@@ -0,0 +1,151 @@
+import sys
+import os
+import time
+import asyncio
+
+import pytest
+
+sys.path.append(os.path.abspath("."))
+
+from app.stage_graph import Stage, StageGraph
+
+
+def test_independent_stages_overlap_and_are_timed():
+    async def slow(x):
+        await asyncio.sleep(0.2)
+        return x
+
+    def blocking(x):
+        time.sleep(0.2)
+        return x * 10
+
+    graph = StageGraph([
+        Stage("a", slow, inputs=("x",), output="a"),
+        Stage("b", blocking, inputs=("x",), output="b", blocking=True),
+        Stage("sum", lambda a, b: a + b, inputs=("a", "b"), output="sum"),
+    ], initial=("x",))
+
+    started = []
+    begin = time.monotonic()
+    run = asyncio.run(graph.run({"x": 1}, on_start=started.append))
+    elapsed = time.monotonic() - begin
+
+    assert run.values["sum"] == 11
+    assert elapsed < 0.35                           # a and b ran together
+    assert set(run.timings_ms) == {"a", "b", "sum"}
+    assert graph.stats()["b"]["runs"] == 1
+    assert started == []                            # no stage declared progress
+
+
+def test_skipped_and_optional_stages_produce_defaults():
+    async def hang():
+        await asyncio.sleep(5)
+
+    graph = StageGraph([
+        Stage("skip", lambda: 1, output="s", when=lambda v: False, default="none"),
+        Stage("late", hang, output="l", timeout=0.05, optional=True, default="fallback"),
+        Stage("join", lambda s, l: (s, l), inputs=("s", "l"), output="j"),
+    ])
+    run = asyncio.run(graph.run({}))
+
+    assert run.values["j"] == ("none", "fallback")
+    assert run.skipped == ["skip"] and run.fallbacks == ["late"]
+
+
+def test_failure_cancels_the_rest():
+    cancelled = []
+
+    async def boom():
+        raise RuntimeError("boom")
+
+    async def long():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    graph = StageGraph([Stage("boom", boom), Stage("long", long)])
+    with pytest.raises(RuntimeError):
+        asyncio.run(graph.run({}))
+    assert cancelled == [True]
+
+
+def test_graph_is_checked_when_built():
+    with pytest.raises(ValueError):
+        StageGraph([Stage("a", lambda b: b, inputs=("b",), output="a")])
+    with pytest.raises(ValueError):
+        StageGraph([
+            Stage("a", lambda b: b, inputs=("b",), output="a"),
+            Stage("b", lambda a: a, inputs=("a",), output="b"),
+        ])
+
+
+def test_run_returns_without_waiting_for_detached_background_stages():
+    from database_layer import BoundedWorkerPool
+    from app.deadline import Deadline, current_deadline, deadline_scope
+
+    finished, budgets = [], []
+
+    def record(answer):
+        budgets.append(current_deadline().budget)
+        time.sleep(0.3)
+        finished.append(answer)
+
+    graph = StageGraph([
+        Stage("answer", lambda x: x + 1, inputs=("x",), output="answer"),
+        Stage("tuned", lambda x: x * 2, inputs=("x",), output="tuned", blocking=True, background=True),
+        Stage("reply", lambda answer, tuned: (answer, tuned), inputs=("answer", "tuned"), output="reply"),
+        Stage("record", record, inputs=("answer",), blocking=True, background=True),
+    ], initial=("x",), pool=BoundedWorkerPool(max_workers=2, name="test-detached"))
+    assert graph.detached == {"record"}             # "tuned" feeds the reply: it is waited for
+
+    async def scenario():
+        with deadline_scope(Deadline(5)):
+            begin = time.monotonic()
+            run = await graph.run({"x": 1})
+            returned_after = time.monotonic() - begin
+        assert finished == []
+        await asyncio.sleep(0.5)                    # the detached stage carries on
+        return run, returned_after
+
+    run, returned_after = asyncio.run(scenario())
+    assert run.values["reply"] == (2, 2)
+    assert returned_after < 0.2 and run.detached == ["record"]
+    assert finished == [2]
+    assert budgets != [5]                           # under its own deadline, not the mission's
+
+
+def test_cancelling_the_mission_reaches_detached_stages():
+    from database_layer import BoundedWorkerPool
+    from app.deadline import Deadline, MissionCancelled, check_cancelled, current_deadline, deadline_scope
+
+    written, stopped, budgets = [], [], []
+
+    def record(answer):
+        budgets.append(current_deadline().remaining())
+        time.sleep(0.2)
+        try:
+            check_cancelled()                       # just before the write
+        except MissionCancelled as e:
+            stopped.append(str(e))
+            raise
+        written.append(answer)
+
+    graph = StageGraph([
+        Stage("answer", lambda x: x + 1, inputs=("x",), output="answer"),
+        Stage("record", record, inputs=("answer",), blocking=True, background=True, optional=True),
+    ], initial=("x",), pool=BoundedWorkerPool(max_workers=1, name="test-detached-cancel"))
+
+    mission = Deadline(0.05)
+
+    async def scenario():
+        with deadline_scope(mission):
+            await graph.run({"x": 1})
+        await asyncio.sleep(0.1)                    # past the mission's own time budget
+        mission.cancel("prompt edited")
+        await asyncio.sleep(0.3)
+
+    asyncio.run(scenario())
+    assert budgets and budgets[0] > 1               # the mission's budget did not apply
+    assert stopped == ["prompt edited"] and written == []
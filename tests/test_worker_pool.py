@@ -0,0 +1,107 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+
+import pytest
+
+sys.path.append(os.path.abspath("."))
+
+from database_layer.worker_pool import BoundedWorkerPool, PoolRejected
+
+
+def test_workers_are_bounded_and_overflow_is_shed():
+    pool = BoundedWorkerPool(max_workers=2, max_queue=2, queue_timeout=None)
+    running, peak, lock = [0], [0], threading.Lock()
+    release = threading.Event()
+
+    def job(i):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        release.wait(5)
+        with lock:
+            running[0] -= 1
+        return i
+
+    futures = [pool.submit(job, i) for i in range(4)]     # 2 run, 2 deferred
+    with pytest.raises(PoolRejected):
+        pool.submit(job, 99)
+
+    stats = pool.stats()
+    assert stats["active"] == 2 and stats["queued"] == 2 and stats["rejected"] == 1
+
+    release.set()
+    assert [f.result(5) for f in futures] == [0, 1, 2, 3]
+    assert peak[0] == 2
+
+    stats = pool.stats()
+    assert stats["active"] == 0 and stats["completed"] == 4 and stats["max_depth"] == 2
+    pool.close()
+
+
+def test_async_jobs_share_the_slots_and_deferred_jobs_time_out():
+    pool = BoundedWorkerPool(max_workers=1, max_queue=1, queue_timeout=0.1)
+
+    async def job(seconds):
+        await asyncio.sleep(seconds)
+        return seconds
+
+    async def main():
+        first = asyncio.ensure_future(pool.acall(job, 0.3))
+        await asyncio.sleep(0.01)
+        with pytest.raises(PoolRejected):
+            await pool.arun(time.sleep, 0)      # waits 0.1 s in the queue, then shed
+        return await first
+
+    assert asyncio.run(main()) == 0.3
+    stats = pool.stats()
+    assert stats["rejected"] == 1 and stats["active"] == 0
+    pool.close()
+
+
+def test_cancelled_caller_frees_its_slot():
+    pool = BoundedWorkerPool(max_workers=1, max_queue=0, queue_timeout=None)
+
+    async def main():
+        task = asyncio.ensure_future(pool.acall(asyncio.sleep, 5))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)
+        return await pool.acall(asyncio.sleep, 0, "free")
+
+    assert asyncio.run(main()) == "free"
+    assert pool.stats()["failed"] == 1
+    pool.close()
+
+
+def test_slot_granted_as_the_wait_times_out_is_handed_back():
+    pool = BoundedWorkerPool(max_workers=1, max_queue=4, queue_timeout=0.1, name="test-grant-race")
+    pool._admit()                                   # the running job's slot
+
+    async def scenario():
+        waiter = asyncio.ensure_future(pool._aacquire())
+        await asyncio.sleep(0.02)
+        # The running job finishes: _release grants the waiter its slot but
+        # has not set the result yet when the waiter's timeout fires
+        admitted, _ = pool._waiting.popleft()
+        assert admitted.set_running_or_notify_cancel()
+        with pytest.raises(PoolRejected):
+            await waiter
+
+    asyncio.run(scenario())
+    assert pool.stats()["active"] == 0
+
+    # A withdrawn waiter is skipped, not granted, when the slot frees up
+    pool._admit()
+
+    async def withdrawn():
+        with pytest.raises(PoolRejected):
+            await pool._aacquire()
+
+    asyncio.run(withdrawn())
+    pool._release()
+    assert pool.stats()["active"] == 0 and pool.depth() == 0
+    pool.close()
@@ -0,0 +1,171 @@
+import sys
+import os
+import threading
+
+sys.path.append(os.path.abspath("."))
+
+import pytest
+import database_layer.ids as ids
+from database_layer import WriteBehindQueue, new_record_id
+
+
+def test_writes_are_batched_and_flushed_on_close():
+    batches = []
+    queue = WriteBehindQueue(batches.append, batch_size=50, interval=5)
+
+    for i in range(120):
+        queue.put(i)
+    queue.close()
+
+    assert [w for batch in batches for w in batch] == list(range(120))
+    assert all(len(batch) <= 50 for batch in batches)
+
+    stats = queue.stats()
+    assert stats["flushed"] == 120
+    assert stats["depth"] == 0
+    assert stats["batches"] == len(batches)
+
+
+def test_full_queue_applies_backpressure():
+    release = threading.Event()
+    written = []
+
+    def slow_flush(batch):
+        release.wait(2)
+        written.extend(batch)
+
+    queue = WriteBehindQueue(slow_flush, max_pending=2, batch_size=1, interval=0, put_timeout=0.05)
+    threading.Timer(0.2, release.set).start()
+    for i in range(6):
+        queue.put(i)
+    queue.close()
+
+    assert sorted(written) == list(range(6))
+    assert queue.stats()["max_depth"] <= 2
+    assert queue.stats()["inline_flushes"] >= 1
+
+
+def test_writes_stay_in_order_under_backpressure():
+    release = threading.Event()
+    written = []
+
+    def slow_flush(batch):
+        release.wait(2)
+        written.extend(batch)
+
+    queue = WriteBehindQueue(slow_flush, max_pending=2, batch_size=1, interval=0, put_timeout=0.05)
+    threading.Timer(0.2, release.set).start()
+    for i in range(10):
+        queue.put(i)
+    queue.close()
+
+    assert written == list(range(10))
+
+
+def test_only_the_bad_write_is_dropped():
+    written = []
+
+    def flush(batch):
+        if "bad" in batch:
+            raise ValueError("bad row")
+        written.extend(batch)
+
+    queue = WriteBehindQueue(flush, batch_size=50, interval=5, max_retries=2)
+    for item in ["a", "b", "bad", "c"]:
+        queue.put(item)
+    queue.close()
+
+    assert written == ["a", "b", "c"]
+    assert queue.dead_letters() == ["bad"]
+    stats = queue.stats()
+    assert stats["dropped"] == 1 and stats["dead_letters"] == 1
+
+
+def test_record_ids_are_unique_and_increasing(monkeypatch):
+    monkeypatch.setattr(ids, "_node", 5)
+    record_ids = [new_record_id() for _ in range(2000)]
+    assert record_ids == sorted(record_ids)
+    assert len(set(record_ids)) == len(record_ids)
+    assert max(record_ids) < 2 ** 53
+    assert all((i >> 6) & 63 == 5 for i in record_ids)
+
+
+def test_record_id_node_is_configured_never_random(monkeypatch):
+    monkeypatch.setattr(ids, "RECORD_ID_NODE", 64)
+    with pytest.raises(ValueError):
+        ids._resolve_node()
+
+    monkeypatch.setattr(ids, "RECORD_ID_NODE", None)
+    monkeypatch.setattr(ids, "DB_BACKEND", "sqlite")
+    assert ids._resolve_node() == 0
+
+    claimed = []
+    monkeypatch.setattr(ids, "DB_BACKEND", "mysql")
+    monkeypatch.setattr(ids._NodeLease, "claim", lambda self: claimed.append(1) or 17)
+    assert ids._resolve_node() == 17 and claimed == [1]
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.lastrowid = 41
+
+    def execute(self, sql, params=()):
+        self.conn.statements.append(" ".join(sql.split()))
+        self.conn.params.append(params)
+
+    def fetchone(self):
+        return (self.conn.id_type,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, id_type):
+        self.id_type = id_type
+        self.statements, self.params = [], []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_prompt_ids_stay_auto_increment_until_the_migration_is_applied(monkeypatch):
+    from types import SimpleNamespace
+    import prompt_completion_layer.db_manager as db_manager
+
+    def save(conn, **options):
+        monkeypatch.setattr(db_manager, "get_production_pool", lambda: SimpleNamespace(acquire=lambda: conn))
+        monkeypatch.setattr(db_manager, "DB_BACKEND", "mysql")
+        monkeypatch.setattr(db_manager, "_client_ids_supported", None)
+        response = SimpleNamespace(original_prompt="hover", completion_result=SimpleNamespace(is_complete=True))
+        return db_manager.PromptCompletionDB(**options).save_prompt_completion(response, 1, 2, 3)
+
+    # Default: the id comes from AUTO_INCREMENT, as before client ids
+    conn = FakeConnection("int")
+    assert save(conn) == 41
+    assert conn.statements[0].startswith("INSERT INTO prompt_conversations (user_id,")
+
+    # Client ids asked for on an unmigrated table: refused, AUTO_INCREMENT is kept
+    conn = FakeConnection("int")
+    assert save(conn, client_ids=True) == 41
+    assert "information_schema" in conn.statements[0] and len(conn.statements) == 2
+
+    # Migrated table: the id is ours
+    monkeypatch.setattr(db_manager, "new_record_id", lambda: 2 ** 45)
+    conn = FakeConnection("bigint")
+    assert save(conn, client_ids=True) == 2 ** 45
+    assert conn.statements[1].startswith("INSERT INTO prompt_conversations (id,")
+    assert conn.params[1][0] == 2 ** 45
+
+    with pytest.raises(ValueError):
+        db_manager.PromptCompletionDB(write_behind=True, client_ids=False)
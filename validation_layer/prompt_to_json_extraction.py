@@ -1,4 +1,3 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.output_parsers import JsonOutputParser
 from typing import Dict
@@ -10,6 +9,8 @@ from validation_layer import (
 from dataclasses import dataclass
 from intent_understanding.location_resolver import LocationResolver
 import copy
+from database_layer import run_blocking
+from llm_layer import INTERACTIVE, allm_call, get_llm_registry, get_llm_cache, get_prompt_cache, llm_call, site_version
 # data ={
 #         "user_id":1,
 #         "site_id":1,
@@ -30,35 +31,9 @@ import copy
 # validate=Selection(validated,data)
 # validated=validate.select_model()
 output_from_json=EnterDataToJSON()
-@dataclass
-class PromptToJsonConvert:
-
-    validated: dict
-
-    def __post_init__(self):
-
-        self.llm = ChatOpenAI(
-            model=self.validated["model_for_extraction"],
-            temperature=TEMPERATURE_FOR_JSON_EXTRACTION,
-            api_key=OPENAI_API_KEY,
-            # model_kwargs={
-            #     "reasoning":{
-            #         "effort":"low"
-            #     }
-            # }
-        )
-
-        self.parser = JsonOutputParser()
 
-    def convert(self) -> Dict:
-        org_id=self.validated["org_id"]
-        site_id=self.validated["site_id"]
-        user_id=self.validated["user_id"]
-        resolver = LocationResolver()
-        data = resolver.resolve(site_id, user_id,org_id)
-        print("data_from_db:",data)
-        messages = [
-    SystemMessage(content=f"""
+# Static instructions first: identical for every site, so the provider can cache this prefix
+JSON_EXTRACTION_INSTRUCTIONS = """
 You are a strict drone-mission intent extraction engine.
 Your ONLY job is to convert natural language drone instructions into structured JSON.
 
@@ -66,40 +41,40 @@ Your ONLY job is to convert natural language drone instructions into structured
 OUTPUT SCHEMA
 ════════════════════════════════════════
 
-{{
-  "finish": {{
+{
+  "finish": {
     "type": null,        // See FINISH TYPES below
     "duration": null     // seconds, only for HOVER finish
-  }},
-  "takeoff": {{
+  },
+  "takeoff": {
     "altitude": null,    // meters
     "mode": null,
     "speed": null        // m/s
-  }},
-  "camera": {{
+  },
+  "camera": {
     "pitch": null,       // degrees
     "yaw_mode": null,
     "poi": null          // place name only if explicitly mentioned
-  }},
+  },
   "waypoints": []
-}}
+}
 
 ────────────────────────────────────────
 WAYPOINT SCHEMA (each item in waypoints[])
 ────────────────────────────────────────
-{{
+{
   "name": null,           // place name only if user explicitly mentions it
   "altitude": null,       // meters
   "altitude_mode": null,  // "AGL","REL" or ASL" only
   "speed": null,          // m/s
   "radius": null,         // meters
   "actions": []
-}}
+}
 
 ────────────────────────────────────────
 ACTION SCHEMA (each item in actions[])
 ────────────────────────────────────────
-{{
+{
   "type": null,
   "pitch": null,      // degrees  — GIMBAL_CONTROL only
   "yaw": null,        // degrees  — GIMBAL_CONTROL only
@@ -108,7 +83,7 @@ ACTION SCHEMA (each item in actions[])
   "count": null,      // integer  — IMAGE_INTERVAL / IMAGE_DISTANCE only
   "zoom": null,       // 0–100    — CAMERA_ZOOM only
   "distance": null    // meters   — IMAGE_DISTANCE only
-}}
+}
 
 ════════════════════════════════════════
 ALLOWED ACTION TYPES & WHEN TO USE THEM
@@ -152,7 +127,7 @@ WAYPOINT RULES
                   ════════════════════════════════════════
 LOCATION INTELLIGENCE & WAYPOINT RULES
 ════════════════════════════════════════
-- Valid location names are restricted to this list: {data},If the user gives the location explicitly ,try considering from this locations or using intent try finding the location on its basis.
+- Valid location names are restricted to the list under SITE LOCATIONS at the end of this prompt. If the user gives the location explicitly ,try considering from this locations or using intent try finding the location on its basis.
 
 ────────────────────────────────────────
 STEP 1 — UNDERSTAND THE QUANTITY INTENT
@@ -282,26 +257,26 @@ HOVER DISAMBIGUATION — READ CAREFULLY
   - When in doubt, prefer WAYPOINT ACTION over FINISH TYPE.
 
   EXAMPLE — Correct output for "Fly to Nashik Central at 30m and hover for 20 seconds":
-  {{
-    "finish": {{"type": null, "duration": null}},
+  {
+    "finish": {"type": null, "duration": null},
     "waypoints": [
-      {{
+      {
         "name": "Nashik Central",
         "altitude": 30,
         "altitude_mode": null,
         "speed": null,
         "radius": null,
         "actions": [
-          {{
+          {
             "type": "HOVER",
             "duration": 20,
             "pitch": null, "yaw": null, "interval": null,
             "count": null, "zoom": null, "distance": null
-          }}
+          }
         ]
-      }}
+      }
     ]
-  }}
+  }
 ════════════════════════════════════════
 UNIT CONVERSION
 ════════════════════════════════════════
@@ -331,47 +306,122 @@ STRICT RULES
 12. If a phrase describes finishing behavior (land, return, hover at end), it goes in finish — not as a waypoint action.
 
 You are an intent extractor. Extract only what the user said. Never plan, never assume.
-"""),
+"""
+
+
+def site_locations_block(data) -> str:
+    return f"""
+═══════════════════════════════════════════
+SITE LOCATIONS
+═══════════════════════════════════════════
+{data}
+"""
+
+
+@dataclass
+class PromptToJsonConvert:
+
+    validated: dict
+
+    def __post_init__(self):
+
+        self.llm = get_llm_registry().chat(
+            self.validated["model_for_extraction"],
+            TEMPERATURE_FOR_JSON_EXTRACTION,
+            # model_kwargs={
+            #     "reasoning":{
+            #         "effort":"low"
+            #     }
+            # }
+        )
+
+        self.parser = JsonOutputParser()
+
+    def convert(self) -> Dict:
+        messages = self._messages()
+        version = site_version(self.validated["site_id"])
+        result = get_llm_cache().call(
+            "json_extraction",
+            self.validated["model_for_extraction"],
+            messages,
+            lambda: self._checked(llm_call("json_extraction", INTERACTIVE, self.llm.invoke, messages), messages),
+            version=version
+        )
+        return self._apply(result, messages)
+
+    async def aconvert(self) -> Dict:
+        """convert() for async callers; the prompt render (a DB read) stays on a worker thread."""
+        messages = await run_blocking(self._messages)
+        version = await run_blocking(site_version, self.validated["site_id"])
+
+        async def compute():
+            return self._checked(await allm_call("json_extraction", INTERACTIVE, self.llm.ainvoke, messages), messages)
+
+        result = await get_llm_cache().acall(
+            "json_extraction",
+            self.validated["model_for_extraction"],
+            messages,
+            compute,
+            version=version
+        )
+        return self._apply(result, messages)
+
+    def _messages(self) -> list:
+        org_id=self.validated["org_id"]
+        site_id=self.validated["site_id"]
+        user_id=self.validated["user_id"]
+
+        def render():
+            resolver = LocationResolver()
+            data = resolver.resolve(site_id, user_id,org_id)
+            print("data_from_db:",data)
+            return JSON_EXTRACTION_INSTRUCTIONS + site_locations_block(data)
+
+        # Rendered once per site snapshot version
+        system_prompt = get_prompt_cache().site_prompt(
+            "json_extraction", site_id, org_id, render,
+            static_len=len(JSON_EXTRACTION_INSTRUCTIONS)
+        )
+        return [
+            SystemMessage(content=system_prompt),
             HumanMessage(content=self.validated["prompt"])
         ]
-        category=self.validated.get("category","")
-        for attempt in range(1):
-            result = self.llm.invoke(messages)
-            chain = self.parser.invoke(result)
-            extracted_json = copy.deepcopy(TEMPLATE)
-            # Extract raw JSON text
-            raw_output = result.content
-            json_output=output_from_json.parse_json(chain, extracted_json)
-
-            try:
-                # Validate directly with Pydantic
-                if Template.model_validate(json_output):
-                    self.validated["model_for_extraction_json_output"] = \
-                    output_from_json.parse_json(chain, extracted_json)
-
-                    return self.validated
-
-            except Exception as e:
-                # Ask model to fix its own output
-                messages.append(
-                    HumanMessage(
-                        content=f"""
+
+    def _checked(self, result, messages):
+        # Runs inside the cached call: an answer that fails to parse or validate is never cached
+        self._parse(result, messages)
+        return result
+
+    def _apply(self, result, messages) -> Dict:
+        self.validated["model_for_extraction_json_output"] = self._parse(result, messages)
+        return self.validated
+
+    def _parse(self, result, messages) -> Dict:
+        chain = self.parser.invoke(result)
+        extracted_json = copy.deepcopy(TEMPLATE)
+        # Extract raw JSON text
+        raw_output = result.content
+        json_output=output_from_json.parse_json(chain, extracted_json)
+
+        try:
+            # Validate directly with Pydantic
+            Template.model_validate(json_output)
+            return json_output
+
+        except Exception as e:
+            # Ask model to fix its own output
+            messages.append(
+                HumanMessage(
+                    content=f"""
     Fix this into valid JSON only.
     Do not add explanations.
 
     {raw_output}
     """
-                    )
                 )
+            )
 
-                raise ValueError("LLM failed to produce valid structured output after 3 attempts.")
-
-
-
-
-
-        
-        
+            raise ValueError("LLM failed to produce valid structured output after 3 attempts.")
 
 
 # mission_json = PromptToJsonConvert.convert(